@@ -0,0 +1,39 @@
+"""add password_reset_otps table
+
+Revision ID: 187cfd457c99
+Revises: inspect_check
+Create Date: 2026-10-19 09:12:40.118604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '187cfd457c99'
+down_revision: Union[str, Sequence[str], None] = 'inspect_check'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('password_reset_otps',
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('otp', sa.String(length=16), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.Column('window_start', sa.DateTime(), nullable=False),
+    sa.Column('request_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.create_index(op.f('ix_password_reset_otps_expires_at'), 'password_reset_otps', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_password_reset_otps_window_start'), 'password_reset_otps', ['window_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_password_reset_otps_window_start'), table_name='password_reset_otps')
+    op.drop_index(op.f('ix_password_reset_otps_expires_at'), table_name='password_reset_otps')
+    op.drop_table('password_reset_otps')
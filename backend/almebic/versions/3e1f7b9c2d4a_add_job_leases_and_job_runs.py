@@ -0,0 +1,54 @@
+"""add job_leases and job_runs tables
+
+Revision ID: 3e1f7b9c2d4a
+Revises: a0d8fac37852
+Create Date: 2026-10-19 16:42:08.530217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e1f7b9c2d4a'
+down_revision: Union[str, Sequence[str], None] = 'a0d8fac37852'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job_leases',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('next_run_at', sa.DateTime(), nullable=False),
+    sa.Column('owner', sa.String(length=128), nullable=True),
+    sa.Column('lease_until', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('job_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job', sa.String(length=64), nullable=False),
+    sa.Column('owner', sa.String(length=128), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('duration_ms', sa.Float(), nullable=True),
+    sa.Column('chunks', sa.Integer(), nullable=False),
+    sa.Column('items', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_job_runs_id'), 'job_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_job_runs_job'), 'job_runs', ['job'], unique=False)
+    op.create_index(op.f('ix_job_runs_started_at'), 'job_runs', ['started_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_job_runs_started_at'), table_name='job_runs')
+    op.drop_index(op.f('ix_job_runs_job'), table_name='job_runs')
+    op.drop_index(op.f('ix_job_runs_id'), table_name='job_runs')
+    op.drop_table('job_runs')
+    op.drop_table('job_leases')
@@ -0,0 +1,36 @@
+"""add reorder_rules forecast columns
+
+Revision ID: 9b4d61e0c5f3
+Revises: 3e1f7b9c2d4a
+Create Date: 2026-10-19 18:20:14.907352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4d61e0c5f3'
+down_revision: Union[str, Sequence[str], None] = '3e1f7b9c2d4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('reorder_rules', sa.Column('daily_demand', sa.Numeric(precision=14, scale=4), nullable=True))
+    op.add_column('reorder_rules', sa.Column('suggested_min_qty', sa.Numeric(precision=14, scale=4), nullable=True))
+    op.add_column('reorder_rules', sa.Column('suggested_reorder_qty', sa.Numeric(precision=14, scale=4), nullable=True))
+    op.add_column('reorder_rules', sa.Column('days_of_cover', sa.Numeric(precision=10, scale=1), nullable=True))
+    op.add_column('reorder_rules', sa.Column('forecast_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('reorder_rules', 'forecast_at')
+    op.drop_column('reorder_rules', 'days_of_cover')
+    op.drop_column('reorder_rules', 'suggested_reorder_qty')
+    op.drop_column('reorder_rules', 'suggested_min_qty')
+    op.drop_column('reorder_rules', 'daily_demand')
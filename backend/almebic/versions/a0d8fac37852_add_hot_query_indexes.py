@@ -0,0 +1,51 @@
+"""add composite indexes for hot inventory queries
+
+Revision ID: a0d8fac37852
+Revises: 187cfd457c99
+Create Date: 2026-10-19 14:05:31.402117
+
+"""
+from contextlib import nullcontext
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a0d8fac37852'
+down_revision: Union[str, Sequence[str], None] = '187cfd457c99'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns); mirrors the Index() declarations at the end of models.py
+INDEXES = [
+    ('ix_stockmoves_product_dest_qty', 'stockmoves', ['product_id', 'dest_loc_id', 'quantity']),
+    ('ix_stockmoves_product_source_qty', 'stockmoves', ['product_id', 'source_loc_id', 'quantity']),
+    ('ix_stockoperationlines_product_operation', 'stockoperationlines', ['product_id', 'operation_id']),
+    ('ix_stockoperations_source_status', 'stockoperations', ['source_loc_id', 'status']),
+    ('ix_stockoperations_type_status_scheduled', 'stockoperations', ['operation_type', 'status', 'scheduled_date']),
+    ('ix_stockoperations_created_at', 'stockoperations', ['created_at']),
+    ('ix_stockmoves_date', 'stockmoves', ['date']),
+    ('ix_stockledger_date', 'stockledger', ['date']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # On Postgres build the indexes CONCURRENTLY (outside a transaction) so
+    # writes to the inventory tables are not blocked while they build.
+    # if_not_exists: databases created with create_all already have them.
+    concurrently = op.get_context().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block() if concurrently else nullcontext():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=concurrently
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+
@@ -0,0 +1,41 @@
+"""add location hierarchy (parent_id, materialized path)
+
+Revision ID: c7a2e5d14f8b
+Revises: 9b4d61e0c5f3
+Create Date: 2026-10-19 20:05:41.118904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a2e5d14f8b'
+down_revision: Union[str, Sequence[str], None] = '9b4d61e0c5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # batch mode: SQLite cannot add a foreign key to an existing table
+    with op.batch_alter_table('locations') as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('path', sa.String(length=255).with_variant(sa.String(length=255, collation='C'), 'postgresql'), nullable=True))
+        batch_op.create_foreign_key('fk_locations_parent_id_locations', 'locations', ['parent_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_locations_parent_id'), ['parent_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_locations_path'), ['path'], unique=False)
+    # existing locations are all top-level
+    op.execute("UPDATE locations SET path = '/' || CAST(id AS VARCHAR(20)) || '/'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('locations') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_locations_path'))
+        batch_op.drop_index(batch_op.f('ix_locations_parent_id'))
+        batch_op.drop_constraint('fk_locations_parent_id_locations', type_='foreignkey')
+        batch_op.drop_column('path')
+        batch_op.drop_column('parent_id')
@@ -0,0 +1,90 @@
+"""add warehouse_id copies to stock moves and quants
+
+Revision ID: e4b8d2a6f193
+Revises: c7a2e5d14f8b
+Create Date: 2026-10-19 22:41:07.532190
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8d2a6f193'
+down_revision: Union[str, Sequence[str], None] = 'c7a2e5d14f8b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# rows per backfill UPDATE, by id range
+CHUNK = 50_000
+
+INDEXES = (
+    ('ix_stockmoves_source_warehouse_date', 'stockmoves', ['source_warehouse_id', 'date']),
+    ('ix_stockmoves_dest_warehouse_date', 'stockmoves', ['dest_warehouse_id', 'date']),
+    ('ix_stockquants_warehouse_product', 'stockquants', ['warehouse_id', 'product_id']),
+)
+
+_COPIES = {
+    'stockmoves': (('source_loc_id', 'source_warehouse_id'), ('dest_loc_id', 'dest_warehouse_id')),
+    'stockquants': (('location_id', 'warehouse_id'),),
+}
+
+
+def _backfill(table: str) -> None:
+    """Copy each row's location warehouse_id, one id range per statement (autocommitted)."""
+    sets = ", ".join(
+        f"{copy} = (SELECT locations.warehouse_id FROM locations WHERE locations.id = {table}.{loc})"
+        for loc, copy in _COPIES[table]
+    )
+    if context.is_offline_mode():
+        # no ids to read when only rendering SQL
+        op.execute(f"UPDATE {table} SET {sets}")
+        return
+    bind = op.get_bind()
+    first, last = bind.execute(sa.text(f"SELECT MIN(id), MAX(id) FROM {table}")).one()
+    if first is None:
+        return
+    stmt = sa.text(f"UPDATE {table} SET {sets} WHERE id >= :lo AND id < :hi")
+    for lo in range(first, last + 1, CHUNK):
+        bind.execute(stmt, {"lo": lo, "hi": lo + CHUNK})
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # batch mode: SQLite cannot add a foreign key to an existing table
+    with op.batch_alter_table('stockmoves') as batch_op:
+        batch_op.add_column(sa.Column('source_warehouse_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('dest_warehouse_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_stockmoves_source_warehouse_id_warehouses', 'warehouses', ['source_warehouse_id'], ['id'])
+        batch_op.create_foreign_key('fk_stockmoves_dest_warehouse_id_warehouses', 'warehouses', ['dest_warehouse_id'], ['id'])
+    with op.batch_alter_table('stockquants') as batch_op:
+        batch_op.add_column(sa.Column('warehouse_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_stockquants_warehouse_id_warehouses', 'warehouses', ['warehouse_id'], ['id'])
+
+    # The autocommit block first commits the ALTERs above, releasing their
+    # ACCESS EXCLUSIVE locks on Postgres; inside it every chunk UPDATE is its
+    # own transaction, so writers only ever wait for one chunk. On Postgres
+    # the indexes are then built CONCURRENTLY, without blocking writes.
+    concurrently = op.get_context().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block():
+        _backfill('stockmoves')
+        _backfill('stockquants')
+        # indexes last: building them once is cheaper than updating them per chunk
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=concurrently)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    with op.batch_alter_table('stockquants') as batch_op:
+        batch_op.drop_constraint('fk_stockquants_warehouse_id_warehouses', type_='foreignkey')
+        batch_op.drop_column('warehouse_id')
+    with op.batch_alter_table('stockmoves') as batch_op:
+        batch_op.drop_constraint('fk_stockmoves_dest_warehouse_id_warehouses', type_='foreignkey')
+        batch_op.drop_constraint('fk_stockmoves_source_warehouse_id_warehouses', type_='foreignkey')
+        batch_op.drop_column('dest_warehouse_id')
+        batch_op.drop_column('source_warehouse_id')
@@ -0,0 +1,70 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite file unless `DATABASE_URL` is
+already set, so they never touch a developer's `dev.db`. Import this module
+before anything from `src.stockmaster` so the URL is in place when the
+database module creates its engine.
+"""
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+if not os.getenv("DATABASE_URL"):
+    _tmpdir = tempfile.mkdtemp(prefix="stockmaster-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+
+
+def timed(fn, repeat: int = 5):
+    """Run `fn` `repeat` times and return the median wall time in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def percentile(samples, pct):
+    """Return the `pct` percentile of `samples` (nearest rank), or NaN if empty."""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def auth_headers(client, email: str = "bench@example.com", password: str = "Bench#Pass1") -> dict:
+    """Register (if needed) a benchmark user and return bearer auth headers."""
+    client.post("/users/", json={"email": email, "password": password, "full_name": "Bench"})
+    r = client.post("/token", data={"username": email, "password": password})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def free_port() -> int:
+    """Return a free local TCP port."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(base_url: str, server, timeout: float = 30, path: str = "/products/1") -> None:
+    """Poll `path` until the `server` process answers, or raise if it exits or times out."""
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            httpx.get(base_url + path, timeout=1).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("uvicorn did not become ready")
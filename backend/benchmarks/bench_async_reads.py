@@ -0,0 +1,223 @@
+"""Async vs. sync read endpoints at high concurrency.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.bench_async_reads [--concurrency 32 128] [--duration 5] [--rows 2000]
+
+Seeds a throwaway database and starts uvicorn on this module's `app`: the
+real application (whose hot reads run on the `AsyncSession` engine) plus
+sync copies of the same endpoints under `/sync`, which go through
+`SessionLocal` and Starlette's threadpool as before. Each endpoint pair is
+driven by each `--concurrency` level of clients for `--duration` seconds;
+the table shows requests per second and p50/p99 latency for both paths.
+
+Once concurrency exceeds the threadpool (40 threads), the sync path can
+stall: every thread waits for a pooled connection while the sessions holding
+connections need a thread to close. Those requests fail after
+`DB_POOL_TIMEOUT` and show up in the `errors` column.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+from . import _common
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from src.stockmaster import models, schemas
+from src.stockmaster.deps import get_current_user, get_db
+from src.stockmaster.main import app
+from src.stockmaster.services import dashboard as dashboard_service
+from src.stockmaster.services import ledger as ledger_service
+from src.stockmaster.services import moves as moves_service
+from src.stockmaster.services import product as product_service
+from src.stockmaster.services import quants as quants_service
+
+sync_router = APIRouter(prefix="/sync")
+
+
+@sync_router.get("/dashboard/kpis")
+def sync_kpis(db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
+    return dashboard_service.get_kpis(db)
+
+
+@sync_router.get("/moves/", response_model=List[schemas.StockMoveOut])
+def sync_moves(limit: int = 100, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
+    return moves_service.list_moves(db, limit=limit)
+
+
+@sync_router.get("/quants/", response_model=List[schemas.StockQuantOut])
+def sync_quants(limit: int = 200, db: Session = Depends(get_db, scope="function")):
+    return quants_service.list_quants(db, limit=limit)
+
+
+@sync_router.get("/ledger/", response_model=List[schemas.StockLedgerOut])
+def sync_ledger(limit: int = 200, db: Session = Depends(get_db, scope="function")):
+    return ledger_service.list_ledger(db, limit=limit)
+
+
+@sync_router.get("/products/", response_model=List[schemas.ProductOut])
+def sync_products(limit: int = 100, db: Session = Depends(get_db, scope="function")):
+    return product_service.list_products(db, limit=limit)
+
+
+@sync_router.get("/products/{product_id}", response_model=schemas.ProductOut)
+def sync_product(product_id: int, db: Session = Depends(get_db, scope="function")):
+    return product_service.get_product(db, product_id)
+
+
+app.include_router(sync_router)
+
+ENDPOINTS = (
+    "/dashboard/kpis",
+    "/quants/?limit=200",
+    "/moves/?limit=100",
+    "/ledger/?limit=200",
+    "/products/?limit=100",
+    "/products/1",
+)
+
+
+def seed(rows: int) -> str:
+    """Fill the benchmark database and return a bearer token."""
+    from src.stockmaster.database import SessionLocal, init_db
+    from src.stockmaster.services import auth as auth_service, hashing
+
+    init_db()
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        db.execute(models.Warehouse.__table__.insert(), [{"id": 1, "name": "Main"}])
+        db.execute(
+            models.Location.__table__.insert(),
+            [{"id": i, "name": f"Loc {i}", "type": models.LocationType.internal.name, "warehouse_id": 1, "path": f"/{i}/"} for i in range(1, 11)],
+        )
+        products = max(1, rows // 10)
+        db.execute(
+            models.Product.__table__.insert(),
+            [
+                {"id": i, "name": f"Product {i}", "sku": f"SKU-{i}", "category": f"cat-{i % 5}",
+                 "min_stock_level": 10, "created_at": now, "updated_at": now}
+                for i in range(1, products + 1)
+            ],
+        )
+        db.execute(
+            models.StockQuant.__table__.insert(),
+            [
+                {"product_id": p, "location_id": loc, "warehouse_id": 1, "quantity": Decimal(p % 40), "reserved_qty": Decimal(0), "updated_at": now}
+                for p in range(1, products + 1)
+                for loc in (1 + p % 10, 1 + (p + 5) % 10)
+            ],
+        )
+        db.execute(
+            models.StockOperation.__table__.insert(),
+            [
+                {"reference": f"OP-{i}", "source_loc_id": 1, "dest_loc_id": 2,
+                 "status": list(models.OperationStatus)[i % len(models.OperationStatus)].name,
+                 "operation_type": list(models.OperationType)[i % len(models.OperationType)].name,
+                 "scheduled_date": now + timedelta(days=i % 7 - 3), "created_at": now, "updated_at": now}
+                for i in range(1, rows // 10 + 1)
+            ],
+        )
+        db.execute(
+            models.StockMove.__table__.insert(),
+            [
+                {"product_id": 1 + i % products, "source_loc_id": 1 + i % 10, "dest_loc_id": 1 + (i + 1) % 10,
+                 "source_warehouse_id": 1, "dest_warehouse_id": 1, "quantity": Decimal("2.5"), "date": now - timedelta(minutes=i)}
+                for i in range(rows)
+            ],
+        )
+        db.execute(
+            models.StockLedger.__table__.insert(),
+            [
+                {"product_id": 1 + i % products, "location_id": 1 + i % 10, "change_qty": Decimal("2.5"),
+                 "resulting_qty": Decimal(i % 50), "reason": "bench", "date": now - timedelta(minutes=i)}
+                for i in range(rows)
+            ],
+        )
+        db.commit()
+        user = auth_service.create_user(
+            db, schemas.UserCreate(email="bench@example.com", password="Bench#Pass1", full_name="Bench")
+        )
+        db.commit()
+        return auth_service.create_user_token(user)
+    finally:
+        db.close()
+        hashing.shutdown()
+
+
+async def drive(base_url: str, path: str, headers: dict, concurrency: int, duration: float) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies: List[float] = []
+    errors = 0
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=120) as client:
+        deadline = time.perf_counter() + duration
+
+        async def user():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    r = await client.get(path)
+                    r.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": _common.percentile(latencies, 50) * 1000,
+        "p99_ms": _common.percentile(latencies, 99) * 1000,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[32, 128])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {seed(args.rows)}"}
+    port = _common.free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.bench_async_reads:app",
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=_common.BACKEND_DIR, env=dict(os.environ),
+        # pool timeouts on the sync path are counted in the `errors` column
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _common.wait_ready(base_url, server)
+        print(f"duration={args.duration}s rows={args.rows}")
+        print(f"{'endpoint':<22} {'conc':>5} {'path':<6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'errors':>6}")
+        for concurrency in args.concurrency:
+            for path in ENDPOINTS:
+                for label, prefix in (("sync", "/sync"), ("async", "")):
+                    r = asyncio.run(drive(base_url, prefix + path, headers, concurrency, args.duration))
+                    print(
+                        f"{path:<22} {concurrency:>5} {label:<6} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} "
+                        f"{r['p99_ms']:>9.1f} {r['errors']:>6}",
+                        flush=True,
+                    )
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
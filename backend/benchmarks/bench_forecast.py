@@ -0,0 +1,65 @@
+"""Demand forecast run time over a large catalogue and a long history.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.bench_forecast [--products 50000] [--days 730] [--moves 5000000] [--repeat 3]
+
+Loads a `datagen` dataset with `--products` products and `--moves` stock
+moves spread over the last `--days` days, adds one reorder rule per product
+and warehouse plus one warehouse-less rule per product, and times
+`forecasting.run` for both methods, with the time split into the grouped
+query, the matrix build, the vectorized forecast and the bulk write-back.
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from . import _common, datagen
+from .bench_replenishment import seed_rules
+
+from src.stockmaster.database import get_primary_engine, session_scope
+from src.stockmaster.services import forecasting
+
+
+def _run(method: str, history_days: int, now) -> tuple:
+    start = time.perf_counter()
+    with session_scope() as db:
+        result = forecasting.run(db, method=method, history_days=history_days, now=now)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--warehouses", type=int, default=2)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--moves", type=int, default=5_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    scale = datagen.Scale(
+        products=args.products, warehouses=args.warehouses, locations_per_warehouse=5,
+        operations=1_000, lines_per_operation=2, moves=args.moves, ledger=0, days=args.days,
+    )
+    print(f"database: {get_primary_engine().url} ({args.products} products, {args.moves} moves over {args.days} days)")
+    report = datagen.generate(scale, seed=args.seed, verbose=False)
+    print(f"generated in {sum(report['seconds'].values()):.1f} s")
+    print(f"rules: {seed_rules(scale, args.products * (args.warehouses + 1), args.seed)}")
+
+    # the datagen reference time, so the whole history is in the window
+    now = datagen.Generator(scale).now - timedelta(seconds=1)
+    for method in forecasting.METHODS:
+        samples = []
+        for _ in range(args.repeat):
+            elapsed, result = _run(method, args.days, now)
+            samples.append(elapsed)
+        parts = "  ".join(f"{k} {v:.2f}" for k, v in result["seconds"].items())
+        print(
+            f"{method}: {sorted(samples)[len(samples) // 2]:7.2f} s median  "
+            f"({result['rules']} rules, {result['series']} series x {result['history_days']} days; {parts})"
+        )
+
+
+if __name__ == "__main__":
+    main()
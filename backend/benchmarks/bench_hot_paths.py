@@ -0,0 +1,209 @@
+"""Hot-path latency at several dataset sizes, saved as JSON for comparison.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.bench_hot_paths [--scales tiny small medium] [--repeat 30] [--output hot_paths.json]
+    python -m benchmarks.bench_hot_paths --compare before.json after.json [--threshold 1.25]
+
+Each scale runs in a fresh process against a fresh SQLite file filled by
+`benchmarks.datagen` (same seed, so runs on different commits see identical
+data). It then times, with random products/operations on every repetition:
+
+- `inventory.check_availability`, `inventory.validate_operation` (a different
+  not-yet-done operation each time) and `inventory.get_current_stock`;
+- `moves.list_moves` unfiltered and filtered by product, warehouse, status and
+  document type;
+- `GET /dashboard/kpis` (all warehouses and one) and `GET /operations/`
+  through the full app.
+
+The JSON holds the git commit, dialect, Python version and per-scale
+median/p95/min milliseconds. `--compare` prints the median ratio of every
+case present in both files and exits with status 1 if any is slower than
+`--threshold`.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+
+def _cases():
+    from src.stockmaster import models
+    from src.stockmaster.services import inventory, moves
+
+    return {
+        "check_availability": lambda db, ctx: inventory.check_availability(db, ctx["rng"].choice(ctx["open_ops"])),
+        "validate_operation": lambda db, ctx: inventory.validate_operation(db, ctx["to_validate"].pop()),
+        "get_current_stock": lambda db, ctx: inventory.get_current_stock(db, ctx["product"]()),
+        "get_current_stock@location": lambda db, ctx: inventory.get_current_stock(db, ctx["product"](), ctx["location"]()),
+        "list_moves": lambda db, ctx: moves.list_moves(db, limit=50),
+        "list_moves?product_id": lambda db, ctx: moves.list_moves(db, limit=50, product_id=ctx["product"]()),
+        "list_moves?warehouse_id": lambda db, ctx: moves.list_moves(db, limit=50, warehouse_id=ctx["warehouse"]()),
+        "list_moves?status": lambda db, ctx: moves.list_moves(db, limit=50, status=models.OperationStatus.done.value),
+        "list_moves?document_type": lambda db, ctx: moves.list_moves(
+            db, limit=50, document_type=models.OperationType.receipt.value
+        ),
+        "GET /dashboard/kpis": lambda db, ctx: ctx["client"].get("/dashboard/kpis", headers=ctx["headers"]).raise_for_status(),
+        "GET /dashboard/kpis?warehouse_id": lambda db, ctx: ctx["client"].get(
+            f"/dashboard/kpis?warehouse_id={ctx['warehouse']()}", headers=ctx["headers"]
+        ).raise_for_status(),
+        "GET /operations/": lambda db, ctx: ctx["client"].get(
+            "/operations/?limit=50", headers=ctx["headers"]
+        ).raise_for_status(),
+    }
+
+
+def child(scale_name: str, repeat: int, seed: int) -> None:
+    from . import _common, datagen
+    from fastapi.testclient import TestClient
+    from sqlalchemy import select
+
+    from src.stockmaster import models
+    from src.stockmaster.database import SessionLocal, get_primary_engine, session_scope
+    from src.stockmaster.main import app
+
+    scale = datagen.SCALES[scale_name]
+    load = datagen.generate(scale, seed=seed, verbose=False)
+
+    rng = random.Random(seed)
+    with SessionLocal() as db:
+        open_ops = db.execute(
+            select(models.StockOperation.id)
+            .where(models.StockOperation.status != models.OperationStatus.done)
+            .order_by(models.StockOperation.id)
+        ).scalars().all()
+    ctx = {
+        "rng": rng,
+        "open_ops": open_ops,
+        # validated operations are done afterwards, so each repetition takes a new one
+        "to_validate": rng.sample(open_ops, min(repeat, len(open_ops))),
+        "product": lambda: rng.randrange(1, scale.products + 1),
+        "location": lambda: rng.randrange(1, scale.warehouses * scale.locations_per_warehouse + 1),
+        "warehouse": lambda: rng.randrange(1, scale.warehouses + 1),
+    }
+
+    results = {}
+    with TestClient(app) as client:
+        ctx["client"] = client
+        ctx["headers"] = _common.auth_headers(client)
+        for name, fn in _cases().items():
+            runs = len(ctx["to_validate"]) if name == "validate_operation" else repeat
+            # one untimed call warms the statement caches and the page cache
+            if name != "validate_operation":
+                with session_scope() as db:
+                    fn(db, ctx)
+            samples = []
+            for _ in range(runs):
+                # services only flush; the commit is part of the cost, as in a request
+                start = time.perf_counter()
+                with session_scope() as db:
+                    fn(db, ctx)
+                samples.append(time.perf_counter() - start)
+            results[name] = {
+                "runs": len(samples),
+                "median_ms": round(statistics.median(samples) * 1000, 3),
+                "p95_ms": round(_common.percentile(samples, 95) * 1000, 3),
+                "min_ms": round(min(samples) * 1000, 3),
+            }
+    print(json.dumps({
+        "dialect": get_primary_engine().dialect.name,
+        "load": load,
+        "cases": results,
+    }))
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(before_path: str, after_path: str, threshold: float) -> bool:
+    """Print median ratios (after / before); return False if any exceeds `threshold`."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"before: {before['commit']} ({before['created_at']})  after: {after['commit']} ({after['created_at']})")
+    print(f"{'scale':<8} {'case':<28} {'before ms':>10} {'after ms':>10} {'ratio':>7}")
+    ok = True
+    for scale, result in after["scales"].items():
+        old_cases = before["scales"].get(scale, {}).get("cases", {})
+        for name, new in result["cases"].items():
+            if name not in old_cases:
+                continue
+            old = old_cases[name]
+            ratio = new["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+            flag = "  SLOWER" if ratio > threshold else ""
+            ok = ok and not flag
+            print(f"{scale:<8} {name:<28} {old['median_ms']:>10.2f} {new['median_ms']:>10.2f} {ratio:>6.2f}x{flag}")
+    return ok
+
+
+def main() -> None:
+    from .datagen import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", default=["tiny", "small", "medium"], choices=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="hot_paths.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--threshold", type=float, default=1.25, help="--compare fails above this median ratio")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        if not compare(*args.compare, args.threshold):
+            sys.exit(1)
+        return
+    if args.child:
+        child(args.child, args.repeat, args.seed)
+        return
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    print(f"{'scale':<8} {'case':<28} {'median ms':>10} {'p95 ms':>9} {'min ms':>8}")
+    for scale in args.scales:
+        tmpdir = tempfile.mkdtemp(prefix="stockmaster-hot-")
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmpdir}/bench.db",
+            # EXPLAINs of slow statements would be timed along with the query
+            SLOW_QUERY_MS="0",
+        )
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_hot_paths", "--child", scale,
+             "--repeat", str(args.repeat), "--seed", str(args.seed)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        report["dialect"] = result["dialect"]
+        report["scales"][scale] = result
+        for name, r in result["cases"].items():
+            print(f"{scale:<8} {name:<28} {r['median_ms']:>10.2f} {r['p95_ms']:>9.2f} {r['min_ms']:>8.2f}", flush=True)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
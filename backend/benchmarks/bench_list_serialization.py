@@ -0,0 +1,86 @@
+"""Compare the default and `fast=true` rendering of `/moves` and `/quants`.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.bench_list_serialization [--sizes 1000 10000] [--repeat 5]
+
+Each size seeds that many stock moves and quants, then requests the whole
+page through the ORM/`response_model` path and through the column-tuple fast
+path, printing the median latency of each and the speedup.
+"""
+import argparse
+from datetime import datetime
+from decimal import Decimal
+
+from . import _common
+from fastapi.testclient import TestClient
+
+from src.stockmaster import models
+from src.stockmaster.database import SessionLocal, engine, init_db
+from src.stockmaster.main import app
+
+
+def seed(n: int) -> None:
+    init_db()
+    db = SessionLocal()
+    try:
+        db.query(models.StockMove).delete()
+        db.query(models.StockQuant).delete()
+        db.query(models.Product).delete()
+        db.query(models.Location).delete()
+        db.commit()
+        db.execute(
+            models.Location.__table__.insert(),
+            [{"id": 1, "name": "Stock", "type": models.LocationType.internal.name, "path": "/1/"}],
+        )
+        now = datetime.utcnow()
+        db.execute(
+            models.Product.__table__.insert(),
+            [
+                {"id": i, "name": f"Product {i}", "sku": f"SKU-{i}", "min_stock_level": 0, "created_at": now, "updated_at": now}
+                for i in range(1, n + 1)
+            ],
+        )
+        db.execute(
+            models.StockMove.__table__.insert(),
+            [
+                {"product_id": i, "source_loc_id": None, "dest_loc_id": 1, "quantity": Decimal("12.5000"), "date": now}
+                for i in range(1, n + 1)
+            ],
+        )
+        db.execute(
+            models.StockQuant.__table__.insert(),
+            [
+                {"product_id": i, "location_id": 1, "quantity": Decimal("12.5000"), "reserved_qty": Decimal("0"), "updated_at": now}
+                for i in range(1, n + 1)
+            ],
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"database: {engine.url}")
+    print(f"{'endpoint':<10} {'rows':>7} {'default ms':>11} {'fast ms':>9} {'speedup':>8}")
+    with TestClient(app) as client:
+        headers = _common.auth_headers(client)
+        for n in args.sizes:
+            seed(n)
+            for path in ("/moves/", "/quants/"):
+                url = f"{path}?limit={n}"
+                slow = client.get(url, headers=headers)
+                fast = client.get(url + "&fast=true", headers=headers)
+                assert slow.json() == fast.json(), f"fast path diverges for {path}"
+                t_slow = _common.timed(lambda: client.get(url, headers=headers), args.repeat)
+                t_fast = _common.timed(lambda: client.get(url + "&fast=true", headers=headers), args.repeat)
+                print(f"{path:<10} {n:>7} {t_slow * 1000:>11.1f} {t_fast * 1000:>9.1f} {t_slow / t_fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Login burst vs. stock endpoint latency, with and without the hashing pool.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.bench_login_burst [--logins 100] [--pollers 8] [--workers 0 2]
+
+For each `HASH_POOL_WORKERS` value a fresh process fires `--logins` concurrent
+`POST /token` requests while `--pollers` clients keep requesting
+`GET /products/`. It reports login throughput and the p50/p99 latency of the
+product requests served during the burst. `0` is the inline (pre-pool)
+behaviour.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from ._common import percentile
+
+
+async def burst(app, logins: int, pollers: int) -> dict:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        done = asyncio.Event()
+        latencies = []
+        busy = 0
+
+        async def poll():
+            while not done.is_set():
+                start = time.perf_counter()
+                r = await client.get("/products/")
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        async def login():
+            nonlocal busy
+            r = await client.post("/token", data={"username": "burst@example.com", "password": "Burst#Pass1"})
+            if r.status_code == 503:
+                busy += 1
+            else:
+                r.raise_for_status()
+
+        poll_tasks = [asyncio.create_task(poll()) for _ in range(pollers)]
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await asyncio.gather(*poll_tasks)
+
+    return {
+        "logins_per_s": (logins - busy) / elapsed,
+        "rejected": busy,
+        "products_requests": len(latencies),
+        "products_p50_ms": percentile(latencies, 50) * 1000,
+        "products_p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def child(logins: int, pollers: int) -> None:
+    from . import _common  # noqa: F401  (sets up sys.path and a temp DATABASE_URL)
+    from src.stockmaster import schemas
+    from src.stockmaster.database import init_db, session_scope
+    from src.stockmaster.main import app
+    from src.stockmaster.services import auth as auth_service, hashing
+
+    init_db()
+    with session_scope() as db:
+        if not auth_service.get_user_by_email(db, "burst@example.com"):
+            auth_service.create_user(
+                db, schemas.UserCreate(email="burst@example.com", password="Burst#Pass1", full_name="Burst")
+            )
+    try:
+        result = asyncio.run(burst(app, logins, pollers))
+    finally:
+        hashing.shutdown()
+    print(json.dumps(result))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--pollers", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.logins, args.pollers)
+        return
+
+    print(f"{'workers':>7} {'logins/s':>9} {'rejected':>8} {'/products n':>11} {'p50 ms':>8} {'p99 ms':>8}")
+    for workers in args.workers:
+        env = dict(os.environ, HASH_POOL_WORKERS=str(workers))
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_login_burst", "--child",
+             "--logins", str(args.logins), "--pollers", str(args.pollers)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{workers:>7} {r['logins_per_s']:>9.1f} {r['rejected']:>8} {r['products_requests']:>11} "
+            f"{r['products_p50_ms']:>8.1f} {r['products_p99_ms']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Reorder-rule run time against a `datagen` dataset.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.bench_replenishment [--scale small] [--rules 100000] [--repeat 3]
+
+Loads a `datagen` dataset, adds `--rules` reorder rules (products x
+warehouses, then warehouse-less rules, with a mix of min/max and lot sizes)
+and times `replenishment.run`: dry runs first, then one real run that
+creates the draft receipts, and a second real run that should find the
+first run's receipts incoming and order nothing more. Dry runs of
+`rebalancing.run` (inter-warehouse transfers) are timed on the same data.
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from . import _common, datagen
+
+from src.stockmaster import models
+from src.stockmaster.database import get_primary_engine, session_scope
+from src.stockmaster.services import rebalancing, replenishment
+
+
+def seed_rules(scale: datagen.Scale, n: int, seed: int, batch_size: int = 20_000) -> int:
+    rng = random.Random(f"{seed}:rules")
+    warehouses = [*range(1, scale.warehouses + 1), None]
+
+    def rows():
+        for i in range(n):
+            min_qty = rng.randrange(0, 200)
+            yield {
+                "product_id": i % scale.products + 1,
+                "warehouse_id": warehouses[(i // scale.products) % len(warehouses)],
+                "min_qty": Decimal(min_qty),
+                "max_qty": Decimal(min_qty + rng.randrange(0, 300)) if rng.random() < 0.7 else None,
+                "reorder_qty": Decimal(rng.choice((6, 12, 24))) if rng.random() < 0.3 else None,
+            }
+
+    with get_primary_engine().begin() as conn:
+        return datagen._insert(conn, models.ReorderRule.__table__, rows(), batch_size)
+
+
+def _run(dry_run: bool, service=replenishment) -> tuple:
+    start = time.perf_counter()
+    with session_scope() as db:
+        result = service.run(db, dry_run=dry_run)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=list(datagen.SCALES), default="small")
+    parser.add_argument("--rules", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    scale = datagen.SCALES[args.scale]
+    print(f"database: {get_primary_engine().url} ({args.scale})")
+    datagen.generate(scale, seed=args.seed, verbose=False)
+    print(f"rules: {seed_rules(scale, args.rules, args.seed)}")
+
+    samples = []
+    for _ in range(args.repeat):
+        elapsed, result = _run(dry_run=True)
+        samples.append(elapsed)
+    print(
+        f"dry run:    {sorted(samples)[len(samples) // 2]:7.2f} s median  "
+        f"({result['rules_evaluated']} rules, {result['rules_triggered']} triggered, {len(result['orders'])} receipts)"
+    )
+    samples = []
+    for _ in range(args.repeat):
+        elapsed, rebalance = _run(dry_run=True, service=rebalancing)
+        samples.append(elapsed)
+    print(
+        f"rebalance:  {sorted(samples)[len(samples) // 2]:7.2f} s median  "
+        f"({rebalance['products_short']} products short, {len(rebalance['transfers'])} transfers, "
+        f"shortfall {rebalance['shortfall_before']:.0f} -> {rebalance['shortfall_after']:.0f})"
+    )
+    elapsed, result = _run(dry_run=False)
+    lines = sum(len(o["lines"]) for o in result["orders"])
+    print(f"real run:   {elapsed:7.2f} s         ({len(result['orders'])} receipts, {lines} lines created)")
+    elapsed, result = _run(dry_run=False)
+    print(f"second run: {elapsed:7.2f} s         ({result['rules_triggered']} triggered)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Concurrent write throughput on SQLite: stock settings vs. the tuned profile.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.bench_sqlite_writers [--writers 1 8 32] [--readers 4] [--duration 5]
+
+Each profile runs in a fresh process against a fresh SQLite file:
+
+- `default`: `SQLITE_PROFILE=default` (rollback journal, no writer queue).
+- `wal`: tuned pragmas, but writers race for the database lock.
+- `tuned`: tuned pragmas and the in-process single-writer lock.
+
+For every `--writers` level, that many threads run stock-validation-shaped
+write transactions (update a quant, insert a move and a ledger row, commit)
+while `--readers` threads list moves. The table reports committed writes per
+second, write p50/p99, failed writes ("database is locked") and reads per
+second.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+PROFILES = {
+    "default": {"SQLITE_PROFILE": "default"},
+    "wal": {"SQLITE_PROFILE": "tuned", "SQLITE_SERIALIZE_WRITES": "0"},
+    "tuned": {"SQLITE_PROFILE": "tuned", "SQLITE_SERIALIZE_WRITES": "1"},
+}
+
+
+def child(writers_levels, readers: int, duration: float) -> None:
+    from . import _common
+    from sqlalchemy.exc import OperationalError
+
+    from src.stockmaster import models
+    from src.stockmaster.database import SessionLocal, init_db
+    from src.stockmaster.services import moves as moves_service
+
+    init_db()
+    n_products = max(writers_levels)
+    db = SessionLocal()
+    try:
+        db.add(models.Location(id=1, name="Stock", type=models.LocationType.internal))
+        db.add_all(models.Product(id=i, name=f"P{i}", sku=f"SKU-{i}") for i in range(1, n_products + 1))
+        db.flush()
+        db.add_all(
+            models.StockQuant(product_id=i, location_id=1, quantity=Decimal(0)) for i in range(1, n_products + 1)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    def write_once(product_id: int) -> None:
+        db = SessionLocal()
+        try:
+            quant = db.query(models.StockQuant).filter_by(product_id=product_id, location_id=1).one()
+            quant.quantity = quant.quantity + 1
+            move = models.StockMove(product_id=product_id, source_loc_id=None, dest_loc_id=1, quantity=Decimal(1))
+            db.add(move)
+            db.flush()
+            db.add(models.StockLedger(
+                product_id=product_id, location_id=1, change_qty=Decimal(1),
+                resulting_qty=quant.quantity, move_id=move.id, reason="bench",
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    results = []
+    for writers in writers_levels:
+        stop = threading.Event()
+        latencies, errors, reads = [], [0], [0]
+        lock = threading.Lock()
+
+        def writer(product_id: int) -> None:
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    write_once(product_id)
+                except OperationalError:
+                    with lock:
+                        errors[0] += 1
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+        def reader() -> None:
+            while not stop.is_set():
+                db = SessionLocal()
+                try:
+                    moves_service.list_moves(db, limit=50)
+                    with lock:
+                        reads[0] += 1
+                except OperationalError:
+                    pass
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=writer, args=(i + 1,)) for i in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        results.append({
+            "writers": writers,
+            "writes_per_s": len(latencies) / elapsed,
+            "p50_ms": _common.percentile(latencies, 50) * 1000,
+            "p99_ms": _common.percentile(latencies, 99) * 1000,
+            "errors": errors[0],
+            "reads_per_s": reads[0] / elapsed,
+        })
+    print(json.dumps(results))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.writers, args.readers, args.duration)
+        return
+
+    print(f"{'profile':<8} {'writers':>7} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>9} {'errors':>6} {'reads/s':>8}")
+    for profile in args.profiles:
+        tmpdir = tempfile.mkdtemp(prefix="stockmaster-sqlite-")
+        env = dict(
+            os.environ,
+            **PROFILES[profile],
+            DATABASE_URL=f"sqlite:///{tmpdir}/bench.db",
+            # enough connections that the pool never limits the threads
+            DB_POOL_SIZE=str(max(args.writers) + args.readers),
+            DB_MAX_OVERFLOW="0",
+        )
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_sqlite_writers", "--child",
+             "--writers", *map(str, args.writers), "--readers", str(args.readers),
+             "--duration", str(args.duration)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        for r in json.loads(out.stdout.strip().splitlines()[-1]):
+            print(
+                f"{profile:<8} {r['writers']:>7} {r['writes_per_s']:>9.1f} {r['p50_ms']:>8.1f} "
+                f"{r['p99_ms']:>9.1f} {r['errors']:>6} {r['reads_per_s']:>8.1f}",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Worker cold-start time: process spawn to first served request.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.bench_startup [--runs 5] [--target-ms 2500]
+
+Each run starts `uvicorn src.stockmaster.main:app` in a fresh process against
+an already-migrated database (the common case for a rolling deploy) and polls
+`GET /docs` until it answers. A separate in-process run breaks the boot down
+into module import and the startup handler. Exits with status 1 when the
+median boot time exceeds `--target-ms`.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from . import _common
+
+
+def child() -> None:
+    """Time importing the app and running its startup handlers, in-process."""
+    import asyncio
+
+    start = time.perf_counter()
+    from src.stockmaster.main import app
+
+    imported = time.perf_counter()
+    asyncio.run(app.router.startup())
+    started = time.perf_counter()
+    print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (started - imported) * 1000}))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def boot_once(env: dict) -> float:
+    import httpx
+
+    port = _free_port()
+    # one client for all polls: building a client per poll would steal CPU from the booting worker
+    client = httpx.Client(timeout=1)
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.stockmaster.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=_common.BACKEND_DIR, env=env,
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                if client.get(f"http://127.0.0.1:{port}/docs").status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+    finally:
+        client.close()
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=2500)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    env = dict(os.environ)
+    # The first run creates and stamps the schema; it is not counted.
+    phases = [
+        json.loads(
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+                cwd=_common.BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+        )
+        for _ in range(args.runs + 1)
+    ][1:]
+    boots = [boot_once(env) * 1000 for _ in range(args.runs)]
+
+    median = statistics.median(boots)
+    print(f"database: {os.environ.get('DATABASE_URL', '(from .env or the dev default)')}")
+    print(f"import   median {statistics.median(p['import_ms'] for p in phases):8.1f} ms")
+    print(f"startup  median {statistics.median(p['startup_ms'] for p in phases):8.1f} ms")
+    print(f"boot     median {median:8.1f} ms  (min {min(boots):.1f}, max {max(boots):.1f}; target {args.target_ms:.0f} ms)")
+    if median > args.target_ms:
+        print("boot time over target")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Query-plan regression check for the hot inventory queries.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.check_query_plans [--products 2000] [--moves 50000] [--verbose]
+
+Seeds a throwaway database with `benchmarks.datagen` (or uses the one at
+`DATABASE_URL` as-is when it already has products), runs each hot query
+through the real service code while capturing the SQL it sends, and EXPLAINs every captured statement.
+Exits with status 1 if any of them reads one of the large inventory tables
+with a full table scan (SQLite `SCAN <table>` without an index, Postgres
+`Seq Scan`), e.g. after an index was dropped or a query stopped matching one.
+"""
+import argparse
+import json
+import re
+import sys
+
+from . import _common, datagen
+from sqlalchemy import event, func, select
+
+from src.stockmaster import migrations, models
+from src.stockmaster.api.routers import operations as operations_router
+from src.stockmaster.database import SessionLocal, engine
+from src.stockmaster.services import dashboard, inventory, ledger, moves
+
+# Tables large enough that a full scan on a request path is a regression
+HOT_TABLES = ("stockmoves", "stockoperations", "stockoperationlines", "stockledger", "stockquants")
+
+
+def _warehouse(db, location_id: int) -> int:
+    return db.get(models.Location, location_id).warehouse_id
+
+
+# name -> (callable(db, product_id, location_id), tables a full scan is expected on)
+HOT_QUERIES = {
+    "stock at location (move sums)": (
+        lambda db, p, l: inventory._current_stock_for_product_at_location(db, p, l), ()
+    ),
+    "stock for product (move sums)": (lambda db, p, l: inventory.get_current_stock(db, p), ()),
+    "reserved at location": (lambda db, p, l: inventory._reserved_stock_for_product_at_location(db, p, l), ()),
+    # aggregates over every product / operation: reading them all is the point
+    "kpi stock levels": (lambda db, p, l: db.execute(dashboard.kpi_statements()["stock"]).all(), ("stockquants",)),
+    # one warehouse: the quants' own warehouse_id index, no location join
+    "kpi stock levels for warehouse": (
+        lambda db, p, l: db.execute(dashboard.kpi_statements(_warehouse(db, l))["stock"]).all(), ()
+    ),
+    "kpi operations by type/status": (
+        lambda db, p, l: db.execute(dashboard.kpi_statements()["operations"]).all(), ("stockoperations",)
+    ),
+    "kpi scheduled internal transfers": (
+        lambda db, p, l: db.execute(dashboard.kpi_statements()["scheduled_internal"]).all(), ()
+    ),
+    "move list": (lambda db, p, l: moves.list_moves(db, limit=50), ()),
+    "move list for product": (lambda db, p, l: moves.list_moves(db, limit=50, product_id=p), ()),
+    "move list for warehouse": (lambda db, p, l: moves.list_moves(db, limit=50, warehouse_id=_warehouse(db, l)), ()),
+    "ledger list": (lambda db, p, l: ledger.list_ledger(db, limit=50), ()),
+    "operation list": (
+        lambda db, p, l: operations_router.list_operations(
+            skip=0, limit=50, search=None, status=None, partner_id=None, operation_type=None,
+            fields=None, db=db, current_user=None,
+        ),
+        (),
+    ),
+}
+
+
+def capture_selects(db, fn) -> list:
+    """Run `fn()` and return the (statement, parameters) of every SELECT it sent."""
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", _capture)
+    try:
+        fn()
+    finally:
+        event.remove(bind, "before_cursor_execute", _capture)
+    return captured
+
+
+def _sqlite_full_scans(conn, statement, parameters):
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    plan = [row[-1] for row in rows]
+    # "SCAN stockmoves" reads the table; "SCAN stockmoves USING [COVERING] INDEX ..." walks an index
+    scanned = [m.group(1) for m in (re.match(r"SCAN (\w+)(?: AS \w+)?$", d) for d in plan) if m]
+    return scanned, plan
+
+
+def _postgres_full_scans(conn, statement, parameters):
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scanned, stack = [], [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if node["Node Type"] == "Seq Scan":
+            scanned.append(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return scanned, [json.dumps(plan[0]["Plan"], indent=1)]
+
+
+def _hot_table(name: str):
+    for table in HOT_TABLES:
+        # SQLAlchemy aliases tables as "<table>_<n>"
+        if name == table or re.fullmatch(rf"{table}_\d+", name):
+            return table
+    return None
+
+
+def check(verbose: bool = False) -> bool:
+    full_scans = _sqlite_full_scans if engine.dialect.name == "sqlite" else _postgres_full_scans
+    ok = True
+    db = SessionLocal()
+    try:
+        product_id = db.execute(select(func.min(models.StockMove.product_id))).scalar()
+        location_id = db.execute(select(func.min(models.StockMove.dest_loc_id))).scalar()
+        for name, (query, allowed) in HOT_QUERIES.items():
+            statements = capture_selects(db, lambda: query(db, product_id, location_id))
+            problems = []
+            for statement, parameters in statements:
+                scanned, plan = full_scans(db.connection(), statement, parameters)
+                bad = sorted({t for t in map(_hot_table, scanned) if t and t not in allowed})
+                if bad:
+                    problems.append(bad)
+                if verbose or bad:
+                    print(f"  -- {' '.join(statement.split())[:160]}")
+                    for line in plan:
+                        print(f"     {line}")
+            ok = ok and not problems
+            status = "OK" if not problems else "FULL SCAN: " + ", ".join(sorted({t for p in problems for t in p}))
+            print(f"{name:<36} {len(statements):>3} stmt  {status}")
+    finally:
+        db.close()
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--moves", type=int, default=50000)
+    parser.add_argument("--operations", type=int, default=10000)
+    parser.add_argument("--ledger", type=int, default=50000)
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not just failing ones")
+    args = parser.parse_args()
+
+    print(f"database: {engine.url}")
+    migrations.ensure_schema(engine)
+    with SessionLocal() as db:
+        has_data = db.execute(select(models.Product.id).limit(1)).first() is not None
+    if has_data:
+        print("database already has products; checking plans against the existing data")
+    else:
+        scale = datagen.Scale(
+            products=args.products, warehouses=2, locations_per_warehouse=10, operations=args.operations,
+            lines_per_operation=2, moves=args.moves, ledger=args.ledger,
+        )
+        datagen.generate(scale, verbose=False)
+    if not check(args.verbose):
+        print("query plans regressed: hot queries fall back to full table scans")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
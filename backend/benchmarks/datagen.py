@@ -0,0 +1,309 @@
+"""Seeded synthetic dataset generator.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.datagen --scale medium
+    python -m benchmarks.datagen --products 20000 --moves 20000000 [--seed 7]
+
+Fills an empty database (`DATABASE_URL`, or a throwaway SQLite file) with
+warehouses and their locations (the first location of each warehouse is the
+parent of the others), products, operations with lines, stock moves, ledger
+rows and the stock quants those moves imply. The same seed and counts always
+produce the same data.
+
+Rows are generated lazily and bulk-inserted in batches of `--batch-size`.
+The secondary indexes of the move and ledger tables are dropped during the
+load and rebuilt afterwards, which is several times faster than maintaining
+them row by row. At roughly 15-20 us per move on SQLite, 10M moves take about
+3 minutes.
+"""
+import argparse
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from . import _common
+from sqlalchemy import case, func, literal, select, text, union_all
+
+from src.stockmaster import migrations, models
+from src.stockmaster.database import get_primary_engine
+
+
+@dataclass
+class Scale:
+    products: int
+    warehouses: int
+    locations_per_warehouse: int
+    operations: int
+    lines_per_operation: int
+    moves: int
+    ledger: int
+    # operations, moves and ledger rows are dated over the last `days` days
+    days: int = 365
+
+
+SCALES = {
+    "tiny": Scale(200, 1, 5, 500, 2, 5_000, 1_000),
+    "small": Scale(1_000, 2, 10, 5_000, 3, 100_000, 20_000),
+    "medium": Scale(10_000, 5, 20, 50_000, 3, 1_000_000, 200_000),
+    "large": Scale(50_000, 10, 50, 500_000, 3, 10_000_000, 1_000_000),
+    "xlarge": Scale(100_000, 20, 50, 2_000_000, 3, 50_000_000, 5_000_000),
+}
+
+# Tables whose secondary indexes are rebuilt after the load
+DEFERRED_INDEX_TABLES = (models.StockMove.__table__, models.StockLedger.__table__)
+
+# Share of moves per kind: (operation type, source kind, dest kind)
+MOVE_KINDS = [
+    (models.OperationType.receipt, "vendor", "internal", 0.35),
+    (models.OperationType.delivery, "internal", "customer", 0.35),
+    (models.OperationType.internal, "internal", "internal", 0.25),
+    (models.OperationType.adjustment, "internal", "loss", 0.05),
+]
+
+
+def _batches(rows: Iterable[dict], size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _each(items, fn) -> None:
+    for item in items:
+        fn(item)
+
+
+def _insert(conn, table, rows: Iterable[dict], batch_size: int) -> int:
+    n = 0
+    for batch in _batches(rows, batch_size):
+        conn.execute(table.insert(), batch)
+        n += len(batch)
+    return n
+
+
+class Generator:
+    """Lazily yields the rows of each table for one scale and seed."""
+
+    def __init__(self, scale: Scale, seed: int = 42, now: datetime = None):
+        self.scale = scale
+        self.seed = seed
+        # fixed reference time so a seed always yields the same rows
+        self.now = now or datetime(2026, 1, 1)
+        n_internal = scale.warehouses * scale.locations_per_warehouse
+        self.internal_ids = list(range(1, n_internal + 1))
+        self.vendor_id, self.customer_id, self.loss_id = n_internal + 1, n_internal + 2, n_internal + 3
+        self._ends = {"vendor": [self.vendor_id], "customer": [self.customer_id], "loss": [self.loss_id]}
+
+    def _rng(self, table: str) -> random.Random:
+        # one stream per table, so changing one count does not reshuffle the others
+        return random.Random(f"{self.seed}:{table}")
+
+    def _when(self, rng: random.Random) -> datetime:
+        return self.now - timedelta(seconds=rng.randrange(self.scale.days * 24 * 3600))
+
+    def _end(self, rng: random.Random, kind: str) -> int:
+        return rng.choice(self.internal_ids) if kind == "internal" else self._ends[kind][0]
+
+    def _warehouse(self, loc_id: int) -> Optional[int]:
+        if loc_id > len(self.internal_ids):
+            return None
+        return (loc_id - 1) // self.scale.locations_per_warehouse + 1
+
+    def warehouses(self):
+        for w in range(1, self.scale.warehouses + 1):
+            yield {"id": w, "name": f"Warehouse {w}", "address": f"{w} Industrial Way"}
+
+    def locations(self):
+        per = self.scale.locations_per_warehouse
+        for loc_id in self.internal_ids:
+            w = (loc_id - 1) // per + 1
+            # the warehouse's first location is the parent of the others
+            root = (w - 1) * per + 1
+            yield {
+                "id": loc_id,
+                "name": f"WH{w}/Stock-{(loc_id - 1) % per + 1:02d}",
+                "type": models.LocationType.internal,
+                "warehouse_id": w,
+                "parent_id": None if loc_id == root else root,
+                "path": f"/{loc_id}/" if loc_id == root else f"/{root}/{loc_id}/",
+            }
+        for loc_id, name, loc_type in (
+            (self.vendor_id, "Vendors", models.LocationType.vendor),
+            (self.customer_id, "Customers", models.LocationType.customer),
+            (self.loss_id, "Inventory loss", models.LocationType.inventory_loss),
+        ):
+            yield {"id": loc_id, "name": name, "type": loc_type, "warehouse_id": None, "parent_id": None, "path": f"/{loc_id}/"}
+
+    def products(self):
+        rng = self._rng("products")
+        categories = ["Raw", "Packaging", "Finished", "Spare parts", "Consumables"]
+        for p in range(1, self.scale.products + 1):
+            yield {
+                "id": p,
+                "name": f"Product {p}",
+                "sku": f"SKU-{p:07d}",
+                "category": rng.choice(categories),
+                "uom": "unit",
+                "unit_price": Decimal(rng.randrange(100, 100000)) / 100,
+                "min_stock_level": rng.randrange(0, 50),
+                "initial_stock": Decimal(0),
+                "created_at": self._when(rng),
+                "updated_at": self.now,
+            }
+
+    def operations(self):
+        rng = self._rng("operations")
+        statuses = list(models.OperationStatus)
+        weights = [kind[3] for kind in MOVE_KINDS]
+        for op_id in range(1, self.scale.operations + 1):
+            op_type, src, dst, _ = rng.choices(MOVE_KINDS, weights)[0]
+            created = self._when(rng)
+            yield {
+                "id": op_id,
+                "reference": f"{op_type.value}/{op_id:07d}",
+                "source_loc_id": self._end(rng, src),
+                "dest_loc_id": self._end(rng, dst),
+                "status": rng.choice(statuses),
+                "operation_type": op_type,
+                "created_at": created,
+                "updated_at": created,
+                "scheduled_date": created + timedelta(days=rng.randrange(1, 30)) if rng.random() < 0.6 else None,
+            }
+
+    def operation_lines(self):
+        rng = self._rng("operation_lines")
+        for op_id in range(1, self.scale.operations + 1):
+            for _ in range(self.scale.lines_per_operation):
+                yield {
+                    "operation_id": op_id,
+                    "product_id": rng.randrange(1, self.scale.products + 1),
+                    "demand_qty": Decimal(rng.randrange(1, 50)),
+                    "done_qty": Decimal(0),
+                }
+
+    def moves(self):
+        rng = self._rng("moves")
+        weights = [kind[3] for kind in MOVE_KINDS]
+        for move_id in range(1, self.scale.moves + 1):
+            _, src, dst, _ = rng.choices(MOVE_KINDS, weights)[0]
+            product_id = rng.randrange(1, self.scale.products + 1)
+            source_loc_id, dest_loc_id = self._end(rng, src), self._end(rng, dst)
+            yield {
+                "id": move_id,
+                "product_id": product_id,
+                "source_loc_id": source_loc_id,
+                "dest_loc_id": dest_loc_id,
+                "source_warehouse_id": self._warehouse(source_loc_id),
+                "dest_warehouse_id": self._warehouse(dest_loc_id),
+                # receipts are larger than issues, so most stock stays positive
+                "quantity": Decimal(rng.randrange(20, 100) if src == "vendor" else rng.randrange(1, 40)),
+                "date": self._when(rng),
+                "reference_id": rng.randrange(1, self.scale.operations + 1) if rng.random() < 0.8 else None,
+            }
+
+    def ledger(self):
+        rng = self._rng("ledger")
+        for _ in range(self.scale.ledger):
+            yield {
+                "product_id": rng.randrange(1, self.scale.products + 1),
+                "location_id": rng.choice(self.internal_ids),
+                "change_qty": Decimal(rng.randrange(-20, 40)),
+                "resulting_qty": Decimal(rng.randrange(0, 500)),
+                "move_id": rng.randrange(1, self.scale.moves + 1) if self.scale.moves else None,
+                "operation_id": rng.randrange(1, self.scale.operations + 1) if self.scale.operations else None,
+                "reason": "datagen",
+                "date": self._when(rng),
+            }
+
+
+def _quants_from_moves(now: datetime):
+    """INSERT ... SELECT building on-hand quants (clamped at 0) from the moves."""
+    move = models.StockMove
+    flows = union_all(
+        select(move.product_id.label("product_id"), move.dest_loc_id.label("location_id"), move.quantity.label("qty")),
+        select(move.product_id, move.source_loc_id, -move.quantity),
+    ).subquery()
+    onhand = func.sum(flows.c.qty)
+    loc = models.Location
+    rows = (
+        select(
+            flows.c.product_id,
+            flows.c.location_id,
+            loc.warehouse_id,
+            case((onhand > 0, onhand), else_=0),
+            literal(0),
+            literal(now),
+        )
+        .join(loc, loc.id == flows.c.location_id)
+        .where(loc.type == models.LocationType.internal)
+        .group_by(flows.c.product_id, flows.c.location_id, loc.warehouse_id)
+    )
+    quant = models.StockQuant.__table__
+    return quant.insert().from_select(
+        ["product_id", "location_id", "warehouse_id", "quantity", "reserved_qty", "updated_at"], rows
+    )
+
+
+def generate(scale: Scale, seed: int = 42, batch_size: int = 20_000, verbose: bool = True) -> dict:
+    """Load a dataset into the (empty) primary database; return row counts and timings."""
+    engine = get_primary_engine()
+    migrations.ensure_schema(engine)
+    with engine.connect() as conn:
+        if conn.execute(select(models.Product.id).limit(1)).first() is not None:
+            raise SystemExit(f"{engine.url} already has products; datagen only loads into an empty database")
+
+    gen = Generator(scale, seed)
+    report = {"scale": asdict(scale), "seed": seed, "rows": {}, "seconds": {}}
+
+    def step(name, fn):
+        start = time.perf_counter()
+        result = fn()
+        report["seconds"][name] = round(time.perf_counter() - start, 2)
+        if result is not None:
+            report["rows"][name] = result
+        if verbose:
+            rows = f"{result:>12} rows" if result is not None else " " * 17
+            print(f"  {name:<20} {rows}  {report['seconds'][name]:8.2f} s", flush=True)
+
+    with engine.begin() as conn:
+        deferred = [ix for table in DEFERRED_INDEX_TABLES for ix in table.indexes]
+        step("drop indexes", lambda: _each(deferred, lambda ix: ix.drop(conn)))
+        step("warehouses", lambda: _insert(conn, models.Warehouse.__table__, gen.warehouses(), batch_size))
+        step("locations", lambda: _insert(conn, models.Location.__table__, gen.locations(), batch_size))
+        step("products", lambda: _insert(conn, models.Product.__table__, gen.products(), batch_size))
+        step("operations", lambda: _insert(conn, models.StockOperation.__table__, gen.operations(), batch_size))
+        step("operation lines", lambda: _insert(conn, models.StockOperationLine.__table__, gen.operation_lines(), batch_size))
+        step("moves", lambda: _insert(conn, models.StockMove.__table__, gen.moves(), batch_size))
+        step("ledger", lambda: _insert(conn, models.StockLedger.__table__, gen.ledger(), batch_size))
+        step("rebuild indexes", lambda: _each(deferred, lambda ix: ix.create(conn)))
+        step("quants", lambda: conn.execute(_quants_from_moves(gen.now)).rowcount)
+    with engine.begin() as conn:
+        # planner statistics, as a long-running database would have
+        step("analyze", lambda: conn.execute(text("ANALYZE")).close())
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=list(SCALES), default="small", help="preset counts (overridden by the flags below)")
+    for field in Scale.__dataclass_fields__:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, dest=field)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=20_000)
+    args = parser.parse_args()
+
+    scale = Scale(**{k: getattr(args, k) if getattr(args, k) is not None else v for k, v in asdict(SCALES[args.scale]).items()})
+    print(f"database: {get_primary_engine().url}")
+    report = generate(scale, args.seed, args.batch_size)
+    print(f"done in {sum(report['seconds'].values()):.1f} s")
+
+
+if __name__ == "__main__":
+    main()
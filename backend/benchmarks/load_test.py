@@ -0,0 +1,264 @@
+"""Scripted HTTP load test: virtual users replaying a realistic mix.
+
+Usage (from `backend/`):
+
+    python -m benchmarks.load_test [--concurrency 8 32] [--duration 30] [--scale small] [--think-ms 0]
+
+Seeds a throwaway database with `benchmarks.datagen`, registers `--users`
+accounts and starts uvicorn on the real app. For each `--concurrency` level
+that many virtual users log in (`POST /token`, round-robin over the accounts)
+and then, for `--duration` seconds, repeatedly pick a scenario by weight:
+
+- browse products: a product list page, then one product;
+- poll the dashboard KPIs;
+- receive: create a receipt from the vendor location and validate it;
+- deliver: create a delivery to the customer location, check availability
+  and validate it when ready;
+- page history: move list pages, the ledger and the operation list.
+
+Everything runs locally. The report shows requests, errors, requests per
+second and p50/p95/p99 per endpoint (URL template, so `/products/{id}` is
+one row), plus the totals; `--output` also writes it as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from . import _common, datagen
+
+PASSWORD = "Load#Test1"
+
+
+class VirtualUser:
+    """One logged-in client session; records each request under its endpoint label."""
+
+    def __init__(self, client, stats: Dict[str, dict], scale: datagen.Scale, rng: random.Random, think: float):
+        self.client = client
+        self.stats = stats
+        self.scale = scale
+        self.rng = rng
+        self.think = think
+        self.headers = {}
+        n_internal = scale.warehouses * scale.locations_per_warehouse
+        self.vendor_id, self.customer_id = n_internal + 1, n_internal + 2
+
+    async def request(self, label: str, method: str, url: str, **kwargs) -> Optional[dict]:
+        import httpx
+
+        entry = self.stats[label]
+        start = time.perf_counter()
+        try:
+            r = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as exc:
+            entry["errors"][type(exc).__name__] += 1
+            return None
+        if r.is_error:
+            entry["errors"][str(r.status_code)] += 1
+            return None
+        entry["latencies"].append(time.perf_counter() - start)
+        return r.json()
+
+    async def login(self, email: str) -> bool:
+        body = await self.request("POST /token", "POST", "/token", data={"username": email, "password": PASSWORD})
+        if body is None:
+            return False
+        self.headers = {"Authorization": f"Bearer {body['access_token']}"}
+        return True
+
+    def product(self) -> int:
+        return self.rng.randrange(1, self.scale.products + 1)
+
+    def internal_location(self) -> int:
+        return self.rng.randrange(1, self.scale.warehouses * self.scale.locations_per_warehouse + 1)
+
+    def lines(self) -> List[dict]:
+        return [
+            {"product_id": self.product(), "demand_qty": self.rng.randrange(1, 10)}
+            for _ in range(self.rng.randrange(1, 4))
+        ]
+
+    async def browse_products(self) -> None:
+        skip = self.rng.randrange(0, max(1, self.scale.products - 50))
+        await self.request("GET /products/", "GET", f"/products/?skip={skip}&limit=50")
+        await self.request("GET /products/{id}", "GET", f"/products/{self.product()}")
+
+    async def poll_dashboard(self) -> None:
+        await self.request("GET /dashboard/kpis", "GET", "/dashboard/kpis")
+
+    async def _create(self, operation_type: str, source: int, dest: int) -> Optional[int]:
+        op = await self.request("POST /operations/", "POST", "/operations/", json={
+            "operation_type": operation_type,
+            "source_loc_id": source,
+            "dest_loc_id": dest,
+            "partner_id": None,
+            "scheduled_date": None,
+            "lines": self.lines(),
+        })
+        return op["id"] if op else None
+
+    async def receive(self) -> None:
+        op_id = await self._create("receipt", self.vendor_id, self.internal_location())
+        if op_id is not None:
+            await self.request("POST /operations/{id}/validate", "POST", f"/operations/{op_id}/validate")
+
+    async def deliver(self) -> None:
+        op_id = await self._create("delivery", self.internal_location(), self.customer_id)
+        if op_id is None:
+            return
+        check = await self.request("POST /operations/{id}/check", "POST", f"/operations/{op_id}/check")
+        if check and check["ready"]:
+            await self.request("POST /operations/{id}/validate", "POST", f"/operations/{op_id}/validate")
+
+    async def page_history(self) -> None:
+        for page in range(self.rng.randrange(1, 4)):
+            await self.request("GET /moves/", "GET", f"/moves/?skip={page * 50}&limit=50")
+        await self.request("GET /ledger/", "GET", "/ledger/?limit=50")
+        await self.request("GET /operations/", "GET", "/operations/?limit=50")
+
+    async def run(self, deadline: float) -> None:
+        scenarios = [(self.browse_products, 35), (self.poll_dashboard, 15), (self.receive, 10),
+                     (self.deliver, 10), (self.page_history, 30)]
+        funcs, weights = zip(*scenarios)
+        while time.perf_counter() < deadline:
+            await self.rng.choices(funcs, weights)[0]()
+            if self.think:
+                await asyncio.sleep(self.rng.expovariate(1 / self.think))
+
+
+async def run_level(base_url: str, emails: List[str], scale, concurrency: int, duration: float,
+                    think: float, seed: int) -> dict:
+    import httpx
+
+    stats = defaultdict(lambda: {"latencies": [], "errors": Counter()})
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        users = [
+            VirtualUser(client, stats, scale, random.Random(f"{seed}:{concurrency}:{i}"), think)
+            for i in range(concurrency)
+        ]
+        logged_in = await asyncio.gather(*(u.login(emails[i % len(emails)]) for i, u in enumerate(users)))
+        users = [u for u, ok in zip(users, logged_in) if ok]
+        start = time.perf_counter()
+        await asyncio.gather(*(u.run(start + duration) for u in users))
+        elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for label, entry in sorted(stats.items()):
+        samples = entry["latencies"]
+        # logins happen before the timed window; their rate is not meaningful
+        endpoints[label] = {
+            "requests": len(samples),
+            "errors": sum(entry["errors"].values()),
+            # status code (or transport exception) -> count
+            "error_kinds": dict(entry["errors"]),
+            "rps": None if label == "POST /token" else len(samples) / elapsed,
+            "p50_ms": _common.percentile(samples, 50) * 1000,
+            "p95_ms": _common.percentile(samples, 95) * 1000,
+            "p99_ms": _common.percentile(samples, 99) * 1000,
+        }
+    steady = [s for label, e in stats.items() if label != "POST /token" for s in e["latencies"]]
+    return {
+        "concurrency": concurrency,
+        "users_logged_in": len(users),
+        "elapsed_s": elapsed,
+        "total": {
+            "requests": len(steady),
+            "errors": sum(sum(e["errors"].values()) for label, e in stats.items() if label != "POST /token"),
+            "rps": len(steady) / elapsed,
+            "p50_ms": _common.percentile(steady, 50) * 1000,
+            "p95_ms": _common.percentile(steady, 95) * 1000,
+            "p99_ms": _common.percentile(steady, 99) * 1000,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def _print_level(result: dict) -> None:
+    print(f"\nconcurrency={result['concurrency']} ({result['users_logged_in']} users logged in, {result['elapsed_s']:.1f} s)")
+    print(f"{'endpoint':<32} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, r in [*result["endpoints"].items(), ("total", result["total"])]:
+        rps = f"{r['rps']:>8.1f}" if r["rps"] is not None else f"{'-':>8}"
+        print(
+            f"{label:<32} {r['requests']:>8} {r['errors']:>6} {rps} {r['p50_ms']:>8.1f} "
+            f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}",
+            flush=True,
+        )
+        if r.get("error_kinds"):
+            print(f"{'':<32} errors: " + ", ".join(f"{k} x{n}" for k, n in sorted(r["error_kinds"].items())))
+
+
+def seed_users(n: int) -> List[str]:
+    from src.stockmaster import schemas
+    from src.stockmaster.database import session_scope
+    from src.stockmaster.services import auth as auth_service, hashing
+
+    emails = [f"load{i}@example.com" for i in range(n)]
+    try:
+        with session_scope() as db:
+            for email in emails:
+                auth_service.create_user(db, schemas.UserCreate(email=email, password=PASSWORD, full_name="Load"))
+    finally:
+        hashing.shutdown()
+    return emails
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--scale", choices=list(datagen.SCALES), default="small")
+    parser.add_argument("--users", type=int, default=20, help="accounts the virtual users log in as")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between scenarios (exponential)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    scale = datagen.SCALES[args.scale]
+    print(f"database: {os.environ['DATABASE_URL']} ({args.scale})")
+    datagen.generate(scale, seed=args.seed, verbose=False)
+    emails = seed_users(args.users)
+
+    port = _common.free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        # keep the slow-query log of the run out of the working tree
+        SLOW_QUERY_LOG_FILE=os.path.join(tempfile.mkdtemp(prefix="stockmaster-load-"), "slow_queries.jsonl"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.stockmaster.main:app", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=_common.BACKEND_DIR, env=env,
+    )
+    results = []
+    try:
+        _common.wait_ready(base_url, server)
+        for concurrency in args.concurrency:
+            result = asyncio.run(run_level(
+                base_url, emails, scale, concurrency, args.duration, args.think_ms / 1000, args.seed
+            ))
+            _print_level(result)
+            results.append(result)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    print(f"\nslow-query log: {env['SLOW_QUERY_LOG_FILE']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"scale": args.scale, "duration_s": args.duration, "think_ms": args.think_ms,
+                       "workers": args.workers, "levels": results}, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 """Routers package. Exposes router modules for main app."""
-from . import auth, operations, dashboard, products, locations, moves, quants, ledger, warehouses, partners, reorder_rules, users
+from . import auth, operations, dashboard, products, locations, moves, quants, ledger, warehouses, partners, reorder_rules, users, internal, metrics
 
 __all__ = [
 	"auth",
@@ -14,4 +14,6 @@ __all__ = [
 	"partners",
 	"reorder_rules",
 	"users",
+	"internal",
+	"metrics",
 ]
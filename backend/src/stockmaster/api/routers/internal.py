@@ -0,0 +1,90 @@
+"""Internal operational endpoints (metrics for capacity planning)."""
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from ... import database, models, pooling, profiling, slow_queries, sqlite_profile
+from ...core import config
+from ...deps import get_current_user
+
+# Every endpoint here exposes internals (SQL, hosts, errors): logged-in users only
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(get_current_user)])
+
+
+@router.get("/metrics/db")
+def db_metrics():
+    """Connection pool usage and checkout wait times for this worker."""
+    stats = {"primary": pooling.pool_stats(database.engine)}
+    if database.async_engine is not None:
+        stats["primary_async"] = pooling.pool_stats(database.async_engine.sync_engine)
+    if database.has_read_replica():
+        stats["replica"] = pooling.pool_stats(database.read_engine)
+    if database.async_read_engine is not None:
+        stats["replica_async"] = pooling.pool_stats(database.async_read_engine.sync_engine)
+    writer = sqlite_profile.writer_stats()
+    if writer is not None and database.engine.dialect.name == "sqlite":
+        stats["sqlite_writer"] = writer
+    return stats
+
+
+@router.get("/slow-queries")
+def slow_query_report(
+    limit: int = Query(20, ge=1, le=500),
+    order_by: Literal["total_ms", "max_ms", "mean_ms", "count"] = "total_ms",
+    source: Literal["memory", "log"] = "memory",
+):
+    """Slow statements grouped by SQL template, worst first.
+
+    `source=memory` covers this worker since it started; `source=log` reads
+    the rotating slow-query log file(s).
+    """
+    return {
+        "threshold_ms": config.SLOW_QUERY_MS,
+        "source": source,
+        "queries": slow_queries.worst_offenders(limit, order_by, source),
+    }
+
+
+@router.get("/jobs")
+def job_report(limit: int = Query(50, ge=1, le=500)):
+    """Background jobs: next due time and current lease of each, and the latest runs."""
+    with database.SessionLocal() as db:
+        leases = db.query(models.JobLease).order_by(models.JobLease.name).all()
+        runs = db.query(models.JobRun).order_by(models.JobRun.id.desc()).limit(limit).all()
+        return {
+            "scheduler": config.SCHEDULER,
+            "jobs": [
+                {"name": l.name, "next_run_at": l.next_run_at, "owner": l.owner, "lease_until": l.lease_until}
+                for l in leases
+            ],
+            "runs": [
+                {
+                    "id": r.id, "job": r.job, "owner": r.owner, "status": r.status,
+                    "started_at": r.started_at, "finished_at": r.finished_at, "duration_ms": r.duration_ms,
+                    "chunks": r.chunks, "items": r.items, "error": r.error,
+                }
+                for r in runs
+            ],
+        }
+
+
+def require_profiling_token(x_profile: Optional[str] = Header(None)):
+    # profiles show code paths and timings; hide them unless the caller has the token
+    if not profiling.enabled() or not profiling.token_matches(x_profile):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/profiles", dependencies=[Depends(require_profiling_token)])
+def list_profiles():
+    """Stored request profiles, newest first (send `X-Profile: <PROFILING_TOKEN>`)."""
+    return {"directory": config.PROFILING_DIR, "profiles": profiling.list_profiles()}
+
+
+@router.get("/profiles/{name}", response_class=PlainTextResponse, dependencies=[Depends(require_profiling_token)])
+def get_profile(name: str):
+    """One profile in collapsed-stack format, ready for flamegraph.pl or speedscope."""
+    body = profiling.read_profile(name)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return body
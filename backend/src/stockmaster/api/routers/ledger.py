@@ -1,10 +1,12 @@
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ... import schemas
-from ...deps import get_db, get_current_user
+from ... import models, schemas
+from ...deps import field_selector, get_async_read_db, get_db, get_read_db, get_current_user
+from ...serialization import model_columns, render_rows, schema_fields
 from ...services import ledger as ledger_service
 from sqlalchemy.exc import NoResultFound
 
@@ -12,17 +14,28 @@ router = APIRouter(prefix="/ledger", tags=["ledger"])
 
 
 @router.post("/", response_model=schemas.StockLedgerOut, status_code=status.HTTP_201_CREATED)
-def create_ledger(entry: schemas.StockLedgerCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def create_ledger(entry: schemas.StockLedgerCreate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     return ledger_service.create_ledger(db, entry)
 
 
 @router.get("/", response_model=List[schemas.StockLedgerOut])
-def list_ledger(skip: int = 0, limit: int = 200, db: Session = Depends(get_db)):
-    return ledger_service.list_ledger(db, skip=skip, limit=limit)
+async def list_ledger(
+    skip: int = 0,
+    limit: int = 200,
+    fast: bool = False,
+    fields: Optional[List[str]] = Depends(field_selector(schemas.StockLedgerOut.model_fields)),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    if fast or fields:
+        names = fields or schema_fields(schemas.StockLedgerOut)
+        result = await db.execute(ledger_service.select_ledger(skip=skip, limit=limit, columns=model_columns(models.StockLedger, names)))
+        return render_rows(names, result.all())
+    result = await db.execute(ledger_service.select_ledger(skip=skip, limit=limit))
+    return result.scalars().all()
 
 
 @router.get("/{entry_id}", response_model=schemas.StockLedgerOut)
-def get_ledger(entry_id: int, db: Session = Depends(get_db)):
+def get_ledger(entry_id: int, db: Session = Depends(get_read_db)):
     try:
         return ledger_service.get_ledger(db, entry_id)
     except NoResultFound:
@@ -30,7 +43,7 @@ def get_ledger(entry_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{entry_id}", response_model=schemas.StockLedgerOut)
-def update_ledger(entry_id: int, changes: schemas.StockLedgerUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_ledger(entry_id: int, changes: schemas.StockLedgerUpdate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         return ledger_service.update_ledger(db, entry_id, changes)
     except NoResultFound:
@@ -38,7 +51,7 @@ def update_ledger(entry_id: int, changes: schemas.StockLedgerUpdate, db: Session
 
 
 @router.delete("/{entry_id}")
-def delete_ledger(entry_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def delete_ledger(entry_id: int, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         ledger_service.delete_ledger(db, entry_id)
         return {"detail": "deleted"}
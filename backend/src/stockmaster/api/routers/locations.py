@@ -3,44 +3,74 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from ... import schemas
-from ...deps import get_db, get_current_user
+from ... import models, schemas
+from ...deps import field_selector, get_db, get_read_db, get_current_user
+from ...serialization import model_columns, render_rows
 from ...services import locations as locations_service
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError, NoResultFound
 
 router = APIRouter(prefix="/locations", tags=["locations"])
 
 
 @router.post("/", response_model=schemas.LocationOut, status_code=status.HTTP_201_CREATED)
-def create_location(loc_in: schemas.LocationCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    return locations_service.create_location(db, loc_in)
+def create_location(loc_in: schemas.LocationCreate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
+    try:
+        return locations_service.create_location(db, loc_in)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.get("/", response_model=List[schemas.LocationOut])
-def list_locations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return locations_service.list_locations(db, skip=skip, limit=limit)
+def list_locations(
+    skip: int = 0,
+    limit: int = 100,
+    parent_id: Optional[int] = None,
+    fields: Optional[List[str]] = Depends(field_selector(schemas.LocationOut.model_fields)),
+    db: Session = Depends(get_read_db),
+):
+    if fields:
+        rows = locations_service.list_locations(
+            db, skip=skip, limit=limit, columns=model_columns(models.Location, fields), parent_id=parent_id
+        )
+        return render_rows(fields, rows)
+    return locations_service.list_locations(db, skip=skip, limit=limit, parent_id=parent_id)
 
 
 @router.get("/{loc_id}", response_model=schemas.LocationOut)
-def get_location(loc_id: int, db: Session = Depends(get_db)):
+def get_location(loc_id: int, db: Session = Depends(get_read_db)):
     try:
         return locations_service.get_location(db, loc_id)
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Location not found")
 
 
+@router.get("/{loc_id}/stock", response_model=List[schemas.LocationStock])
+def location_stock(loc_id: int, product_id: Optional[int] = None, db: Session = Depends(get_read_db)):
+    # the location and everything under it
+    try:
+        return locations_service.stock_under(db, loc_id, product_id=product_id)
+    except NoResultFound:
+        raise HTTPException(status_code=404, detail="Location not found")
+
+
 @router.put("/{loc_id}", response_model=schemas.LocationOut)
-def update_location(loc_id: int, changes: schemas.LocationUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_location(loc_id: int, changes: schemas.LocationUpdate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         return locations_service.update_location(db, loc_id, changes)
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Location not found")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.delete("/{loc_id}")
-def delete_location(loc_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def delete_location(loc_id: int, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         locations_service.delete_location(db, loc_id)
         return {"detail": "deleted"}
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Location not found")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Location is still in use by stock moves, quants or operations")
@@ -0,0 +1,13 @@
+"""Prometheus scrape endpoint."""
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ... import metrics
+
+router = APIRouter(tags=["internal"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Route latency, in-flight requests and business counters for this worker."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,34 +1,37 @@
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ... import schemas
-from ...deps import get_db, get_current_user
+from ... import models, schemas
+from ...deps import field_selector, get_async_read_db, get_db, get_read_db, get_current_user
+from ...serialization import model_columns, render_rows, schema_fields
 from ...services import moves as moves_service
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError, NoResultFound
 
 router = APIRouter(prefix="/moves", tags=["moves"])
 
 
 @router.post("/", response_model=schemas.StockMoveOut, status_code=status.HTTP_201_CREATED)
-def create_move(mv_in: schemas.StockMoveCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def create_move(mv_in: schemas.StockMoveCreate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     return moves_service.create_move(db, mv_in)
 
 
 @router.get("/", response_model=List[schemas.StockMoveOut])
-def list_moves(
+async def list_moves(
     skip: int = 0,
     limit: int = 100,
     document_type: Optional[str] = None,
     status_filter: Optional[str] = None,
     warehouse_id: Optional[int] = None,
     product_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    fast: bool = False,
+    fields: Optional[List[str]] = Depends(field_selector(schemas.StockMoveOut.model_fields)),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user=Depends(get_current_user),
 ):
-    return moves_service.list_moves(
-        db,
+    filters = dict(
         skip=skip,
         limit=limit,
         document_type=document_type,
@@ -36,10 +39,16 @@ def list_moves(
         warehouse_id=warehouse_id,
         product_id=product_id,
     )
+    if fast or fields:
+        names = fields or schema_fields(schemas.StockMoveOut)
+        result = await db.execute(moves_service.select_moves(columns=model_columns(models.StockMove, names), **filters))
+        return render_rows(names, result.all())
+    result = await db.execute(moves_service.select_moves(**filters))
+    return result.scalars().all()
 
 
 @router.get("/{move_id}", response_model=schemas.StockMoveOut)
-def get_move(move_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def get_move(move_id: int, db: Session = Depends(get_read_db), current_user=Depends(get_current_user)):
     try:
         return moves_service.get_move(db, move_id)
     except NoResultFound:
@@ -47,7 +56,7 @@ def get_move(move_id: int, db: Session = Depends(get_db), current_user=Depends(g
 
 
 @router.put("/{move_id}", response_model=schemas.StockMoveOut)
-def update_move(move_id: int, changes: schemas.StockMoveUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_move(move_id: int, changes: schemas.StockMoveUpdate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         return moves_service.update_move(db, move_id, changes)
     except NoResultFound:
@@ -55,9 +64,11 @@ def update_move(move_id: int, changes: schemas.StockMoveUpdate, db: Session = De
 
 
 @router.delete("/{move_id}")
-def delete_move(move_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def delete_move(move_id: int, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         moves_service.delete_move(db, move_id)
     except NoResultFound:
         raise HTTPException(status_code=404, detail="StockMove not found")
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="StockMove is still in use by ledger entries")
     return None
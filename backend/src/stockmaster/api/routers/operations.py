@@ -3,28 +3,49 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from ... import schemas
-from ...deps import get_db, get_current_user
+from ...deps import field_selector, get_db, get_read_db, get_current_user
 from ...services import inventory as inventory_service
+from ...services import rebalancing as rebalancing_service
 from ...types import OperationType
 from typing import List, Optional
+from collections import defaultdict
 from sqlalchemy import or_
+from sqlalchemy.orm import aliased, joinedload, selectinload
 from ... import models
-from ...services import inventory as inventory_service
+from ...serialization import render_rows
 
 router = APIRouter(prefix="/operations", tags=["operations"])
 
+_source_location = aliased(models.Location)
+_dest_location = aliased(models.Location)
+
+# Scalar fields of `GET /operations/` items mapped to the column that backs them.
+OPERATION_LIST_COLUMNS = {
+    "id": models.StockOperation.id,
+    "reference": models.StockOperation.reference,
+    "source_loc_id": models.StockOperation.source_loc_id,
+    "source_location_name": _source_location.name,
+    "dest_loc_id": models.StockOperation.dest_loc_id,
+    "dest_location_name": _dest_location.name,
+    "partner_id": models.StockOperation.partner_id,
+    "partner_name": models.Partner.name,
+    "scheduled_date": models.StockOperation.scheduled_date,
+    "status": models.StockOperation.status,
+    "operation_type": models.StockOperation.operation_type,
+}
+OPERATION_LIST_FIELDS = [*OPERATION_LIST_COLUMNS, "lines"]
+
 
 @router.post("/", response_model=schemas.StockOperationOut)
-def create_operation(op_in: schemas.StockOperationCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def create_operation(op_in: schemas.StockOperationCreate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     # persist who created the operation
     user_id = getattr(current_user, "id", None)
     op = inventory_service.create_operation(db, op_in, created_by_id=user_id)
-    db.refresh(op)
     return op
 
 
 @router.post("/receipts", response_model=schemas.StockOperationOut)
-def create_receipt(receipt_in: schemas.StockOperationCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def create_receipt(receipt_in: schemas.StockOperationCreate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     # Force operation_type to 'receipt' and require partner_id (supplier)
     data = receipt_in.model_dump()
     data["operation_type"] = OperationType.receipt
@@ -34,18 +55,23 @@ def create_receipt(receipt_in: schemas.StockOperationCreate, db: Session = Depen
     op_in = schemas.StockOperationCreate(**data)
     user_id = getattr(current_user, "id", None)
     op = inventory_service.create_operation(db, op_in, created_by_id=user_id)
-    db.refresh(op)
     return op
 
 
+@router.post("/rebalance", response_model=schemas.RebalanceRunOut)
+def rebalance(dry_run: bool = False, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
+    # draft internal transfers from warehouses with surplus to those below their reorder rule's min_qty
+    return rebalancing_service.run(db, dry_run=dry_run, created_by_id=getattr(current_user, "id", None))
+
+
 @router.post("/{operation_id}/check")
-def check_availability(operation_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def check_availability(operation_id: int, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     ok, msg = inventory_service.check_availability(db, operation_id)
     return {"ready": ok, "message": msg}
 
 
 @router.post("/{operation_id}/validate")
-def validate_operation(operation_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def validate_operation(operation_id: int, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     ok, msg = inventory_service.validate_operation(db, operation_id, user_id=current_user.id)
     if not ok:
         raise HTTPException(status_code=400, detail=msg)
@@ -60,10 +86,21 @@ def list_operations(
     status: Optional[str] = None,
     partner_id: Optional[int] = None,
     operation_type: Optional[str] = None,
-    db: Session = Depends(get_db),
+    fields: Optional[List[str]] = Depends(field_selector(OPERATION_LIST_FIELDS)),
+    db: Session = Depends(get_read_db),
     current_user=Depends(get_current_user),
 ):
-    q = db.query(models.StockOperation)
+    if fields:
+        q = _sparse_operations_query(db, fields)
+    else:
+        # Load the names and lines rendered below with the page (two queries)
+        # instead of lazily per operation
+        q = db.query(models.StockOperation).options(
+            joinedload(models.StockOperation.source_location),
+            joinedload(models.StockOperation.dest_location),
+            joinedload(models.StockOperation.partner),
+            selectinload(models.StockOperation.lines),
+        )
     if partner_id is not None:
         q = q.filter(models.StockOperation.partner_id == partner_id)
     if status is not None:
@@ -78,7 +115,10 @@ def list_operations(
     if search:
         like = f"%{search}%"
         q = q.filter(or_(models.StockOperation.reference.ilike(like), models.StockOperation.partner.has(models.Partner.name.ilike(like))))
-    ops = q.order_by(models.StockOperation.created_at.desc()).offset(skip).limit(limit).all()
+    q = q.order_by(models.StockOperation.created_at.desc()).offset(skip).limit(limit)
+    if fields:
+        return _render_sparse_operations(db, fields, q.all())
+    ops = q.all()
 
     # Build lightweight dicts including partner/location names to simplify frontend rendering
     out = []
@@ -110,8 +150,50 @@ def list_operations(
     return out
 
 
+def _sparse_operations_query(db: Session, fields: List[str]):
+    """Select only the columns backing `fields`, joining name lookups on demand.
+
+    The operation id is always selected first so lines can be attached.
+    """
+    q = db.query(models.StockOperation.id, *(OPERATION_LIST_COLUMNS[f] for f in fields if f != "lines"))
+    if "source_location_name" in fields:
+        q = q.outerjoin(_source_location, _source_location.id == models.StockOperation.source_loc_id)
+    if "dest_location_name" in fields:
+        q = q.outerjoin(_dest_location, _dest_location.id == models.StockOperation.dest_loc_id)
+    if "partner_name" in fields:
+        q = q.outerjoin(models.Partner, models.Partner.id == models.StockOperation.partner_id)
+    return q
+
+
+def _render_sparse_operations(db: Session, fields: List[str], rows):
+    scalar_fields = [f for f in fields if f != "lines"]
+    lines_by_op = defaultdict(list)
+    if "lines" in fields and rows:
+        # One query for the lines of the whole page instead of one per operation
+        line_rows = (
+            db.query(
+                models.StockOperationLine.operation_id,
+                models.StockOperationLine.id,
+                models.StockOperationLine.product_id,
+                models.StockOperationLine.demand_qty,
+                models.StockOperationLine.done_qty,
+            )
+            .filter(models.StockOperationLine.operation_id.in_([r[0] for r in rows]))
+            .order_by(models.StockOperationLine.id)
+        )
+        for op_id, line_id, product_id, demand_qty, done_qty in line_rows:
+            lines_by_op[op_id].append(
+                {"id": line_id, "product_id": product_id, "demand_qty": float(demand_qty), "done_qty": float(done_qty)}
+            )
+    out = []
+    for op_id, *values in rows:
+        item = dict(zip(scalar_fields, values))
+        out.append(tuple(lines_by_op[op_id] if f == "lines" else item[f] for f in fields))
+    return render_rows(fields, out)
+
+
 @router.get("/{operation_id}", response_model=schemas.StockOperationOut)
-def get_operation(operation_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def get_operation(operation_id: int, db: Session = Depends(get_read_db), current_user=Depends(get_current_user)):
     op = db.query(models.StockOperation).get(operation_id)
     if not op:
         raise HTTPException(status_code=404, detail="StockOperation not found")
@@ -120,7 +202,7 @@ def get_operation(operation_id: int, db: Session = Depends(get_db), current_user
 
 
 @router.patch("/{operation_id}", response_model=schemas.StockOperationOut)
-def update_operation(operation_id: int, changes: schemas.StockOperationUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_operation(operation_id: int, changes: schemas.StockOperationUpdate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     data = changes.model_dump()
     op = inventory_service.update_operation(db, operation_id, data)
     if not op:
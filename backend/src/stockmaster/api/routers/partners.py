@@ -1,28 +1,37 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from ... import schemas
-from ...deps import get_db, get_current_user
+from ... import models, schemas
+from ...deps import field_selector, get_db, get_read_db, get_current_user
+from ...serialization import model_columns, render_rows
 from ...services import partners as partners_service
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError, NoResultFound
 
 router = APIRouter(prefix="/partners", tags=["partners"])
 
 
 @router.post("/", response_model=schemas.PartnerOut, status_code=status.HTTP_201_CREATED)
-def create_partner(p_in: schemas.PartnerCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def create_partner(p_in: schemas.PartnerCreate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     return partners_service.create_partner(db, p_in)
 
 
 @router.get("/", response_model=List[schemas.PartnerOut])
-def list_partners(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def list_partners(
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[List[str]] = Depends(field_selector(schemas.PartnerOut.model_fields)),
+    db: Session = Depends(get_read_db),
+):
+    if fields:
+        rows = partners_service.list_partners(db, skip=skip, limit=limit, columns=model_columns(models.Partner, fields))
+        return render_rows(fields, rows)
     return partners_service.list_partners(db, skip=skip, limit=limit)
 
 
 @router.get("/{p_id}", response_model=schemas.PartnerOut)
-def get_partner(p_id: int, db: Session = Depends(get_db)):
+def get_partner(p_id: int, db: Session = Depends(get_read_db)):
     try:
         return partners_service.get_partner(db, p_id)
     except NoResultFound:
@@ -30,7 +39,7 @@ def get_partner(p_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{p_id}", response_model=schemas.PartnerOut)
-def update_partner(p_id: int, changes: schemas.PartnerUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_partner(p_id: int, changes: schemas.PartnerUpdate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         return partners_service.update_partner(db, p_id, changes)
     except NoResultFound:
@@ -38,9 +47,11 @@ def update_partner(p_id: int, changes: schemas.PartnerUpdate, db: Session = Depe
 
 
 @router.delete("/{p_id}")
-def delete_partner(p_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def delete_partner(p_id: int, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         partners_service.delete_partner(db, p_id)
         return {"detail": "deleted"}
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Partner not found")
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Partner is still in use by operations")
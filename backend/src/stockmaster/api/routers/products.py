@@ -1,10 +1,13 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ... import schemas
-from ...deps import get_db, get_current_user
+from ... import models, schemas
+from ...deps import field_selector, get_async_read_db, get_db, get_current_user
+from ...serialization import model_columns, render_rows
 from ...services import product as product_service
 
 router = APIRouter(prefix="/products", tags=["products"])
@@ -13,7 +16,7 @@ router = APIRouter(prefix="/products", tags=["products"])
 @router.post("/", response_model=schemas.ProductOut, status_code=status.HTTP_201_CREATED)
 def create_product(
     product_in: schemas.ProductCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     current_user = Depends(get_current_user),
 ):
     # check SKU uniqueness
@@ -25,20 +28,31 @@ def create_product(
 
 
 @router.get("/", response_model=List[schemas.ProductOut])
-def list_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return product_service.list_products(db, skip=skip, limit=limit)
+async def list_products(
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[List[str]] = Depends(field_selector(schemas.ProductOut.model_fields)),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    if fields:
+        result = await db.execute(
+            product_service.select_products(skip=skip, limit=limit, columns=model_columns(models.Product, fields))
+        )
+        return render_rows(fields, result.all())
+    result = await db.execute(product_service.select_products(skip=skip, limit=limit))
+    return result.scalars().all()
 
 
 @router.get("/{product_id}", response_model=schemas.ProductOut)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = product_service.get_product(db, product_id)
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    product = await db.get(models.Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
 
 @router.put("/{product_id}", response_model=schemas.ProductOut)
-def update_product(product_id: int, changes: schemas.ProductUpdate, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+def update_product(product_id: int, changes: schemas.ProductUpdate, db: Session = Depends(get_db, scope="function"), current_user = Depends(get_current_user)):
     product = product_service.get_product(db, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -47,9 +61,12 @@ def update_product(product_id: int, changes: schemas.ProductUpdate, db: Session
 
 
 @router.delete("/{product_id}")
-def delete_product(product_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+def delete_product(product_id: int, db: Session = Depends(get_db, scope="function"), current_user = Depends(get_current_user)):
     product = product_service.get_product(db, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    product_service.delete_product(db, product)
+    try:
+        product_service.delete_product(db, product)
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Product is still in use by quants, ledger entries or reorder rules")
     return {"detail": "deleted"}
@@ -1,10 +1,12 @@
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ... import schemas
-from ...deps import get_db, get_current_user
+from ... import models, schemas
+from ...deps import field_selector, get_async_read_db, get_db, get_read_db, get_current_user
+from ...serialization import model_columns, render_rows, schema_fields
 from ...services import quants as quants_service
 from sqlalchemy.exc import NoResultFound
 
@@ -12,17 +14,28 @@ router = APIRouter(prefix="/quants", tags=["quants"])
 
 
 @router.post("/", response_model=schemas.StockQuantOut, status_code=status.HTTP_201_CREATED)
-def create_quant(q_in: schemas.StockQuantCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def create_quant(q_in: schemas.StockQuantCreate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     return quants_service.create_quant(db, q_in)
 
 
 @router.get("/", response_model=List[schemas.StockQuantOut])
-def list_quants(skip: int = 0, limit: int = 200, db: Session = Depends(get_db)):
-    return quants_service.list_quants(db, skip=skip, limit=limit)
+async def list_quants(
+    skip: int = 0,
+    limit: int = 200,
+    fast: bool = False,
+    fields: Optional[List[str]] = Depends(field_selector(schemas.StockQuantOut.model_fields)),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    if fast or fields:
+        names = fields or schema_fields(schemas.StockQuantOut)
+        result = await db.execute(quants_service.select_quants(skip=skip, limit=limit, columns=model_columns(models.StockQuant, names)))
+        return render_rows(names, result.all())
+    result = await db.execute(quants_service.select_quants(skip=skip, limit=limit))
+    return result.scalars().all()
 
 
 @router.get("/{quant_id}", response_model=schemas.StockQuantOut)
-def get_quant(quant_id: int, db: Session = Depends(get_db)):
+def get_quant(quant_id: int, db: Session = Depends(get_read_db)):
     try:
         return quants_service.get_quant(db, quant_id)
     except NoResultFound:
@@ -30,7 +43,7 @@ def get_quant(quant_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{quant_id}", response_model=schemas.StockQuantOut)
-def update_quant(quant_id: int, changes: schemas.StockQuantUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_quant(quant_id: int, changes: schemas.StockQuantUpdate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         return quants_service.update_quant(db, quant_id, changes)
     except NoResultFound:
@@ -38,7 +51,7 @@ def update_quant(quant_id: int, changes: schemas.StockQuantUpdate, db: Session =
 
 
 @router.delete("/{quant_id}")
-def delete_quant(quant_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def delete_quant(quant_id: int, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         quants_service.delete_quant(db, quant_id)
         return {"detail": "deleted"}
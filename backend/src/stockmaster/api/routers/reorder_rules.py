@@ -1,28 +1,66 @@
-from typing import List
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
-from ... import schemas
-from ...deps import get_db, get_current_user
+from ... import models, schemas
+from ...core import config
+from ...deps import field_selector, get_db, get_read_db, get_current_user
+from ...serialization import model_columns, render_rows
 from ...services import reorder_rules as reorder_service
+from ...services import forecasting as forecasting_service
+from ...services import replenishment as replenishment_service
 from sqlalchemy.exc import NoResultFound
 
 router = APIRouter(prefix="/reorder-rules", tags=["reorder_rules"])
 
 
 @router.post("/", response_model=schemas.ReorderRuleOut, status_code=status.HTTP_201_CREATED)
-def create_rule(r_in: schemas.ReorderRuleCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def create_rule(r_in: schemas.ReorderRuleCreate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     return reorder_service.create_rule(db, r_in)
 
 
+@router.post("/run", response_model=schemas.ReplenishmentRunOut)
+def run_rules(dry_run: bool = False, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
+    # dry runs report what would be ordered and write nothing
+    return replenishment_service.run(db, dry_run=dry_run, created_by_id=getattr(current_user, "id", None))
+
+
+@router.post("/forecast", response_model=schemas.ForecastRunOut)
+def forecast_rules(
+    method: Literal["ses", "sma"] = config.FORECAST_METHOD,
+    alpha: float = Query(config.FORECAST_ALPHA, gt=0, le=1),
+    window: int = Query(config.FORECAST_WINDOW_DAYS, ge=1),
+    history_days: int = Query(config.FORECAST_HISTORY_DAYS, ge=7, le=3650),
+    lead_time_days: float = Query(config.FORECAST_LEAD_TIME_DAYS, ge=0),
+    cycle_days: float = Query(config.FORECAST_CYCLE_DAYS, gt=0),
+    service_level: float = Query(config.FORECAST_SERVICE_LEVEL, gt=0, lt=1),
+    apply: bool = False,
+    db: Session = Depends(get_db, scope="function"),
+    current_user=Depends(get_current_user),
+):
+    # suggestions land in the forecast columns; `apply` also rewrites min_qty / reorder_qty
+    return forecasting_service.run(
+        db, method=method, alpha=alpha, window=window, history_days=history_days,
+        lead_time_days=lead_time_days, cycle_days=cycle_days, service_level=service_level, apply=apply,
+    )
+
+
 @router.get("/", response_model=List[schemas.ReorderRuleOut])
-def list_rules(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def list_rules(
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[List[str]] = Depends(field_selector(schemas.ReorderRuleOut.model_fields)),
+    db: Session = Depends(get_read_db),
+):
+    if fields:
+        rows = reorder_service.list_rules(db, skip=skip, limit=limit, columns=model_columns(models.ReorderRule, fields))
+        return render_rows(fields, rows)
     return reorder_service.list_rules(db, skip=skip, limit=limit)
 
 
 @router.get("/{r_id}", response_model=schemas.ReorderRuleOut)
-def get_rule(r_id: int, db: Session = Depends(get_db)):
+def get_rule(r_id: int, db: Session = Depends(get_read_db)):
     try:
         return reorder_service.get_rule(db, r_id)
     except NoResultFound:
@@ -30,7 +68,7 @@ def get_rule(r_id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{r_id}", response_model=schemas.ReorderRuleOut)
-def update_rule(r_id: int, changes: schemas.ReorderRuleUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_rule(r_id: int, changes: schemas.ReorderRuleUpdate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         return reorder_service.update_rule(db, r_id, changes)
     except NoResultFound:
@@ -38,7 +76,7 @@ def update_rule(r_id: int, changes: schemas.ReorderRuleUpdate, db: Session = Dep
 
 
 @router.delete("/{r_id}")
-def delete_rule(r_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def delete_rule(r_id: int, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         reorder_service.delete_rule(db, r_id)
         return {"detail": "deleted"}
@@ -1,18 +1,28 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from ... import schemas
-from ...deps import get_db, get_current_user
+from ... import models, schemas
+from ...deps import field_selector, get_db, get_read_db, get_current_user
+from ...serialization import model_columns, render_rows
 from ...services import users as users_service
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError, NoResultFound
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/", response_model=List[schemas.UserOut])
-def list_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def list_users(
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[List[str]] = Depends(field_selector(schemas.UserOut.model_fields)),
+    db: Session = Depends(get_read_db),
+    current_user=Depends(get_current_user),
+):
+    if fields:
+        rows = users_service.list_users(db, skip=skip, limit=limit, columns=model_columns(models.User, fields))
+        return render_rows(fields, rows)
     return users_service.list_users(db, skip=skip, limit=limit)
 
 
@@ -24,7 +34,7 @@ def get_current_user_route(current_user=Depends(get_current_user)):
 
 
 @router.get("/{user_id}", response_model=schemas.UserOut)
-def get_user(user_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def get_user(user_id: int, db: Session = Depends(get_read_db), current_user=Depends(get_current_user)):
     try:
         return users_service.get_user(db, user_id)
     except NoResultFound:
@@ -32,7 +42,7 @@ def get_user(user_id: int, db: Session = Depends(get_db), current_user=Depends(g
 
 
 @router.put("/{user_id}", response_model=schemas.UserOut)
-def update_user(user_id: int, changes: schemas.UserUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_user(user_id: int, changes: schemas.UserUpdate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         return users_service.update_user(db, user_id, changes)
     except NoResultFound:
@@ -40,9 +50,11 @@ def update_user(user_id: int, changes: schemas.UserUpdate, db: Session = Depends
 
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def delete_user(user_id: int, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         users_service.delete_user(db, user_id)
         return {"detail": "deleted"}
     except NoResultFound:
         raise HTTPException(status_code=404, detail="User not found")
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="User is still in use by operations or ledger entries")
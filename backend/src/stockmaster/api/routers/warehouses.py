@@ -1,36 +1,53 @@
-from typing import List
+from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from ... import schemas
-from ...deps import get_db, get_current_user
+from ... import models, schemas
+from ...deps import field_selector, get_db, get_read_db, get_current_user
+from ...serialization import model_columns, render_rows
 from ...services import warehouses as warehouses_service
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError, NoResultFound
 
 router = APIRouter(prefix="/warehouses", tags=["warehouses"])
 
 
 @router.post("/", response_model=schemas.WarehouseOut, status_code=status.HTTP_201_CREATED)
-def create_warehouse(w_in: schemas.WarehouseCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def create_warehouse(w_in: schemas.WarehouseCreate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     return warehouses_service.create_warehouse(db, w_in)
 
 
 @router.get("/", response_model=List[schemas.WarehouseOut])
-def list_warehouses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def list_warehouses(
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[List[str]] = Depends(field_selector(schemas.WarehouseOut.model_fields)),
+    db: Session = Depends(get_read_db),
+):
+    if fields:
+        rows = warehouses_service.list_warehouses(db, skip=skip, limit=limit, columns=model_columns(models.Warehouse, fields))
+        return render_rows(fields, rows)
     return warehouses_service.list_warehouses(db, skip=skip, limit=limit)
 
 
 @router.get("/{w_id}", response_model=schemas.WarehouseOut)
-def get_warehouse(w_id: int, db: Session = Depends(get_db)):
+def get_warehouse(w_id: int, db: Session = Depends(get_read_db)):
     try:
         return warehouses_service.get_warehouse(db, w_id)
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Warehouse not found")
 
 
+@router.get("/{w_id}/stock", response_model=List[schemas.LocationStock])
+def warehouse_stock(w_id: int, product_id: Optional[int] = None, db: Session = Depends(get_read_db)):
+    try:
+        return warehouses_service.stock(db, w_id, product_id=product_id)
+    except NoResultFound:
+        raise HTTPException(status_code=404, detail="Warehouse not found")
+
+
 @router.put("/{w_id}", response_model=schemas.WarehouseOut)
-def update_warehouse(w_id: int, changes: schemas.WarehouseUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def update_warehouse(w_id: int, changes: schemas.WarehouseUpdate, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         return warehouses_service.update_warehouse(db, w_id, changes)
     except NoResultFound:
@@ -38,9 +55,11 @@ def update_warehouse(w_id: int, changes: schemas.WarehouseUpdate, db: Session =
 
 
 @router.delete("/{w_id}")
-def delete_warehouse(w_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+def delete_warehouse(w_id: int, db: Session = Depends(get_db, scope="function"), current_user=Depends(get_current_user)):
     try:
         warehouses_service.delete_warehouse(db, w_id)
         return {"detail": "deleted"}
     except NoResultFound:
         raise HTTPException(status_code=404, detail="Warehouse not found")
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Warehouse is still in use by locations, reorder rules, moves or quants")
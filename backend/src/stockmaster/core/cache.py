@@ -0,0 +1,73 @@
+"""Small in-process caches shared by services.
+
+`TTLCache` is a thread-safe LRU map whose entries also expire after a fixed
+time-to-live. It is process-local: with several uvicorn workers each keeps its
+own copy, so the TTL bounds how long a change made through another worker can
+stay invisible.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """LRU cache with a size cap and per-entry expiry."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def replace(self, key: Hashable, value: Any) -> bool:
+        """Update a live entry's value without extending its expiry."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] <= time.monotonic():
+                return False
+            self._data[key] = (value, item[1])
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def purge_expired(self) -> int:
+        """Drop expired entries and return how many were removed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._data.items() if expires_at <= now]
+            for k in expired:
+                del self._data[k]
+        return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -12,8 +12,125 @@ SECRET_KEY = os.getenv("STOCKMASTER_SECRET", "dev-secret-for-hackathon")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
+# Authenticated-user cache (see services.auth.get_current_user_from_token)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", "1024"))
+
+# Password hashing (see services.hashing). Unset Argon2 costs keep passlib's defaults.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST")) if os.getenv("ARGON2_TIME_COST") else None
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST")) if os.getenv("ARGON2_MEMORY_COST") else None
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM")) if os.getenv("ARGON2_PARALLELISM") else None
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", "2"))
+HASH_POOL_QUEUE_LIMIT = int(os.getenv("HASH_POOL_QUEUE_LIMIT", "16"))
+HASH_POOL_QUEUE_TIMEOUT = float(os.getenv("HASH_POOL_QUEUE_TIMEOUT", "5"))
+
+# Password-reset OTP storage (see services.otp_store): "memory" or "db"
+OTP_STORE = os.getenv("OTP_STORE", "memory")
+OTP_STORE_MAXSIZE = int(os.getenv("OTP_STORE_MAXSIZE", "10000"))
+OTP_RATE_LIMIT = int(os.getenv("OTP_RATE_LIMIT", "3"))
+OTP_RATE_WINDOW_SECONDS = int(os.getenv("OTP_RATE_WINDOW_SECONDS", "900"))
+OTP_PURGE_INTERVAL_SECONDS = int(os.getenv("OTP_PURGE_INTERVAL_SECONDS", "300"))
+
+# Outbound mail (see services.mailer). Without SMTP_HOST/SMTP_PORT mail is printed.
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "0") or 0)
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASS = os.getenv("SMTP_PASS")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1").lower() not in ("0", "false", "no")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+MAIL_FROM = os.getenv("MAIL_FROM")
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+MAIL_IDLE_SECONDS = float(os.getenv("MAIL_IDLE_SECONDS", "30"))
+MAIL_QUEUE_MAXSIZE = int(os.getenv("MAIL_QUEUE_MAXSIZE", "1000"))
+
 # Database url helper
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Async engine URL (see database.get_async_database_url); derived from DATABASE_URL when unset
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+# Optional read replica (see routing.py); reads stick to the primary for
+# READ_AFTER_WRITE_SECONDS after a client's write.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+READ_AFTER_WRITE_SECONDS = float(os.getenv("READ_AFTER_WRITE_SECONDS", "5"))
+READ_AFTER_WRITE_MAXSIZE = int(os.getenv("READ_AFTER_WRITE_MAXSIZE", "10000"))
+
+# Startup schema handling (see migrations.py): "revision" compares the Alembic
+# head with the database, "create_all" runs Base.metadata.create_all on every
+# boot (the old behaviour), "off" does nothing.
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "revision")
+
+# Connection pool (see pooling.py). DB_POOL_PRE_PING: "always", "idle" or "never".
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle")
+DB_POOL_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PING_IDLE_SECONDS", "30"))
+
+# SQLite profile (see sqlite_profile.py): "tuned" applies the pragmas below and
+# serializes writers in-process; "default" keeps SQLite's stock settings.
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned")
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB (SQLite convention): -65536 is a 64 MiB page cache
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_FOREIGN_KEYS = os.getenv("SQLITE_FOREIGN_KEYS", "1").lower() not in ("0", "false", "no")
+SQLITE_SERIALIZE_WRITES = os.getenv("SQLITE_SERIALIZE_WRITES", "1").lower() not in ("0", "false", "no")
+
+# Per-request SQL instrumentation (see instrumentation.py): statement count and
+# DB time in Server-Timing headers and logs, plus a warning when one statement
+# runs more than SQL_REPEAT_THRESHOLD times in a request (likely N+1).
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "1").lower() not in ("0", "false", "no")
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "10"))
+
+# Slow-query log (see slow_queries.py); SLOW_QUERY_MS=0 disables it. Plans are
+# captured at most once per template every SLOW_QUERY_EXPLAIN_INTERVAL seconds.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1").lower() not in ("0", "false", "no")
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+# empty (the default) keeps slow queries in memory only
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+
+# Request profiling (see profiling.py), off by default. Requests carrying
+# `X-Profile: <PROFILING_TOKEN>` are profiled on demand; PROFILING_SAMPLE_EVERY=N
+# also profiles one request in N. Profiles go to PROFILING_DIR, capped in size.
+PROFILING = os.getenv("PROFILING", "0").lower() not in ("0", "false", "no")
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILING_SAMPLE_EVERY = int(os.getenv("PROFILING_SAMPLE_EVERY", "0"))
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "2"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+PROFILING_DIR_MAX_BYTES = int(os.getenv("PROFILING_DIR_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# Background scheduler (see scheduler.py and jobs.py), off by default. Every
+# worker runs it; a lease row per job in the database makes one worker run each
+# due job. JOB_<NAME> sets a job's schedule: a 5-field cron expression,
+# "@hourly"/"@daily", or "@every 30s|5m|2h"; an empty value disables the job.
+SCHEDULER = os.getenv("SCHEDULER", "0").lower() not in ("0", "false", "no")
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "5"))
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "120"))
+SCHEDULER_HISTORY_DAYS = int(os.getenv("SCHEDULER_HISTORY_DAYS", "30"))
+JOB_AUTO_CHECK_OPERATIONS = os.getenv("JOB_AUTO_CHECK_OPERATIONS", "@every 5m")
+# opt-in: it overwrites quants maintained by hand through /quants
+JOB_QUANT_SNAPSHOT = os.getenv("JOB_QUANT_SNAPSHOT", "")
+JOB_REORDER = os.getenv("JOB_REORDER", "0 * * * *")
+JOB_OTP_CLEANUP = os.getenv("JOB_OTP_CLEANUP", "@every 10m")
+JOB_HISTORY_CLEANUP = os.getenv("JOB_HISTORY_CLEANUP", "@daily")
+JOB_FORECAST = os.getenv("JOB_FORECAST", "30 0 * * *")
+
+# Demand forecast for reorder rules (see services/forecasting.py): defaults of
+# POST /reorder-rules/forecast and of the `forecast` job. FORECAST_APPLY makes
+# the job overwrite min_qty / reorder_qty with the suggestions.
+FORECAST_METHOD = os.getenv("FORECAST_METHOD", "ses")
+FORECAST_ALPHA = float(os.getenv("FORECAST_ALPHA", "0.3"))
+FORECAST_WINDOW_DAYS = int(os.getenv("FORECAST_WINDOW_DAYS", "28"))
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "365"))
+FORECAST_LEAD_TIME_DAYS = float(os.getenv("FORECAST_LEAD_TIME_DAYS", "7"))
+FORECAST_CYCLE_DAYS = float(os.getenv("FORECAST_CYCLE_DAYS", "14"))
+FORECAST_SERVICE_LEVEL = float(os.getenv("FORECAST_SERVICE_LEVEL", "0.95"))
+FORECAST_APPLY = os.getenv("FORECAST_APPLY", "0").lower() not in ("0", "false", "no")
 
 # Helper values
 ACCESS_TOKEN_EXPIRE = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -4,20 +4,46 @@ This module exposes helpers for application runtime and for Alembic migration sc
 
 Key exports that Alembic expects (if you adapt `alembic/env.py`):
 - `get_database_url()` -> reads `DATABASE_URL` env var
-- `get_engine(url=None)` -> returns a SQLAlchemy Engine
+- `get_engine(url=None)` -> returns a new SQLAlchemy Engine
 - `metadata` -> the SQLAlchemy MetaData (Base.metadata)
 
+The app's own engine is created on first use (`get_primary_engine()`, also
+available as `database.engine`); `SessionLocal` binds to it lazily.
+
+Read-heavy async endpoints use `get_async_session()` instead of `SessionLocal`;
+its engine runs on asyncpg (Postgres) or aiosqlite (SQLite) and is created on
+first use.
+
+When `DATABASE_READ_URL` is set, `ReadSessionLocal` and
+`get_async_read_session()` use that replica; otherwise they are the primary
+(see `routing.py` for how requests pick one).
+
+Sessions are units of work: services `flush()` their changes and the caller
+owns the transaction, i.e. `deps.get_db` for requests and `session_scope()`
+for scripts and background jobs. Sessions do not expire objects on commit, so
+returning a just-written object never costs a reload; `on_commit()` defers
+side effects (metrics, cache invalidation) until the data is committed.
+
 Default DATABASE_URL is Postgres; for quick local dev you can set it to a sqlite URL.
 """
+import logging
 import os
-from typing import Optional
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from dotenv import load_dotenv
 
+from . import pooling
+
 # Load environment variables from .env when present (local dev convenience)
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 def get_database_url() -> str:
     """Return the database URL from environment.
@@ -39,18 +65,184 @@ def get_database_url() -> str:
     return "sqlite:///./backend/dev.db"
 
 
+def get_read_database_url() -> Optional[str]:
+    """Return the read-replica URL from `DATABASE_READ_URL`, or None."""
+    return os.getenv("DATABASE_READ_URL") or None
+
+
+# Async driver used for each backend when deriving the async URL
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def get_async_database_url(database_url: Optional[str] = None) -> str:
+    """Return the URL for the async engine.
+
+    `ASYNC_DATABASE_URL` wins when set; otherwise the sync URL is rewritten to
+    the backend's async driver, e.g. `postgresql+psycopg2://` becomes
+    `postgresql+asyncpg://` and `sqlite:///` becomes `sqlite+aiosqlite:///`.
+    """
+    if database_url is None and os.getenv("ASYNC_DATABASE_URL"):
+        return os.getenv("ASYNC_DATABASE_URL")
+    url = make_url(database_url or get_database_url())
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend!r} databases; set ASYNC_DATABASE_URL")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
 def get_engine(database_url: Optional[str] = None):
     """Create and return a SQLAlchemy engine.
 
+    Pool sizing, recycling and the pre-ping strategy come from the `DB_POOL_*`
+    settings (see `pooling.py`).
     Use this from Alembic's env.py if you need to create a connection for autogenerate.
     """
     url = database_url or get_database_url()
-    return create_engine(url, pool_pre_ping=True)
+    eng = create_engine(url, **pooling.engine_options(url))
+    pooling.configure_engine(eng)
+    return eng
+
+
+def get_async_engine(database_url: Optional[str] = None):
+    """Create and return an `AsyncEngine` with the same pool settings as `get_engine`."""
+    url = get_async_database_url(database_url)
+    eng = create_async_engine(url, **pooling.engine_options(url, asyncio=True))
+    pooling.configure_engine(eng.sync_engine)
+    return eng
+
+
+class LazySessionmaker(sessionmaker):
+    """`sessionmaker` that binds to the engine returned by `engine_factory` on first use."""
+
+    def __init__(self, engine_factory, **kw):
+        super().__init__(**kw)
+        self._engine_factory = engine_factory
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=self._engine_factory())
+        return super().__call__(**local_kw)
+
+
+# Engines are created on first use rather than at import, so importing the
+# app (workers, Alembic, scripts) does not build pools or load DB drivers.
+_engine = None
+_read_engine = None
+_engine_lock = threading.Lock()
+_read_url = get_read_database_url()
+
+
+def get_primary_engine():
+    """Return the process-wide primary engine, creating it on first call."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = get_engine()
+    return _engine
+
+
+def get_read_engine():
+    """Return the read-replica engine (the primary engine when none is configured)."""
+    global _read_engine
+    if _read_url is None:
+        return get_primary_engine()
+    if _read_engine is None:
+        with _engine_lock:
+            if _read_engine is None:
+                _read_engine = get_engine(_read_url)
+    return _read_engine
+
+
+def has_read_replica() -> bool:
+    return _read_url is not None
+
+
+def __getattr__(name):
+    # `database.engine` / `database.read_engine` keep working as module attributes
+    if name == "engine":
+        return get_primary_engine()
+    if name == "read_engine":
+        return get_read_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+SessionLocal = LazySessionmaker(get_primary_engine, autocommit=False, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = LazySessionmaker(get_read_engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Yield a primary session committed when the block exits normally, rolled back if it raises."""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def on_commit(db: Session, callback: Callable[[], None]) -> None:
+    """Run `callback()` after `db`'s current transaction commits; drop it if the transaction rolls back."""
+    db.info.setdefault("on_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session) -> None:
+    for callback in session.info.pop("on_commit", ()):
+        try:
+            callback()
+        except Exception:
+            # the data is committed; a failed side effect must not turn that into an error
+            logger.exception("on_commit callback failed")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_on_commit(session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop("on_commit", None)
+
+# The async engine is bound on first use so sync-only tooling (Alembic,
+# scripts) never needs the async driver installed.
+async_engine = None
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+async_read_engine = None
+AsyncReadSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def get_async_session() -> AsyncSession:
+    """Return a new `AsyncSession`, creating the async engine on first call."""
+    global async_engine
+    if async_engine is None:
+        async_engine = get_async_engine()
+        AsyncSessionLocal.configure(bind=async_engine)
+    return AsyncSessionLocal()
+
+
+def get_async_read_session() -> AsyncSession:
+    """Return a new `AsyncSession` on the read replica (the primary if none)."""
+    global async_read_engine
+    if not has_read_replica():
+        return get_async_session()
+    if async_read_engine is None:
+        async_read_engine = get_async_engine(_read_url)
+        AsyncReadSessionLocal.configure(bind=async_read_engine)
+    return AsyncReadSessionLocal()
+
 
+async def dispose_async_engine() -> None:
+    """Close the async engines' pooled connections (called on shutdown)."""
+    global async_engine, async_read_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+    if async_read_engine is not None:
+        await async_read_engine.dispose()
+        async_read_engine = None
 
-# Module-level engine/session for app runtime
-engine = get_engine()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -64,4 +256,4 @@ def init_db(engine_local: Optional[object] = None):
     Prefer using Alembic for schema migrations in most cases. This helper is useful
     for quick demos or tests.
     """
-    Base.metadata.create_all(bind=engine_local or engine)
+    Base.metadata.create_all(bind=engine_local or get_primary_engine())
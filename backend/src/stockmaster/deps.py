@@ -1,25 +1,71 @@
 """Dependency helpers for FastAPI routes."""
-from fastapi import Depends, HTTPException, status
+from typing import Iterable, List, Optional
+
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from .database import SessionLocal
+from . import routing
+from .database import ReadSessionLocal, SessionLocal, get_async_read_session, get_async_session, session_scope
 from .services import auth as auth_service
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 
 def get_db():
-    db = SessionLocal()
+    """Yield the request's unit of work: committed once the endpoint and its
+    response serialization succeed, rolled back if either raises.
+
+    Declare it as `Depends(get_db, scope="function")`; with the default
+    request scope FastAPI would run the commit after the response was sent.
+    """
+    with session_scope() as db:
+        yield db
+
+
+async def get_async_db():
+    """Yield an `AsyncSession` for async (read-heavy) endpoints."""
+    db = get_async_session()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def get_read_db(request: Request):
+    """Yield a session for read-only endpoints: the replica unless the client just wrote."""
+    db = SessionLocal() if routing.use_primary(request) else ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_async_read_db(request: Request):
+    """Async counterpart of `get_read_db`."""
+    db = get_async_session() if routing.use_primary(request) else get_async_read_session()
     try:
-        user = auth_service.get_current_user_from_token(db, token)
+        yield db
+    finally:
+        await db.close()
+
+
+def _load_user(email: str, user_id: Optional[int]):
+    db = SessionLocal()
+    try:
+        return auth_service.load_user_snapshot(db, email, user_id)
+    finally:
+        db.close()
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    # Cached users are resolved on the event loop without a session, so async
+    # endpoints do not pay a threadpool hop for authentication.
+    try:
+        email, user_id = auth_service.decode_access_token(token)
+        user = auth_service.get_cached_user(email)
+        if user is None:
+            user = await run_in_threadpool(_load_user, email, user_id)
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,3 +73,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             headers={"WWW-Authenticate": "Bearer"},
         )
     return user
+
+
+def field_selector(allowed: Iterable[str]):
+    """Build a dependency parsing a comma-separated `fields=` query parameter.
+
+    `allowed` is a response schema's `model_fields` or any iterable of names.
+    The dependency returns the requested names in order (or None when the
+    parameter is absent) and rejects unknown names with a 400.
+    """
+    allowed = list(allowed)
+
+    def _fields(
+        fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    ) -> Optional[List[str]]:
+        if not fields:
+            return None
+        requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = [f for f in requested if f not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return requested or None
+
+    return _fields
@@ -0,0 +1,156 @@
+"""Per-request SQL instrumentation and N+1 detection.
+
+Every engine (see `pooling.configure_engine`) reports the statements it runs
+to the `QueryStats` of the current request. `QueryStatsMiddleware` opens one
+per HTTP request, adds `Server-Timing: db;dur=<ms>;desc="<n> queries"` to the
+response and logs the totals, with the numbers in the record's `extra` for
+structured log handlers. A statement that runs more than
+`SQL_REPEAT_THRESHOLD` times in one request (whitespace and expanded IN lists
+normalized) is logged as a likely N+1.
+
+Sync endpoints and dependencies run in the threadpool with a copy of the
+request's context, so they report to the same `QueryStats`.
+`track_queries()` collects statements from every thread instead, for tests
+and scripts (see `testing.py`).
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .core import config
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("stockmaster_query_stats", default=None)
+_trackers: List["QueryStats"] = []
+_trackers_lock = threading.Lock()
+
+# "IN (?, ?, ?)" / "IN (%(id_1_1)s, %(id_1_2)s)" -> "IN (...)"
+_IN_LIST = re.compile(r"IN \(\s*(?:\?|%\(\w+\)s|\$\d+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+))*\s*\)", re.IGNORECASE)
+
+
+def statement_template(statement: str) -> str:
+    """Normalize a statement so repeats of the same query compare equal."""
+    return _IN_LIST.sub("IN (...)", " ".join(statement.split()))
+
+
+class QueryStats:
+    """Statement count, DB time and per-statement counts for one request (or tracked block)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.duration = 0.0
+        # keyed by the raw statement; compiled statements are cached, so
+        # normalizing once per distinct string in `by_template` is enough
+        self._statements: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            self._statements[statement] += 1
+
+    def by_template(self) -> List[Tuple[str, int]]:
+        """Return (template, count) pairs, most frequent first."""
+        with self._lock:
+            statements = list(self._statements.items())
+        templates: Counter = Counter()
+        for statement, n in statements:
+            templates[statement_template(statement)] += n
+        return templates.most_common()
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(t, n) for t, n in self.by_template() if n > threshold]
+
+    def server_timing(self) -> str:
+        noun = "query" if self.count == 1 else "queries"
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} {noun}"'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None or _trackers:
+        conn.info["query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("query_start", None)
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    for tracker in list(_trackers):
+        tracker.record(statement, duration)
+
+
+def configure_engine(engine) -> None:
+    """Report the engine's statements to the current `QueryStats` (pass `sync_engine` for async engines)."""
+    if not config.SQL_INSTRUMENTATION:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect every statement run inside the block, from any thread."""
+    stats = QueryStats()
+    with _trackers_lock:
+        _trackers.append(stats)
+    try:
+        yield stats
+    finally:
+        with _trackers_lock:
+            _trackers.remove(stats)
+
+
+def report(stats: QueryStats, method: str, path: str) -> None:
+    """Log a request's totals and any statement repeated past `SQL_REPEAT_THRESHOLD`."""
+    fields = {"method": method, "path": path, "db_queries": stats.count, "db_time_ms": round(stats.duration * 1000, 2)}
+    if stats.count:
+        logger.info(
+            "%s %s: %d queries, %.1f ms in the database", method, path, stats.count, stats.duration * 1000, extra=fields
+        )
+    for template, n in stats.repeated(config.SQL_REPEAT_THRESHOLD):
+        logger.warning(
+            "Possible N+1 in %s %s: statement ran %d times: %s",
+            method, path, n, template[:300],
+            extra=dict(fields, repeated_statement=template, repeat_count=n),
+        )
+
+
+class QueryStatsMiddleware:
+    """Collect per-request SQL stats; add a `Server-Timing` header and log them."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not config.SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            report(stats, scope["method"], scope["path"])
@@ -0,0 +1,172 @@
+"""Periodic inventory jobs run by the scheduler (see scheduler.py).
+
+Each job is a generator function that works in chunks: one transaction per
+chunk, yielding how many items the chunk handled.
+
+- `auto_check_operations`: availability check of draft/waiting operations
+  leaving an internal location whose `scheduled_date` has arrived, so they
+  turn ready (or waiting) without someone pressing "check".
+- `quant_snapshot`: rewrites `StockQuant` quantities and reservations from
+  the stock moves and open operations, a few hundred products at a time, so
+  the dashboard's quant-based KPIs follow validated operations. Off unless
+  `JOB_QUANT_SNAPSHOT` is set: it overwrites quants kept by hand via `/quants`.
+- `reorder`: `replenishment.run`, creating draft receipts for triggered rules.
+- `forecast`: `forecasting.run`, refreshing the rules' demand forecast (and
+  their min/lot quantities with `FORECAST_APPLY=1`).
+- `otp_cleanup`: drops expired password-reset codes and rate windows.
+- `history_cleanup`: deletes `job_runs` older than `SCHEDULER_HISTORY_DAYS`.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Iterator, List
+
+from sqlalchemy import func, select
+
+from . import models
+from .core import config
+from .database import session_scope
+from .scheduler import Job, Schedule
+from .services import forecasting, inventory, replenishment
+from .services.dashboard import PENDING_STATUSES
+from .services.otp_store import get_otp_store
+
+
+def auto_check_operations(chunk_size: int = 100) -> Iterator[int]:
+    now = datetime.utcnow()
+    op = models.StockOperation
+    last_id = 0
+    while True:
+        with session_scope() as db:
+            ids = db.execute(
+                select(op.id)
+                .join(models.Location, models.Location.id == op.source_loc_id)
+                .where(
+                    op.id > last_id,
+                    op.status.in_((models.OperationStatus.draft, models.OperationStatus.waiting)),
+                    op.scheduled_date <= now,
+                    # receipts come from vendor locations, which hold no stock to check
+                    models.Location.type == models.LocationType.internal,
+                )
+                .order_by(op.id)
+                .limit(chunk_size)
+            ).scalars().all()
+            for op_id in ids:
+                inventory.check_availability(db, op_id)
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield len(ids)
+
+
+def _snapshot_quants(db, first_product: int, last_product: int) -> int:
+    move = models.StockMove
+    loc = models.Location
+    onhand = defaultdict(Decimal)
+    for loc_col, sign in ((move.dest_loc_id, 1), (move.source_loc_id, -1)):
+        rows = db.execute(
+            select(move.product_id, loc_col, func.sum(move.quantity))
+            .join(loc, loc.id == loc_col)
+            .where(move.product_id.between(first_product, last_product), loc.type == models.LocationType.internal)
+            .group_by(move.product_id, loc_col)
+        )
+        for product_id, location_id, qty in rows:
+            onhand[(product_id, location_id)] += sign * Decimal(str(qty or 0))
+
+    line = models.StockOperationLine
+    op = models.StockOperation
+    reserved = defaultdict(Decimal)
+    rows = db.execute(
+        select(line.product_id, op.source_loc_id, func.sum(line.demand_qty - line.done_qty))
+        .join(op, op.id == line.operation_id)
+        .join(loc, loc.id == op.source_loc_id)
+        .where(
+            line.product_id.between(first_product, last_product),
+            op.status.in_(PENDING_STATUSES),
+            loc.type == models.LocationType.internal,
+        )
+        .group_by(line.product_id, op.source_loc_id)
+    )
+    for product_id, location_id, qty in rows:
+        reserved[(product_id, location_id)] += Decimal(str(qty or 0))
+
+    quants = {
+        (q.product_id, q.location_id): q
+        for q in db.query(models.StockQuant).filter(models.StockQuant.product_id.between(first_product, last_product))
+    }
+    warehouse_of = dict(db.execute(select(loc.id, loc.warehouse_id)).all())
+    changed = 0
+    for key in set(onhand) | set(reserved) | set(quants):
+        # the quant table does not allow negative stock
+        quantity = max(onhand.get(key, Decimal(0)), Decimal(0))
+        reserved_qty = reserved.get(key, Decimal(0))
+        quant = quants.get(key)
+        if quant is None:
+            if quantity or reserved_qty:
+                db.add(models.StockQuant(
+                    product_id=key[0], location_id=key[1], warehouse_id=warehouse_of.get(key[1]),
+                    quantity=quantity, reserved_qty=reserved_qty,
+                ))
+                changed += 1
+        elif quant.quantity != quantity or quant.reserved_qty != reserved_qty:
+            quant.quantity, quant.reserved_qty = quantity, reserved_qty
+            changed += 1
+    db.flush()
+    return changed
+
+
+def quant_snapshot(chunk_size: int = 500) -> Iterator[int]:
+    last_id = 0
+    while True:
+        with session_scope() as db:
+            products: List[int] = db.execute(
+                select(models.Product.id).where(models.Product.id > last_id).order_by(models.Product.id).limit(chunk_size)
+            ).scalars().all()
+            if products:
+                changed = _snapshot_quants(db, products[0], products[-1])
+        if not products:
+            return
+        last_id = products[-1]
+        yield changed
+
+
+def reorder() -> Iterator[int]:
+    with session_scope() as db:
+        result = replenishment.run(db)
+    yield sum(len(order["lines"]) for order in result["orders"])
+
+
+def forecast() -> Iterator[int]:
+    with session_scope() as db:
+        result = forecasting.run(db, apply=config.FORECAST_APPLY)
+    yield result["rules"]
+
+
+def otp_cleanup() -> Iterator[int]:
+    yield get_otp_store().purge_expired()
+
+
+def history_cleanup(chunk_size: int = 1000) -> Iterator[int]:
+    before = datetime.utcnow() - timedelta(days=config.SCHEDULER_HISTORY_DAYS)
+    run = models.JobRun
+    while True:
+        with session_scope() as db:
+            ids = db.execute(select(run.id).where(run.started_at < before).limit(chunk_size)).scalars().all()
+            if ids:
+                db.query(run).filter(run.id.in_(ids)).delete(synchronize_session=False)
+        if not ids:
+            return
+        yield len(ids)
+
+
+def default_jobs() -> List[Job]:
+    """The jobs enabled by their `JOB_<NAME>` schedule setting."""
+    schedules = {
+        "auto_check_operations": (config.JOB_AUTO_CHECK_OPERATIONS, auto_check_operations),
+        "quant_snapshot": (config.JOB_QUANT_SNAPSHOT, quant_snapshot),
+        "reorder": (config.JOB_REORDER, reorder),
+        "forecast": (config.JOB_FORECAST, forecast),
+        "otp_cleanup": (config.JOB_OTP_CLEANUP, otp_cleanup),
+        "history_cleanup": (config.JOB_HISTORY_CLEANUP, history_cleanup),
+    }
+    return [Job(name, Schedule(spec), fn) for name, (spec, fn) in schedules.items() if spec and spec.strip()]
@@ -1,11 +1,19 @@
 """FastAPI application for StockMaster (modular routers)."""
 import logging
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import os
 
-from .database import init_db
+from . import jobs, migrations, scheduler
+from .core import config
+from .database import dispose_async_engine, init_db
+from .instrumentation import QueryStatsMiddleware
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware
+from .routing import ReadAfterWriteMiddleware
+from .services import hashing, mailer
 from .api.routers import (
     auth as auth_router,
     operations as operations_router,
@@ -19,6 +27,8 @@ from .api.routers import (
     partners as partners_router,
     reorder_rules as reorder_rules_router,
     users as users_router,
+    internal as internal_router,
+    metrics as metrics_router,
 )
 
 
@@ -44,12 +54,49 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
 )
+# Each middleware added wraps the ones before it, so requests pass through
+# Profiling -> Metrics -> QueryStats -> ReadAfterWrite -> CORS. QueryStats sits
+# outside ReadAfterWrite and CORS, so its SQL counts cover all they run.
+app.add_middleware(ReadAfterWriteMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+# Outermost, so a profile covers every middleware too
+app.add_middleware(ProfilingMiddleware)
 
 
 @app.on_event("startup")
 def on_startup():
-    logging.getLogger(__name__).info("Initializing DB (creating tables if needed)")
-    init_db()
+    if config.SCHEMA_CHECK == "revision":
+        migrations.ensure_schema()
+    elif config.SCHEMA_CHECK == "create_all":
+        logging.getLogger(__name__).info("Initializing DB (creating tables if needed)")
+        init_db()
+
+
+@app.on_event("startup")
+async def start_scheduler():
+    # after on_startup, so the job tables exist
+    if config.SCHEDULER:
+        app.state.scheduler = scheduler.Scheduler(jobs.default_jobs())
+        app.state.scheduler.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if getattr(app.state, "scheduler", None) is not None:
+        await app.state.scheduler.stop()
+    hashing.shutdown()
+    mailer.shutdown()
+    await dispose_async_engine()
+
+
+@app.exception_handler(hashing.HashingPoolBusy)
+def hashing_pool_busy(request: Request, exc: hashing.HashingPoolBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication is busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
 
 
 # Include routers
@@ -64,4 +111,6 @@ app.include_router(ledger_router.router)
 app.include_router(warehouses_router.router)
 app.include_router(partners_router.router)
 app.include_router(reorder_rules_router.router)
-app.include_router(users_router.router)
\ No newline at end of file
+app.include_router(users_router.router)
+app.include_router(internal_router.router)
+app.include_router(metrics_router.router)
\ No newline at end of file
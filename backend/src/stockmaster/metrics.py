@@ -0,0 +1,215 @@
+"""Prometheus-format metrics without a client library.
+
+`GET /metrics` renders every registered metric in the Prometheus text
+exposition format (version 0.0.4):
+
+- `stockmaster_http_requests_total`, `stockmaster_http_request_duration_seconds`
+  (histogram) per method, route template and status class, and
+  `stockmaster_http_requests_in_flight` per method, from `MetricsMiddleware`;
+- business counters incremented by the services: operations created and
+  validated per type, stock moves written, availability checks per result.
+
+Recording is lock-free: each thread updates its own shard of a metric
+(the event loop thread serves all async requests, each threadpool worker
+has its own), and a scrape sums the shards. A lock is taken only the first
+time a thread touches a metric. Values are per process; with several
+uvicorn workers scrape each one or run a single worker per container.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Prometheus client defaults, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._shards_lock:
+                self._shards.append(values)
+            return values
+
+    def _snapshot(self) -> Iterable[Tuple[tuple, object]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # list() of a dict's items is atomic under the GIL
+            yield from list(shard.items())
+
+    def _labels(self, values: tuple, extra: Dict[str, str] = None) -> str:
+        pairs = list(zip(self.labelnames, values)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _render_samples(self) -> List[str]:
+        totals: Dict[tuple, float] = {}
+        for labels, value in self._snapshot():
+            totals[labels] = totals.get(labels, 0) + value
+        if not totals and not self.labelnames:
+            totals[()] = 0
+        return [f"{self.name}{self._labels(labels)} {_number(v)}" for labels, v in sorted(totals.items())]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # per-bucket counts (last one is +Inf), sum, count
+            entry = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def _render_samples(self) -> List[str]:
+        totals: Dict[tuple, list] = {}
+        for labels, (counts, total, count) in self._snapshot():
+            merged = totals.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+        lines = []
+        for labels, (counts, total, count) in sorted(totals.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{self._labels(labels, {'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {count}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not float(value).is_integer() else str(int(value))
+
+
+REGISTRY: List[_Metric] = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+http_requests = _register(Counter(
+    "stockmaster_http_requests_total", "HTTP requests by method, route and status class.",
+    ("method", "route", "status"),
+))
+http_request_duration = _register(Histogram(
+    "stockmaster_http_request_duration_seconds", "HTTP request latency by method and route.", ("method", "route"),
+))
+http_in_flight = _register(Gauge(
+    "stockmaster_http_requests_in_flight", "HTTP requests currently being served.", ("method",),
+))
+operations_created = _register(Counter(
+    "stockmaster_operations_created_total", "Stock operations created, by operation type.", ("type",),
+))
+operations_validated = _register(Counter(
+    "stockmaster_operations_validated_total", "Stock operations validated, by operation type.", ("type",),
+))
+moves_written = _register(Counter("stockmaster_stock_moves_written_total", "Stock moves written."))
+stock_checks = _register(Counter(
+    "stockmaster_stock_checks_total", "Operation availability checks, by result (ready/waiting).", ("result",),
+))
+job_runs = _register(Counter(
+    "stockmaster_job_runs_total", "Background job runs, by job and status.", ("job", "status"),
+))
+job_duration = _register(Histogram(
+    "stockmaster_job_duration_seconds", "Background job run time.", ("job",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0),
+))
+
+
+def render() -> str:
+    """Return every registered metric in the Prometheus text format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def enum_label(value) -> str:
+    return str(getattr(value, "value", value))
+
+
+class MetricsMiddleware:
+    """Record per-route latency, status and in-flight requests."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = [500]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        http_in_flight.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method)
+            # the matched route's template (set by routing) keeps the label set
+            # bounded; anything unmatched shares one label
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_request_duration.observe(time.perf_counter() - start, method, route)
+            http_requests.inc(method, route, f"{status[0] // 100}xx")
@@ -0,0 +1,154 @@
+"""Startup schema check against the Alembic migration head.
+
+Running `Base.metadata.create_all()` on every boot inspects every table.
+Instead, `ensure_schema()` compares the database's `alembic_version` with the
+head revision of `backend/almebic/versions` (one query):
+
+- at head: nothing to do.
+- empty database: create the tables and stamp the head revision. Workers
+  booting together race for this; the losers find the stamp and carry on.
+- tables but no `alembic_version` (databases created by older releases with
+  `create_all`): create any missing tables, as before, and warn that the
+  database should be stamped once its schema is verified.
+- any other revision: warn to run `alembic upgrade head`; the schema is left
+  alone.
+
+The head is read from the migration files' `revision` / `down_revision`
+assignments with `ast`, without importing Alembic, which would add more to
+boot time than the check saves.
+"""
+import ast
+import logging
+import os
+from typing import List, Optional
+
+from sqlalchemy import Column, MetaData, String, Table, exc, inspect, text
+
+from . import database, models  # noqa: F401  (registers tables for create_all)
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "almebic", "versions"))
+VERSION_TABLE = "alembic_version"
+
+# Mirrors the table Alembic creates, for stamping fresh databases
+_version_table = Table(
+    VERSION_TABLE,
+    MetaData(),
+    Column("version_num", String(32), primary_key=True),
+)
+
+# Postgres advisory lock key serializing the bootstrap of an empty database
+_BOOTSTRAP_LOCK_KEY = 0x5354_4b4d
+
+
+def _literal_assignments(source: str, filename: str) -> dict:
+    found = {}
+    for node in ast.parse(source, filename=filename).body:
+        if isinstance(node, ast.AnnAssign):
+            target, value = node.target, node.value
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target, value = node.targets[0], node.value
+        else:
+            continue
+        if isinstance(target, ast.Name) and target.id in ("revision", "down_revision") and value is not None:
+            found[target.id] = ast.literal_eval(value)
+    return found
+
+
+def _module_revisions(path: str):
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    # Alembic writes each identifier on one line; parsing just those lines is
+    # much cheaper than the whole module. Fall back to the full file otherwise.
+    header = "\n".join(line for line in source.splitlines() if line.startswith(("revision", "down_revision")))
+    try:
+        found = _literal_assignments(header, path)
+    except SyntaxError:
+        found = {}
+    if "revision" not in found or "down_revision" not in found:
+        found = _literal_assignments(source, path)
+    return found.get("revision"), found.get("down_revision")
+
+
+def head_revisions(versions_dir: str = VERSIONS_DIR) -> List[str]:
+    """Return the head revision ids of the migration scripts."""
+    revisions, parents = set(), set()
+    for name in os.listdir(versions_dir):
+        if not name.endswith(".py") or name.startswith("_"):
+            continue
+        revision, down = _module_revisions(os.path.join(versions_dir, name))
+        if revision is None:
+            continue
+        revisions.add(revision)
+        if isinstance(down, (tuple, list)):
+            parents.update(down)
+        elif down is not None:
+            parents.add(down)
+    return sorted(revisions - parents)
+
+
+def current_revision(conn) -> Optional[str]:
+    """Return the database's Alembic revision, or None if it is unversioned."""
+    if not inspect(conn).has_table(VERSION_TABLE):
+        return None
+    return conn.execute(_version_table.select()).scalar()
+
+
+def ensure_schema(engine=None) -> str:
+    """Check the schema at startup; returns what was done (see module docstring)."""
+    engine = engine or database.get_primary_engine()
+    heads = head_revisions()
+    if len(heads) != 1:
+        logger.warning("Expected one Alembic head, found %s; skipping schema check", heads or "none")
+        return "skipped"
+    head = heads[0]
+
+    with engine.connect() as conn:
+        try:
+            current = conn.execute(_version_table.select()).scalar()
+        except exc.DBAPIError:
+            conn.rollback()
+            current = current_revision(conn)
+        if current == head:
+            return "current"
+        if current is not None:
+            logger.warning(
+                "Database schema is at revision %s but the code expects %s; run `alembic upgrade head`",
+                current, head,
+            )
+            return "mismatch"
+        has_tables = bool(inspect(conn).get_table_names())
+
+    if has_tables:
+        database.init_db(engine)
+        logger.warning(
+            "Database has no %s table; created missing tables. Once the schema matches the models, "
+            "run `alembic stamp head` to enable the fast startup check.",
+            VERSION_TABLE,
+        )
+        return "unversioned"
+    if not _create_and_stamp(engine, head):
+        logger.info("Database schema was created by another worker")
+        return "current"
+    logger.info("Created database schema at revision %s", head)
+    return "created"
+
+
+def _create_and_stamp(engine, head: str) -> bool:
+    """Create the tables and stamp `head` in one transaction; False if another worker already did."""
+    with engine.begin() as conn:
+        # workers booting together against an empty database queue here until
+        # the first one commits, then see its stamp
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _BOOTSTRAP_LOCK_KEY})
+        elif conn.dialect.name == "sqlite":
+            # takes the write lock now; pysqlite would otherwise run the DDL
+            # outside a transaction, visible table by table
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        if current_revision(conn) is not None:
+            return False
+        database.init_db(conn)
+        _version_table.create(conn, checkfirst=True)
+        conn.execute(_version_table.insert().values(version_num=head))
+    return True
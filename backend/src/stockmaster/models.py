@@ -3,6 +3,7 @@
 Matches the exact schema provided by the user.
 """
 from datetime import datetime
+from decimal import Decimal
 
 from .types import LocationType, OperationStatus, OperationType, PartnerType
 
@@ -14,11 +15,18 @@ from sqlalchemy import (
     Enum,
     ForeignKey,
     Numeric,
+    Float,
+    Text,
     Index,
     UniqueConstraint,
     CheckConstraint,
+    event,
+    inspect,
+    select,
+    update,
 )
 from sqlalchemy.orm import relationship
+from sqlalchemy.orm.attributes import set_committed_value
 
 from .database import Base
 
@@ -66,8 +74,16 @@ class Location(Base):
     type = Column(Enum(LocationType), nullable=False, default=LocationType.internal)
     # Optional grouping by warehouse
     warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=True, index=True)
+    # Hierarchy (zone > shelf > bin ...). `path` is the materialized path of
+    # ids from the root down to this location, e.g. "/3/17/42/", so a subtree
+    # is one index range scan (see services/locations.py). It is set right
+    # after insert (see `_set_location_path`); bulk inserts must fill it in.
+    parent_id = Column(Integer, ForeignKey("locations.id"), nullable=True, index=True)
+    # byte-wise ordering, which the range scan relies on
+    path = Column(String(255).with_variant(String(255, collation="C"), "postgresql"), nullable=True, index=True)
 
     warehouse = relationship("Warehouse", back_populates="locations")
+    parent = relationship("Location", remote_side=[id])
 
     outgoing_moves = relationship(
         "StockMove",
@@ -81,6 +97,17 @@ class Location(Base):
     )
 
 
+@event.listens_for(Location, "after_insert")
+def _set_location_path(mapper, connection, target):
+    # the path ends with the row's own id, known only once it is inserted
+    parent_path = "/"
+    if target.parent_id is not None:
+        parent_path = connection.scalar(select(Location.path).where(Location.id == target.parent_id))
+    path = f"{parent_path}{target.id}/"
+    connection.execute(update(Location.__table__).where(Location.__table__.c.id == target.id).values(path=path))
+    set_committed_value(target, "path", path)
+
+
 class StockOperation(Base):
     __tablename__ = "stockoperations"
 
@@ -101,6 +128,7 @@ class StockOperation(Base):
     source_location = relationship("Location", foreign_keys=[source_loc_id])
     dest_location = relationship("Location", foreign_keys=[dest_loc_id])
     created_by = relationship("User", foreign_keys=[created_by_id])
+    partner = relationship("Partner")
 
     lines = relationship("StockOperationLine", back_populates="operation", cascade="all, delete-orphan")
     moves = relationship("StockMove", back_populates="reference_operation")
@@ -135,6 +163,8 @@ class StockQuant(Base):
     quantity = Column(Numeric(14, 4), nullable=False, default=0)
     reserved_qty = Column(Numeric(14, 4), nullable=False, default=0)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # copy of the location's warehouse_id (see `_copy_warehouse_ids`)
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=True)
 
     __table_args__ = (
         UniqueConstraint("product_id", "location_id", name="uq_stockquant_product_location"),
@@ -176,6 +206,13 @@ class ReorderRule(Base):
     min_qty = Column(Numeric(14, 4), nullable=False, default=0)
     max_qty = Column(Numeric(14, 4), nullable=True)
     reorder_qty = Column(Numeric(14, 4), nullable=True)
+    # Written by the demand forecast (services/forecasting.py); min_qty and
+    # reorder_qty only change when a forecast run is told to apply them.
+    daily_demand = Column(Numeric(14, 4), nullable=True)
+    suggested_min_qty = Column(Numeric(14, 4), nullable=True)
+    suggested_reorder_qty = Column(Numeric(14, 4), nullable=True)
+    days_of_cover = Column(Numeric(10, 1), nullable=True)
+    forecast_at = Column(DateTime, nullable=True)
 
     product = relationship("Product")
     warehouse = relationship("Warehouse")
@@ -206,6 +243,10 @@ class StockMove(Base):
     quantity = Column(Numeric(14, 4), nullable=False)
     date = Column(DateTime, default=datetime.utcnow, nullable=False)
     reference_id = Column(Integer, ForeignKey("stockoperations.id"), nullable=True, index=True)
+    # copies of the locations' warehouse_id, so warehouse filters need no join
+    # (see `_copy_warehouse_ids`)
+    source_warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=True)
+    dest_warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=True)
 
     product = relationship("Product", back_populates="moves")
     source_location = relationship("Location", foreign_keys=[source_loc_id])
@@ -213,5 +254,139 @@ class StockMove(Base):
     reference_operation = relationship("StockOperation", back_populates="moves")
 
 
+class PasswordResetOTP(Base):
+    """Password-reset code and request-rate window per email (`OTP_STORE=db`)."""
+
+    __tablename__ = "password_reset_otps"
+
+    email = Column(String(255), primary_key=True)
+    otp = Column(String(16), nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    window_start = Column(DateTime, nullable=False, index=True)
+    request_count = Column(Integer, nullable=False, default=0)
+
+
+class JobLease(Base):
+    """Schedule and lease of one background job, shared by all workers (see scheduler.py)."""
+
+    __tablename__ = "job_leases"
+
+    name = Column(String(64), primary_key=True)
+    next_run_at = Column(DateTime, nullable=False)
+    # set while a worker runs the job; an expired lease may be taken over
+    owner = Column(String(128), nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+
+
+class JobRun(Base):
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job = Column(String(64), nullable=False, index=True)
+    owner = Column(String(128), nullable=False)
+    status = Column(String(16), nullable=False)
+    started_at = Column(DateTime, nullable=False, index=True)
+    finished_at = Column(DateTime, nullable=True)
+    duration_ms = Column(Float, nullable=True)
+    chunks = Column(Integer, nullable=False, default=0)
+    items = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+
+def _location_warehouse(location_id):
+    return select(Location.warehouse_id).where(Location.id == location_id).scalar_subquery()
+
+
+# Location columns and the warehouse_id copies they fill, per model
+_WAREHOUSE_COPIES = {
+    StockMove: (("source_loc_id", "source_warehouse_id"), ("dest_loc_id", "dest_warehouse_id")),
+    StockQuant: (("location_id", "warehouse_id"),),
+}
+
+
+def _copy_warehouse_ids(mapper, connection, target):
+    # Copies the caller did not set are read by a subquery inside the
+    # INSERT/UPDATE itself: no extra round trip, but such rows are not batched,
+    # so code writing many rows sets them (see inventory.validate_operation).
+    # services/locations.py updates the copies when a location changes
+    # warehouse; Core inserts must fill them in.
+    state = inspect(target)
+    for loc_attr, copy_attr in _WAREHOUSE_COPIES[type(target)]:
+        if state.attrs[copy_attr].history.has_changes():
+            continue
+        if state.persistent and not state.attrs[loc_attr].history.has_changes():
+            continue
+        location_id = getattr(target, loc_attr)
+        setattr(target, copy_attr, None if location_id is None else _location_warehouse(location_id))
+
+
+for _model in _WAREHOUSE_COPIES:
+    event.listen(_model, "before_insert", _copy_warehouse_ids)
+    event.listen(_model, "before_update", _copy_warehouse_ids)
+
+
+def _quantizer(scale: int):
+    exponent = Decimal(1).scaleb(-scale)
+
+    def quantize(value):
+        if isinstance(value, (Decimal, int, float)) and not isinstance(value, bool):
+            return Decimal(str(value)).quantize(exponent)
+        return value
+
+    return quantize
+
+
+def _quantize_numeric_columns(model) -> None:
+    # Entities are not refreshed after a write (expire_on_commit=False),
+    # so round values to the column's scale as they are set. A write response
+    # then shows "1.50", as a later read does, rather than the "1.5" it was sent.
+    defaults = {}
+    for attr in inspect(model).column_attrs:
+        column = attr.columns[0]
+        if not isinstance(column.type, Numeric) or isinstance(column.type, Float) or column.type.scale is None:
+            continue
+        quantize = _quantizer(column.type.scale)
+        event.listen(getattr(model, attr.key), "set", lambda target, value, old, initiator, q=quantize: q(value), retval=True)
+        if column.default is not None and column.default.is_scalar:
+            defaults[attr.key] = quantize(column.default.arg)
+    if defaults:
+        def _apply_defaults(target, args, kwargs):
+            # scalar column defaults, so unset quantities show "0.0000" too
+            for key, value in defaults.items():
+                kwargs.setdefault(key, value)
+
+        event.listen(model, "init", _apply_defaults)
+
+
+for _mapper in Base.registry.mappers:
+    _quantize_numeric_columns(_mapper.class_)
+
+
 # Optional useful index
 Index("ix_stockmoves_product_date", StockMove.product_id, StockMove.date)
+
+# Composite indexes for the hot inventory queries; keep in sync with the
+# migration that adds them and with benchmarks/check_query_plans.py.
+# Per-location stock sums filter on (product_id, dest/source_loc_id) and read
+# only quantity, so quantity is part of the key and the sums never touch the table.
+Index("ix_stockmoves_product_dest_qty", StockMove.product_id, StockMove.dest_loc_id, StockMove.quantity)
+Index("ix_stockmoves_product_source_qty", StockMove.product_id, StockMove.source_loc_id, StockMove.quantity)
+# Reservations: lines by product joined to open operations at the source location
+Index("ix_stockoperationlines_product_operation", StockOperationLine.product_id, StockOperationLine.operation_id)
+Index("ix_stockoperations_source_status", StockOperation.source_loc_id, StockOperation.status)
+# Dashboard KPIs: counts grouped by (operation_type, status) and the
+# scheduled_date range for pending internal transfers
+Index(
+    "ix_stockoperations_type_status_scheduled",
+    StockOperation.operation_type,
+    StockOperation.status,
+    StockOperation.scheduled_date,
+)
+# List endpoints ordered newest first
+Index("ix_stockoperations_created_at", StockOperation.created_at)
+Index("ix_stockmoves_date", StockMove.date)
+# Warehouse-scoped move history (newest first) and quant KPIs
+Index("ix_stockmoves_source_warehouse_date", StockMove.source_warehouse_id, StockMove.date)
+Index("ix_stockmoves_dest_warehouse_date", StockMove.dest_warehouse_id, StockMove.date)
+Index("ix_stockquants_warehouse_product", StockQuant.warehouse_id, StockQuant.product_id)
+Index("ix_stockledger_date", StockLedger.date)
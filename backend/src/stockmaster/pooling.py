@@ -0,0 +1,177 @@
+"""Connection-pool sizing, liveness checks and metrics.
+
+`engine_options()` turns the `DB_POOL_*` settings from `core.config` into
+`create_engine` keyword arguments. Pooled engines use
+`InstrumentedQueuePool` (or `InstrumentedAsyncQueuePool` for the async
+engine), which records how long each checkout waited for a connection and how
+often it timed out. `pool_stats()` reports those numbers
+with the live pool counters for `/internal/metrics/db`.
+
+Pre-ping strategies (`DB_POOL_PRE_PING`):
+
+- `always`: SQLAlchemy's `pool_pre_ping`, a round trip on every checkout.
+- `idle`: ping only connections idle for more than `DB_POOL_PING_IDLE_SECONDS`.
+- `never`: rely on `DB_POOL_RECYCLE` and error handling alone.
+"""
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from . import instrumentation, slow_queries, sqlite_profile
+from .core import config
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def observe_wait(self, seconds: float) -> None:
+        idx = next((i for i, b in enumerate(WAIT_BUCKETS) if seconds <= b), len(WAIT_BUCKETS))
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.wait_buckets[idx] += 1
+
+    def observe_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_total,
+                "wait_seconds_max": self.wait_max,
+                "wait_seconds_avg": self.wait_total / self.checkouts if self.checkouts else 0.0,
+                "wait_histogram": {
+                    **{f"le_{b}": n for b, n in zip(WAIT_BUCKETS, self.wait_buckets)},
+                    "le_inf": self.wait_buckets[-1],
+                },
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Times how long callers of a QueuePool wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe_timeout()
+            raise
+        self.metrics.observe_wait(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        new = super().recreate()
+        new.metrics = self.metrics
+        return new
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _is_memory_sqlite(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(url, asyncio: bool = False) -> dict:
+    """Return `create_engine` kwargs for pooling as configured in `core.config`.
+
+    Pass `asyncio=True` for engines created with `create_async_engine`.
+    """
+    options = {"pool_pre_ping": config.DB_POOL_PRE_PING == "always"}
+    connect_args = sqlite_profile.connect_args(url, asyncio)
+    if connect_args:
+        options["connect_args"] = connect_args
+    if _is_memory_sqlite(url):
+        # in-memory SQLite uses a per-thread pool that takes no sizing arguments
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if asyncio else InstrumentedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def install_idle_ping(engine, idle_seconds: float) -> None:
+    """Ping connections on checkout only when they sat idle in the pool for a while."""
+
+    @event.listens_for(engine.pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine.pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception as e:
+            # the pool discards this connection and retries with a fresh one
+            raise exc.DisconnectionError() from e
+        finally:
+            cursor.close()
+
+
+def configure_engine(engine) -> None:
+    """Apply post-creation pool behaviour (idle pings) to an engine.
+
+    For an `AsyncEngine`, pass its `sync_engine`. SQLite engines also get the
+    tuned profile from `sqlite_profile`; every engine reports its statements
+    to `instrumentation` and `slow_queries`.
+    """
+    sqlite_profile.configure_engine(engine)
+    instrumentation.configure_engine(engine)
+    slow_queries.configure_engine(engine)
+    if config.DB_POOL_PRE_PING == "idle":
+        install_idle_ping(engine, config.DB_POOL_PING_IDLE_SECONDS)
+
+
+def pool_stats(engine) -> Optional[dict]:
+    """Return live counters and checkout metrics for an engine's pool."""
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            in_use=pool.checkedout(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=config.DB_MAX_OVERFLOW,
+            timeout=pool.timeout(),
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
@@ -0,0 +1,235 @@
+"""Opt-in request profiling with a sampling profiler.
+
+With `PROFILING=1` a request is profiled when
+
+- it carries `X-Profile: <PROFILING_TOKEN>` (or `?profile=<token>`), or
+- it is one of every `PROFILING_SAMPLE_EVERY` requests (rolling sample mode;
+  at most one sampled request is profiled at a time).
+
+While the request runs, a background thread records the stack of every thread
+working on it every `PROFILING_INTERVAL_MS`: the event loop thread while this
+request's task is running, and threadpool threads while they are inside the
+matched endpoint (so concurrent calls to the same sync endpoint can blend in).
+The samples are written to `PROFILING_DIR` in the collapsed-stack format
+(`frame;frame;frame count` per line) that `flamegraph.pl`, speedscope and
+inferno read, and the response names the file in an `X-Profile` header. The
+oldest files are deleted once the directory exceeds `PROFILING_DIR_MAX_BYTES`.
+
+Profiles are listed and downloaded through `GET /internal/profiles`, which
+requires the same token.
+"""
+import hmac
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .core import config
+
+logger = logging.getLogger(__name__)
+
+HEADER = "x-profile"
+PROFILE_SUFFIX = ".collapsed"
+_NAME_RE = re.compile(r"^[\w.-]+" + re.escape(PROFILE_SUFFIX) + "$")
+
+_requests = itertools.count(1)
+_sampling = threading.Lock()
+_dir_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return config.PROFILING
+
+
+def token_matches(token: Optional[str]) -> bool:
+    return bool(config.PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, config.PROFILING_TOKEN)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class Sampler:
+    """Collects collapsed stacks of the threads serving one request."""
+
+    def __init__(self, scope: Scope, interval: float):
+        self.scope = scope
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._loop_thread = threading.get_ident()
+        self._anchor = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self, anchor) -> None:
+        # `anchor` is the middleware's frame: it is on the event loop thread's
+        # stack exactly while this request's task is running
+        self._anchor = anchor
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _endpoint_code(self):
+        endpoint = getattr(self.scope.get("route"), "endpoint", None)
+        return getattr(endpoint, "__code__", None)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            endpoint_code = self._endpoint_code()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame)
+                    frame = frame.f_back
+                if thread_id == self._loop_thread:
+                    if not any(f is self._anchor for f in stack):
+                        continue
+                elif endpoint_code is None or not any(f.f_code is endpoint_code for f in stack):
+                    continue
+                self.stacks[";".join(_frame_label(f) for f in reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def _profile_name(scope: Scope, reason: str) -> str:
+    route = getattr(scope.get("route"), "path", None) or scope["path"]
+    slug = re.sub(r"[^\w-]+", "_", route).strip("_") or "root"
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    return f"{stamp}-{reason}-{scope['method']}-{slug}{PROFILE_SUFFIX}"
+
+
+def _enforce_cap() -> None:
+    entries = list_profiles()
+    total = sum(e["bytes"] for e in entries)
+    # oldest first
+    for entry in reversed(entries):
+        if total <= config.PROFILING_DIR_MAX_BYTES:
+            break
+        try:
+            os.remove(os.path.join(config.PROFILING_DIR, entry["name"]))
+        except OSError:
+            continue
+        total -= entry["bytes"]
+
+
+def store(name: str, body: str) -> str:
+    """Write a profile into `PROFILING_DIR`, trimming the directory to its size cap."""
+    with _dir_lock:
+        os.makedirs(config.PROFILING_DIR, exist_ok=True)
+        path = os.path.join(config.PROFILING_DIR, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+        _enforce_cap()
+    return path
+
+
+def list_profiles() -> List[dict]:
+    """Stored profiles, newest first."""
+    try:
+        names = [n for n in os.listdir(config.PROFILING_DIR) if _NAME_RE.match(n)]
+    except FileNotFoundError:
+        return []
+    entries = []
+    for name in names:
+        try:
+            st = os.stat(os.path.join(config.PROFILING_DIR, name))
+        except OSError:
+            continue
+        entries.append({"name": name, "bytes": st.st_size, "modified": datetime.utcfromtimestamp(st.st_mtime)})
+    entries.sort(key=lambda e: (e["modified"], e["name"]), reverse=True)
+    return entries
+
+
+def read_profile(name: str) -> Optional[str]:
+    if not _NAME_RE.match(name):
+        return None
+    try:
+        with open(os.path.join(config.PROFILING_DIR, name), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _requested(scope: Scope) -> bool:
+    for key, value in scope["headers"]:
+        if key == HEADER.encode():
+            return token_matches(value.decode("latin-1"))
+    if b"profile=" in scope.get("query_string", b""):
+        tokens = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [])
+        return any(token_matches(t) for t in tokens)
+    return False
+
+
+class ProfilingMiddleware:
+    """Profile requests on demand or by rolling sample (see module docstring)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+
+        sampled = False
+        if _requested(scope):
+            reason = "demand"
+        elif config.PROFILING_SAMPLE_EVERY > 0 and next(_requests) % config.PROFILING_SAMPLE_EVERY == 0:
+            # never stack sampled profiles on top of each other
+            sampled = _sampling.acquire(blocking=False)
+            if not sampled:
+                await self.app(scope, receive, send)
+                return
+            reason = "sample"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        sampler = Sampler(scope, config.PROFILING_INTERVAL_MS / 1000)
+        name = []
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # the route is known by now; the file is written once the request finishes
+                name.append(_profile_name(scope, reason))
+                MutableHeaders(scope=message).append("X-Profile", name[0])
+            await send(message)
+
+        start = time.perf_counter()
+        sampler.start(sys._getframe())
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            if sampled:
+                _sampling.release()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            profile_name = name[0] if name else _profile_name(scope, reason)
+            try:
+                store(profile_name, sampler.collapsed())
+                logger.info(
+                    "Profiled %s %s (%.1f ms, %d samples) -> %s",
+                    scope["method"], scope["path"], elapsed_ms, sampler.samples, profile_name,
+                )
+            except OSError:
+                logger.exception("Could not store request profile")
@@ -0,0 +1,64 @@
+"""Read-replica routing with read-your-writes stickiness.
+
+When `DATABASE_READ_URL` is set, endpoints that depend on `deps.get_read_db`
+or `deps.get_async_read_db` read from the replica. A client that just wrote
+something (any successful non-GET request) keeps reading from the primary
+for `READ_AFTER_WRITE_SECONDS`, so replication lag never hides its own
+changes. Without a replica both dependencies return primary sessions.
+
+Clients are identified by their `Authorization` header, falling back to
+the client address. The window is tracked per process: with several
+uvicorn workers a read served by another worker may still hit the replica.
+"""
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import database
+from .core import config
+from .core.cache import TTLCache
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_recent_writers = TTLCache(maxsize=config.READ_AFTER_WRITE_MAXSIZE, ttl=config.READ_AFTER_WRITE_SECONDS)
+
+
+def _client_key(headers, client) -> Optional[str]:
+    auth = headers.get("authorization")
+    if auth:
+        return auth
+    return client[0] if client else None
+
+
+def mark_write(key: Optional[str]) -> None:
+    if key is not None:
+        _recent_writers.set(key, True)
+
+
+def use_primary(request: Request) -> bool:
+    """Return True when `request` must read from the primary."""
+    if not database.has_read_replica():
+        return True
+    key = _client_key(request.headers, request.client)
+    return key is not None and _recent_writers.get(key, False)
+
+
+class ReadAfterWriteMiddleware:
+    """Record clients whose non-GET requests succeeded (see `use_primary`)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not database.has_read_replica():
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+                mark_write(_client_key(headers, scope.get("client")))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,314 @@
+"""In-process scheduler for periodic background jobs.
+
+With `SCHEDULER=1` every worker runs a `Scheduler` task on its event loop.
+Each job has a row in `job_leases` that holds its next due time and, while it
+runs, the worker that owns it. Every `SCHEDULER_TICK_SECONDS` a worker reads
+the rows and claims due jobs with one conditional UPDATE
+(`next_run_at <= now` and no live lease), so across any number of workers
+each due run is claimed by exactly one of them. A worker that dies mid-run
+stops renewing its lease; after `SCHEDULER_LEASE_SECONDS` another worker takes
+the job over.
+
+A job is a generator function: each `next()` processes one chunk in its own
+transaction and yields the number of items it handled. Chunks run in a worker
+thread (`asyncio.to_thread`), never on the event loop and never in Starlette's
+request threadpool, and the lease is renewed between chunks, so a long job
+neither blocks requests nor loses its lease. Every run is recorded in
+`job_runs` (status, chunks, items, duration, error) and counted in the
+`stockmaster_job_runs_total` / `stockmaster_job_duration_seconds` metrics.
+
+Schedules are 5-field cron expressions (`minute hour day-of-month month
+day-of-week`, with `*`, `a-b`, `*/n`, `a-b/n` and lists), `@hourly`, `@daily`,
+`@weekly`, `@monthly`, or intervals such as `@every 30s`, `@every 5m`,
+`@every 2h`. Times are UTC.
+"""
+import asyncio
+import logging
+import os
+import re
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import metrics, models
+from .core import config
+from .database import session_scope
+
+logger = logging.getLogger(__name__)
+
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+_EVERY_RE = re.compile(r"^@every\s+(\d+)\s*([smhd])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+# (low, high) of each cron field; day-of-week 7 is Sunday, like 0
+_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+class Schedule:
+    """When a job is due: `next_after(dt)` is the first due time after `dt`."""
+
+    def __init__(self, spec: str):
+        self.spec = spec.strip()
+        self.interval: Optional[timedelta] = None
+        every = _EVERY_RE.match(self.spec)
+        if every:
+            self.interval = timedelta(seconds=int(every.group(1)) * _UNITS[every.group(2)])
+            if not self.interval:
+                raise ValueError(f"Empty interval in schedule {spec!r}")
+            return
+        fields = _ALIASES.get(self.spec, self.spec).split()
+        if len(fields) != 5:
+            raise ValueError(f"Schedule {spec!r} is not a 5-field cron expression, an alias or '@every <n><s|m|h|d>'")
+        self.minutes, self.hours, self.days, self.months, dows = (
+            _parse_field(field, low, high) for field, (low, high) in zip(fields, _FIELDS)
+        )
+        self.weekdays = {d % 7 for d in dows}
+        # cron: when both day fields are restricted, either one matching is enough
+        self._days_restricted = fields[2] != "*"
+        self._weekdays_restricted = fields[4] != "*"
+
+    def __repr__(self) -> str:
+        return f"Schedule({self.spec!r})"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        # datetime: Monday is 0; cron: Sunday is 0
+        dow = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._days_restricted and self._weekdays_restricted:
+            return dom or dow
+        return dom and dow
+
+    def next_after(self, dt: datetime) -> datetime:
+        if self.interval is not None:
+            return dt + self.interval
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # skip whole months, days and hours that cannot match; at most a few
+        # hundred steps even for schedules that fire once a year
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Schedule {self.spec!r} never fires")
+
+
+def _parse_field(field: str, low: int, high: int) -> set:
+    values = set()
+    for part in field.split(","):
+        rng, _, step = part.partition("/")
+        if rng == "*":
+            start, end = low, high
+        elif "-" in rng:
+            start, end = (int(v) for v in rng.split("-", 1))
+        else:
+            start = end = int(rng)
+            if step:
+                end = high
+        if not (low <= start <= end <= high):
+            raise ValueError(f"Cron field {field!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, int(step) if step else 1))
+    return values
+
+
+@dataclass
+class Job:
+    name: str
+    schedule: Schedule
+    # generator function; each iteration is one chunk and yields the items it handled
+    run: Callable[[], Iterator[int]]
+
+
+class LeaseLost(Exception):
+    """Raised when another worker took over a job's lease mid-run."""
+
+
+def _owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Scheduler:
+    """Runs due `jobs` on the current event loop (see module docstring)."""
+
+    def __init__(self, jobs: List[Job], tick: float = None, lease_seconds: int = None):
+        self.jobs: Dict[str, Job] = {job.name: job for job in jobs}
+        self.tick = config.SCHEDULER_TICK_SECONDS if tick is None else tick
+        self.lease = timedelta(seconds=config.SCHEDULER_LEASE_SECONDS if lease_seconds is None else lease_seconds)
+        self.owner = _owner_id()
+        self._task: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._loop(), name="scheduler")
+
+    async def stop(self) -> None:
+        """Stop claiming jobs; running jobs finish their current chunk and release their lease."""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    async def _loop(self) -> None:
+        try:
+            await asyncio.to_thread(self.register)
+        except Exception:
+            logger.exception("Could not register scheduled jobs; the scheduler is not running")
+            return
+        while not self._stopping.is_set():
+            try:
+                for name in await asyncio.to_thread(self.claim_due):
+                    self._running[name] = asyncio.create_task(self._run(self.jobs[name]), name=f"job:{name}")
+                    self._running[name].add_done_callback(lambda _t, name=name: self._running.pop(name, None))
+            except Exception:
+                logger.exception("Scheduler tick failed")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.tick)
+            except asyncio.TimeoutError:
+                pass
+
+    def register(self) -> None:
+        """Create the lease row of each job, and pull in due times made earlier by a schedule change."""
+        now = datetime.utcnow()
+        for job in self.jobs.values():
+            next_run = job.schedule.next_after(now)
+            try:
+                with session_scope() as db:
+                    if db.get(models.JobLease, job.name) is None:
+                        db.add(models.JobLease(name=job.name, next_run_at=next_run))
+                    else:
+                        db.execute(
+                            update(models.JobLease)
+                            .where(models.JobLease.name == job.name, models.JobLease.next_run_at > next_run)
+                            .values(next_run_at=next_run)
+                        )
+            except IntegrityError:
+                # another worker registered it first
+                continue
+
+    def claim_due(self) -> List[str]:
+        """Take the lease of every due job this worker is not already running."""
+        now = datetime.utcnow()
+        lease = models.JobLease
+        claimed = []
+        with session_scope() as db:
+            due = db.execute(
+                select(lease.name).where(
+                    lease.name.in_(list(self.jobs)),
+                    lease.next_run_at <= now,
+                    or_(lease.lease_until.is_(None), lease.lease_until < now),
+                )
+            ).scalars().all()
+            for name in due:
+                if name in self._running:
+                    continue
+                # conditional on the same predicate, so only one worker wins
+                won = db.execute(
+                    update(lease)
+                    .where(
+                        lease.name == name,
+                        lease.next_run_at <= now,
+                        or_(lease.lease_until.is_(None), lease.lease_until < now),
+                    )
+                    .values(owner=self.owner, lease_until=now + self.lease)
+                ).rowcount
+                if won:
+                    claimed.append(name)
+        return claimed
+
+    def _renew(self, name: str) -> None:
+        with session_scope() as db:
+            renewed = db.execute(
+                update(models.JobLease)
+                .where(models.JobLease.name == name, models.JobLease.owner == self.owner)
+                .values(lease_until=datetime.utcnow() + self.lease)
+            ).rowcount
+        if not renewed:
+            raise LeaseLost(name)
+
+    def _release(self, job: Job, resume: bool = False) -> None:
+        now = datetime.utcnow()
+        with session_scope() as db:
+            db.execute(
+                update(models.JobLease)
+                .where(models.JobLease.name == job.name, models.JobLease.owner == self.owner)
+                # a run cut short by shutdown is due again at once, on any worker
+                .values(owner=None, lease_until=None, next_run_at=now if resume else job.schedule.next_after(now))
+            )
+
+    def _start_run(self, job: Job, started: datetime) -> int:
+        with session_scope() as db:
+            run = models.JobRun(job=job.name, owner=self.owner, status="running", started_at=started)
+            db.add(run)
+            db.flush()
+            return run.id
+
+    def _finish_run(self, run_id: int, status: str, chunks: int, items: int, duration: float, error: str = None) -> None:
+        with session_scope() as db:
+            db.execute(
+                update(models.JobRun)
+                .where(models.JobRun.id == run_id)
+                .values(
+                    status=status, chunks=chunks, items=items, error=error,
+                    finished_at=datetime.utcnow(), duration_ms=round(duration * 1000, 3),
+                )
+            )
+
+    async def _run(self, job: Job) -> None:
+        started = datetime.utcnow()
+        start = time.perf_counter()
+        chunks = items = 0
+        status, error = "success", None
+        try:
+            run_id = await asyncio.to_thread(self._start_run, job, started)
+        except Exception:
+            logger.exception("Could not record the start of job %s", job.name)
+            run_id = None
+        try:
+            chunk_iter = job.run()
+            while True:
+                n = await asyncio.to_thread(next, chunk_iter, None)
+                if n is None:
+                    break
+                chunks += 1
+                items += n
+                if self._stopping.is_set():
+                    status = "stopped"
+                    chunk_iter.close()
+                    break
+                await asyncio.to_thread(self._renew, job.name)
+        except LeaseLost:
+            status = "lost_lease"
+            logger.warning("Job %s lost its lease after %d chunks", job.name, chunks)
+        except Exception as exc:
+            status, error = "failed", f"{type(exc).__name__}: {exc}"[:2000]
+            logger.exception("Job %s failed", job.name)
+        duration = time.perf_counter() - start
+        metrics.job_runs.inc(job.name, status)
+        metrics.job_duration.observe(duration, job.name)
+        logger.info("Job %s %s: %d items in %d chunks, %.2f s", job.name, status, items, chunks, duration)
+        try:
+            if run_id is not None:
+                await asyncio.to_thread(self._finish_run, run_id, status, chunks, items, duration, error)
+            if status != "lost_lease":
+                await asyncio.to_thread(self._release, job, status == "stopped")
+        except Exception:
+            logger.exception("Could not record the end of job %s", job.name)
+
@@ -5,9 +5,9 @@ request/response DTOs used by the API.
 """
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, EmailStr, validator, Field, ConfigDict
 import re
 
@@ -85,6 +85,9 @@ class LocationBase(BaseModel):
 class LocationOut(LocationBase):
     id: int
     warehouse_id: Optional[int]
+    parent_id: Optional[int] = None
+    # ids from the root down to this location, e.g. "/3/17/42/"
+    path: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -187,6 +190,12 @@ class ReorderRuleCreate(BaseModel):
 
 class ReorderRuleOut(ReorderRuleCreate):
     id: int
+    # last demand forecast (POST /reorder-rules/forecast)
+    daily_demand: Optional[Decimal] = None
+    suggested_min_qty: Optional[Decimal] = None
+    suggested_reorder_qty: Optional[Decimal] = None
+    days_of_cover: Optional[Decimal] = None
+    forecast_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -220,12 +229,23 @@ class WarehouseUpdate(BaseModel):
 
 
 class LocationCreate(LocationBase):
-    pass
+    parent_id: Optional[int] = None
+    # taken from the parent when it has a warehouse
+    warehouse_id: Optional[int] = None
 
 
 class LocationUpdate(BaseModel):
     name: Optional[str] = None
     type: Optional[LocationType] = None
+    # null moves the location to the top level; its sub-locations move with it
+    parent_id: Optional[int] = None
+    warehouse_id: Optional[int] = None
+
+
+class LocationStock(BaseModel):
+    product_id: int
+    quantity: Decimal
+    reserved_qty: Decimal
 
 
 class StockMoveCreate(BaseModel):
@@ -279,6 +299,74 @@ class ReorderRuleUpdate(BaseModel):
     reorder_qty: Optional[Decimal] = None
 
 
+class ForecastRunOut(BaseModel):
+    method: str
+    rules: int
+    # (product, warehouse) series plus one company-wide series per product
+    series: int
+    history_days: int
+    first_day: date
+    applied: bool
+    seconds: Dict[str, float]
+
+
+class ReplenishmentLine(BaseModel):
+    rule_id: int
+    product_id: int
+    # on hand - reserved + incoming when the rule was evaluated
+    forecast_qty: Decimal
+    order_qty: Decimal
+
+
+class ReplenishmentOrder(BaseModel):
+    # set once the draft receipt exists (not in dry runs)
+    operation_id: Optional[int]
+    reference: Optional[str]
+    warehouse_id: Optional[int]
+    partner_id: Optional[int]
+    source_loc_id: Optional[int]
+    dest_loc_id: int
+    lines: List[ReplenishmentLine]
+
+
+class ReplenishmentSkip(BaseModel):
+    rule_id: int
+    reason: str
+
+
+class ReplenishmentRunOut(BaseModel):
+    dry_run: bool
+    rules_evaluated: int
+    rules_triggered: int
+    orders: List[ReplenishmentOrder]
+    skipped: List[ReplenishmentSkip]
+
+
+class RebalanceLine(BaseModel):
+    product_id: int
+    quantity: Decimal
+
+
+class RebalanceTransfer(BaseModel):
+    # set once the draft transfer exists (not in dry runs)
+    operation_id: Optional[int]
+    reference: Optional[str]
+    source_warehouse_id: int
+    dest_warehouse_id: int
+    source_loc_id: int
+    dest_loc_id: int
+    lines: List[RebalanceLine]
+
+
+class RebalanceRunOut(BaseModel):
+    dry_run: bool
+    products_short: int
+    # total of (min_qty - position) over the short warehouses, before and after the transfers
+    shortfall_before: Decimal
+    shortfall_after: Decimal
+    transfers: List[RebalanceTransfer]
+
+
 class UserUpdate(BaseModel):
     full_name: Optional[str] = None
 
@@ -0,0 +1,33 @@
+"""Fast JSON rendering for large list responses.
+
+The default list endpoints return ORM entities and let FastAPI validate each
+row against the `response_model` before encoding it. For large pages that
+validation dominates the request. The helpers here select plain column
+tuples and encode them with pydantic-core's serializer in one pass, which
+produces the same JSON (Decimals as strings, ISO datetimes, enum values)
+without building a model per row.
+
+The `list_*` service functions take the `columns` to select (see
+`model_columns`); with it they return those row tuples instead of entities.
+"""
+from typing import Iterable, List, Sequence, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+def schema_fields(schema: Type[BaseModel]) -> List[str]:
+    """Return the field names of a response schema in declaration order."""
+    return list(schema.model_fields)
+
+
+def model_columns(model, names: Sequence[str]) -> list:
+    """Map field names to the mapped columns of `model` (e.g. `Product.sku`)."""
+    return [getattr(model, name) for name in names]
+
+
+def render_rows(names: Sequence[str], rows: Iterable[Sequence]) -> Response:
+    """Encode column tuples as a JSON array of objects keyed by `names`."""
+    payload = to_json([dict(zip(names, row)) for row in rows])
+    return Response(content=payload, media_type="application/json")
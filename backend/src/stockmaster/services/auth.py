@@ -1,31 +1,35 @@
 """Authentication services: password hashing, token creation, user helpers."""
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 import secrets
-import smtplib
 import os
 
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
-from .. import models, schemas
+from .. import database, models, schemas
 from ..core import config
+from ..core.cache import TTLCache
+from . import hashing, mailer
+from .otp_store import OTPRateLimited, get_otp_store  # noqa: F401
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Token subject (email) -> schemas.UserOut snapshot of the authenticated user.
+# Entries are dropped by `invalidate_cached_user` when the user changes.
+_user_cache = TTLCache(maxsize=config.USER_CACHE_MAXSIZE, ttl=config.USER_CACHE_TTL_SECONDS)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plaintext password against a stored hash using passlib.
 
     Uses Argon2 via passlib; no manual truncation is required for Argon2.
+    Runs on the bounded hashing pool (see `services.hashing`).
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return hashing.verify_password(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Hash a plaintext password using Argon2 (passlib CryptContext)."""
-    return pwd_context.hash(password)
+    """Hash a plaintext password using Argon2 on the bounded hashing pool."""
+    return hashing.hash_password(password)
 
 
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
@@ -36,8 +40,7 @@ def create_user(db: Session, user_in: schemas.UserCreate) -> models.User:
     hashed = get_password_hash(user_in.password)
     user = models.User(email=user_in.email, password_hash=hashed, full_name=user_in.full_name)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
     return user
 
 
@@ -45,6 +48,10 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[models
     user = get_user_by_email(db, email)
     if not user:
         return None
+    # Detach the loaded user and end the transaction so the pooled connection
+    # is not held for the duration of the (slow) hash check.
+    db.expunge(user)
+    db.rollback()
     if not verify_password(password, user.password_hash):
         return None
     return user
@@ -61,71 +68,94 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def get_current_user_from_token(db: Session, token: str) -> models.User:
+def create_user_token(user: models.User) -> str:
+    """Issue an access token carrying the user's email (`sub`) and id (`uid`)."""
+    return create_access_token({"sub": user.email, "uid": user.id})
+
+
+def decode_access_token(token: str) -> Tuple[str, Optional[int]]:
+    """Validate a bearer token and return its (email, user id) claims.
+
+    `user id` is None for tokens issued before `uid` was added.
+    """
     credentials_exception = Exception("Could not validate credentials")
     try:
         payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = get_user_by_email(db, email=email)
-    if user is None:
+    email: str = payload.get("sub")
+    if email is None:
         raise credentials_exception
-    return user
+    return email, payload.get("uid")
 
 
-# Simple in-memory OTP store: {email: {otp: str, expires_at: datetime}}
-# NOTE: this is intentionally simple for the demo. For production use a
-# persistent store (Redis, DB table) so OTPs survive restarts and are rate-limited.
-_otp_store: dict = {}
-OTP_EXPIRY_MINUTES = int(os.getenv("PWD_RESET_OTP_EXPIRE_MINUTES", "10"))
+def get_cached_user(email: str) -> Optional[schemas.UserOut]:
+    return _user_cache.get(email)
 
 
-def _send_email(to_email: str, subject: str, body: str) -> None:
-    """Try to send mail via SMTP if configured, otherwise print to console.
+def load_user_snapshot(db: Session, email: str, user_id: Optional[int] = None) -> schemas.UserOut:
+    """Load the token's user from the database and cache its snapshot.
+
+    Tokens carrying `uid` are resolved by primary key; older tokens fall back
+    to the email lookup.
+    """
+    if user_id is not None:
+        user = db.get(models.User, user_id)
+        if user is not None and user.email != email:
+            user = None
+    else:
+        user = get_user_by_email(db, email=email)
+    if user is None:
+        raise Exception("Could not validate credentials")
+    snapshot = schemas.UserOut.model_validate(user)
+    _user_cache.set(email, snapshot)
+    return snapshot
+
+
+def get_current_user_from_token(db: Session, token: str) -> schemas.UserOut:
+    """Resolve a bearer token to a snapshot of its user.
 
-    Environment variables (optional): SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS
+    Snapshots are served from a TTL-bounded LRU cache keyed by the token
+    subject and loaded with `load_user_snapshot` on a miss.
     """
-    host = os.getenv("SMTP_HOST")
-    port = int(os.getenv("SMTP_PORT", "0") or 0)
-    user = os.getenv("SMTP_USER")
-    password = os.getenv("SMTP_PASS")
-
-    if host and port:
-        try:
-            server = smtplib.SMTP(host, port, timeout=10)
-            server.starttls()
-            if user and password:
-                server.login(user, password)
-            msg = f"Subject: {subject}\n\n{body}"
-            server.sendmail(user or f"noreply@{host}", [to_email], msg)
-            server.quit()
-            return
-        except Exception:
-            # swallow and fallback to console printing
-            pass
-
-    # Fallback: log to stdout (visible in uvicorn logs)
-    print(f"--- Password reset email to: {to_email} ---")
-    print("Subject:", subject)
-    print(body)
-    print("--- end email ---")
+    email, user_id = decode_access_token(token)
+    cached = get_cached_user(email)
+    if cached is not None:
+        return cached
+    return load_user_snapshot(db, email, user_id)
+
+
+def invalidate_cached_user(email: str) -> None:
+    """Forget the cached snapshot for `email` after the user changed."""
+    _user_cache.pop(email)
+
+
+# OTPs live in the store selected by OTP_STORE (see services.otp_store)
+OTP_EXPIRY_MINUTES = int(os.getenv("PWD_RESET_OTP_EXPIRE_MINUTES", "10"))
+
+
+def _send_email(to_email: str, subject: str, body: str) -> None:
+    """Queue mail for background delivery (see `services.mailer`)."""
+    mailer.send_mail(to_email, subject, body)
 
 
 def generate_and_send_reset_otp(db: Session, email: str) -> bool:
-    """Generate a numeric 6-digit OTP, store it in memory and send to email.
+    """Generate a numeric 6-digit OTP, store it in the OTP store and send to email.
 
     Returns True if user exists and OTP was generated/sent, False otherwise.
+    Raises `OTPRateLimited` when the email exceeded its request allowance; the
+    check runs before the user lookup so it does not reveal whether the email
+    is registered.
     """
+    store = get_otp_store()
+    store.register_request(email)
     user = get_user_by_email(db, email)
     if not user:
         return False
     # 6-digit numeric
     otp = f"{secrets.randbelow(10**6):06d}"
     expires_at = datetime.utcnow() + timedelta(minutes=OTP_EXPIRY_MINUTES)
-    _otp_store[email] = {"otp": otp, "expires_at": expires_at}
+    store.save(email, otp, expires_at)
 
     subject = "Your StockMaster password reset code"
     body = (
@@ -137,20 +167,11 @@ def generate_and_send_reset_otp(db: Session, email: str) -> bool:
 
 
 def verify_password_reset_otp(email: str, otp: str) -> bool:
-    info = _otp_store.get(email)
-    if not info:
-        return False
-    if info.get("otp") != otp:
-        return False
-    if datetime.utcnow() > info.get("expires_at"):
-        # expired, clear
-        _otp_store.pop(email, None)
-        return False
-    return True
+    return get_otp_store().verify(email, otp)
 
 
 def clear_password_reset_otp(email: str) -> None:
-    _otp_store.pop(email, None)
+    get_otp_store().discard(email)
 
 
 def reset_password(db: Session, email: str, new_password: str) -> Optional[models.User]:
@@ -160,8 +181,12 @@ def reset_password(db: Session, email: str, new_password: str) -> Optional[model
     hashed = get_password_hash(new_password)
     user.password_hash = hashed
     db.add(user)
-    db.commit()
-    db.refresh(user)
-    # clear any OTP associated
-    clear_password_reset_otp(email)
+    db.flush()
+
+    def _after_commit():
+        invalidate_cached_user(email)
+        # clear any OTP associated
+        clear_password_reset_otp(email)
+
+    database.on_commit(db, _after_commit)
     return user
@@ -0,0 +1,102 @@
+"""Dashboard KPI queries.
+
+The KPIs are computed with four aggregate statements (product count, stock
+levels, operation counts by type/status, scheduled internal transfers) built
+by `kpi_statements()`, so the same SQL runs on a sync `Session` (`get_kpis`)
+or an `AsyncSession` (`get_kpis_async`).
+"""
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import Select, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import models
+
+PENDING_STATUSES = (models.OperationStatus.draft, models.OperationStatus.waiting, models.OperationStatus.ready)
+
+
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def kpi_statements(
+    warehouse_id: Optional[int] = None, category: Optional[str] = None, now: Optional[datetime] = None
+) -> Dict[str, Select]:
+    """Build the KPI statements, keyed by the result they produce."""
+    now = now or datetime.utcnow()
+    quant = models.StockQuant
+    op = models.StockOperation
+
+    # Use StockQuant as the authoritative on-hand snapshot (quantity - reserved_qty)
+    onhand_by_product = select(
+        quant.product_id.label("product_id"),
+        func.coalesce(func.sum(quant.quantity - quant.reserved_qty), 0).label("onhand"),
+    ).group_by(quant.product_id)
+    if warehouse_id is not None:
+        onhand_by_product = onhand_by_product.where(quant.warehouse_id == warehouse_id)
+    onhand_sub = onhand_by_product.subquery()
+
+    # Left-join products to the quant aggregation so products without quants count as onhand = 0
+    onhand = func.coalesce(onhand_sub.c.onhand, 0)
+    stock = (
+        select(
+            _count_where(onhand > 0).label("in_stock"),
+            _count_where(onhand <= models.Product.min_stock_level).label("low_stock"),
+            _count_where(onhand == 0).label("out_of_stock"),
+        )
+        .select_from(models.Product)
+        .outerjoin(onhand_sub, onhand_sub.c.product_id == models.Product.id)
+    )
+    if category is not None:
+        stock = stock.where(models.Product.category == category)
+
+    return {
+        "products": select(func.count()).select_from(models.Product),
+        "stock": stock,
+        "operations": select(op.operation_type, op.status, func.count(op.id)).group_by(op.operation_type, op.status),
+        # Internal transfers scheduled in the future and not done
+        "scheduled_internal": select(func.count())
+        .select_from(op)
+        .where(
+            op.operation_type == models.OperationType.internal,
+            op.status != models.OperationStatus.done,
+            op.scheduled_date.is_not(None),
+            op.scheduled_date > now,
+        ),
+    }
+
+
+def build_kpis(results: Dict[str, list]) -> dict:
+    """Assemble the KPI payload from the rows of each `kpi_statements()` query."""
+    in_stock, low_stock, out_of_stock = results["stock"][0]
+    ops_summary: Dict[str, int] = {}
+    pending = {models.OperationType.receipt: 0, models.OperationType.delivery: 0}
+    for op_type, op_status, count in results["operations"]:
+        ops_summary[op_status.value] = ops_summary.get(op_status.value, 0) + count
+        if op_type in pending and op_status in PENDING_STATUSES:
+            pending[op_type] += count
+
+    return {
+        "total_products": int(results["products"][0][0]),
+        "total_products_in_stock": int(in_stock),
+        "low_stock_count": int(low_stock),
+        "out_of_stock_count": int(out_of_stock),
+        "pending_receipts": pending[models.OperationType.receipt],
+        "pending_deliveries": pending[models.OperationType.delivery],
+        "internal_transfers_scheduled": int(results["scheduled_internal"][0][0]),
+        "operations": ops_summary,
+    }
+
+
+def get_kpis(db: Session, warehouse_id: Optional[int] = None, category: Optional[str] = None) -> dict:
+    statements = kpi_statements(warehouse_id, category)
+    return build_kpis({key: db.execute(stmt).all() for key, stmt in statements.items()})
+
+
+async def get_kpis_async(
+    db: AsyncSession, warehouse_id: Optional[int] = None, category: Optional[str] = None
+) -> dict:
+    statements = kpi_statements(warehouse_id, category)
+    return build_kpis({key: (await db.execute(stmt)).all() for key, stmt in statements.items()})
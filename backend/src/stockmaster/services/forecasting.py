@@ -0,0 +1,205 @@
+"""Demand forecast for reorder rules, vectorized with NumPy.
+
+`run()` reads the outbound stock moves of every rule product for the last
+`history_days` in one grouped statement (quantity per product, source
+warehouse and day) and lays them out as a matrix with one row per
+(product, warehouse) series and one column per day, plus one row per product
+for the company-wide total. The forecast is computed for all rows at once:
+
+- `ses`: simple exponential smoothing with `alpha`, as one matrix-vector
+  product with the smoothing weights (no per-series loop);
+- `sma`: the mean of the last `window` days.
+
+Outbound means leaving the warehouse: deliveries, losses and transfers to
+another warehouse (transfers between warehouses are not company demand, so
+they are left out of the totals). From the daily rate and the standard
+deviation of the last `window` days, each rule gets
+
+- `suggested_min_qty`: reorder point, `rate * lead_time + z * sd * sqrt(lead_time)`
+  where `z` matches `service_level`;
+- `suggested_reorder_qty`: demand over one `cycle_days` order cycle;
+- `days_of_cover`: the rule's stock position (see
+  `replenishment.stock_positions`) divided by the daily rate.
+
+The rate is rounded to the 4 decimals `daily_demand` stores before anything
+is derived from it; a rate that rounds to 0 is no demand: both suggestions
+are 0 and `days_of_cover` is NULL (as it is when it would not fit its column).
+
+The values are written to the rule's forecast columns in one bulk UPDATE;
+with `apply=True` they also replace `min_qty` and `reorder_qty`.
+"""
+import math
+import time
+from datetime import datetime, timedelta
+from statistics import NormalDist
+from typing import Optional
+
+from sqlalchemy import Float, and_, case, func, select, type_coerce, update
+from sqlalchemy.orm import Session, aliased
+
+from .. import models
+from ..core import config
+from . import replenishment
+
+METHODS = ("ses", "sma")
+
+# scale of ReorderRule.daily_demand; a rate that rounds to 0 is no demand
+RATE_DECIMALS = 4
+# largest value ReorderRule.days_of_cover (Numeric(10, 1)) holds
+MAX_DAYS_OF_COVER = 999_999_999.9
+
+
+def _outbound_by_day(db: Session, since: datetime):
+    """(product, source warehouse, day, leaves the company, quantity) rows."""
+    move = models.StockMove
+    src = aliased(models.Location)
+    dst = aliased(models.Location)
+    internal = models.LocationType.internal
+    to_internal = and_(dst.id.is_not(None), dst.type == internal)
+    day = func.date(move.date)
+    leaves_company = case((to_internal, 0), else_=1)
+    stmt = (
+        select(
+            move.product_id,
+            src.warehouse_id,
+            day,
+            leaves_company,
+            # floats straight from the driver; no Decimal per row
+            type_coerce(func.sum(move.quantity), Float),
+        )
+        .join(src, src.id == move.source_loc_id)
+        .outerjoin(dst, dst.id == move.dest_loc_id)
+        .where(
+            src.type == internal,
+            move.date >= since,
+            move.product_id.in_(select(models.ReorderRule.product_id)),
+            # moves inside one warehouse are not demand
+            ~and_(to_internal, dst.warehouse_id.is_not_distinct_from(src.warehouse_id)),
+        )
+        .group_by(move.product_id, src.warehouse_id, day, leaves_company)
+    )
+    return db.execute(stmt).all()
+
+
+def smoothing_weights(days: int, alpha: float):
+    """Weights `w` (oldest day first) so that `series @ w` is the SES level after the last day."""
+    import numpy as np
+
+    age = np.arange(days - 1, -1, -1, dtype=np.float64)
+    weights = alpha * (1 - alpha) ** age
+    # the level starts at the first observation
+    weights[0] = (1 - alpha) ** (days - 1)
+    return weights
+
+
+def run(
+    db: Session,
+    method: str = config.FORECAST_METHOD,
+    alpha: float = config.FORECAST_ALPHA,
+    window: int = config.FORECAST_WINDOW_DAYS,
+    history_days: int = config.FORECAST_HISTORY_DAYS,
+    lead_time_days: float = config.FORECAST_LEAD_TIME_DAYS,
+    cycle_days: float = config.FORECAST_CYCLE_DAYS,
+    service_level: float = config.FORECAST_SERVICE_LEVEL,
+    apply: bool = False,
+    now: Optional[datetime] = None,
+) -> dict:
+    """Forecast demand for every reorder rule and store the suggestions (see module docstring)."""
+    # imported here so workers that never forecast do not pay for NumPy at boot
+    import numpy as np
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown forecast method {method!r}; expected one of {METHODS}")
+    timings = {}
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    first_day = (now - timedelta(days=history_days - 1)).date()
+    window = min(window, history_days)
+
+    result = {"method": method, "rules": 0, "series": 0, "history_days": history_days, "first_day": first_day, "applied": apply}
+
+    rule_t = models.ReorderRule
+    rules = db.execute(select(rule_t.id, rule_t.product_id, rule_t.warehouse_id).order_by(rule_t.id)).all()
+    if not rules:
+        return {**result, "seconds": {}}
+    rows = _outbound_by_day(db, datetime.combine(first_day, datetime.min.time()))
+    timings["query"] = time.perf_counter() - started
+
+    # --- lay the rows out as (series x day) matrices -------------------------
+    mark = time.perf_counter()
+    day_index = {(first_day + timedelta(days=i)).isoformat(): i for i in range(history_days)}
+    product_ids = sorted({r.product_id for r in rules})
+    product_row = {p: i for i, p in enumerate(product_ids)}
+    series_row = {}
+    for r in rules:
+        if r.warehouse_id is not None:
+            series_row.setdefault((r.product_id, r.warehouse_id), len(series_row))
+    per_warehouse = np.zeros((len(series_row), history_days))
+    totals = np.zeros((len(product_ids), history_days))
+    if rows:
+        products, warehouses, days, external, qty = zip(*rows)
+        col = np.fromiter((day_index.get(str(d)[:10], -1) for d in days), dtype=np.int64, count=len(rows))
+        qty = np.fromiter((q or 0.0 for q in qty), dtype=np.float64, count=len(rows))
+        # rows of rules without a warehouse-level rule map to -1 and are skipped
+        srow = np.fromiter((series_row.get(k, -1) for k in zip(products, warehouses)), dtype=np.int64, count=len(rows))
+        prow = np.fromiter((product_row[p] for p in products), dtype=np.int64, count=len(rows))
+        ext = np.fromiter(external, dtype=bool, count=len(rows))
+        keep = (col >= 0) & (srow >= 0)
+        np.add.at(per_warehouse, (srow[keep], col[keep]), qty[keep])
+        keep = (col >= 0) & ext
+        np.add.at(totals, (prow[keep], col[keep]), qty[keep])
+    demand = np.vstack([per_warehouse, totals])
+    timings["matrix"] = time.perf_counter() - mark
+
+    # --- forecast every series at once ---------------------------------------
+    mark = time.perf_counter()
+    if method == "ses":
+        rate = demand @ smoothing_weights(history_days, alpha)
+    else:
+        rate = demand[:, -window:].mean(axis=1)
+    # to the stored scale first: SES leaves ~1e-50 for long-idle series, which
+    # would otherwise ceil to 1 and give days of cover past any column
+    rate = np.round(rate, RATE_DECIMALS)
+    sd = demand[:, -window:].std(axis=1, ddof=1) if window > 1 else np.zeros(len(demand))
+    z = NormalDist().inv_cdf(service_level)
+    idle = rate <= 0
+    reorder_point = np.where(idle, 0.0, np.ceil(rate * lead_time_days + z * sd * math.sqrt(lead_time_days)))
+    order_qty = np.where(idle, 0.0, np.ceil(rate * cycle_days))
+    timings["forecast"] = time.perf_counter() - mark
+
+    # --- write back -----------------------------------------------------------
+    mark = time.perf_counter()
+    positions, position_totals = replenishment.stock_positions(db)
+    offset = len(series_row)
+    params = []
+    for r in rules:
+        if r.warehouse_id is None:
+            i, position = offset + product_row[r.product_id], position_totals.get(r.product_id, 0)
+        else:
+            i, position = series_row[(r.product_id, r.warehouse_id)], positions.get((r.product_id, r.warehouse_id), 0)
+        daily = float(rate[i])
+        cover = round(float(position) / daily, 1) if daily > 0 else None
+        values = {
+            "id": r.id,
+            "daily_demand": daily,
+            "suggested_min_qty": float(reorder_point[i]),
+            "suggested_reorder_qty": float(order_qty[i]),
+            # beyond the column (and any horizon) is as good as unknown
+            "days_of_cover": cover if cover is not None and abs(cover) <= MAX_DAYS_OF_COVER else None,
+            "forecast_at": now,
+        }
+        if apply:
+            values["min_qty"] = values["suggested_min_qty"]
+            values["reorder_qty"] = values["suggested_reorder_qty"] or None
+        params.append(values)
+    # ORM bulk UPDATE by primary key: one executemany
+    db.execute(update(rule_t), params)
+    db.flush()
+    timings["write"] = time.perf_counter() - mark
+
+    return {
+        **result,
+        "rules": len(rules),
+        "series": len(demand),
+        "seconds": {k: round(v, 3) for k, v in timings.items()},
+    }
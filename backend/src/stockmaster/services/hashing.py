@@ -0,0 +1,100 @@
+"""Password hashing on a dedicated, bounded process pool.
+
+Argon2 is deliberately expensive. Running it inline in sync endpoints lets a
+burst of logins occupy the threadpool that also serves stock endpoints, and
+the CPU work competes for the GIL. Here hashing and verification run in a
+small process pool; callers wait on the result, and at most
+`HASH_POOL_WORKERS + HASH_POOL_QUEUE_LIMIT` calls may be in flight at once.
+Beyond that, callers wait up to `HASH_POOL_QUEUE_TIMEOUT` seconds for a slot
+and then get `HashingPoolBusy`, which the API turns into a 503.
+
+Set `HASH_POOL_WORKERS=0` to hash inline (useful for scripts and tests).
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from ..core import config
+
+
+def _argon2_settings() -> dict:
+    """Return the Argon2 cost overrides that are configured (passlib defaults otherwise)."""
+    settings = {
+        "argon2__time_cost": config.ARGON2_TIME_COST,
+        "argon2__memory_cost": config.ARGON2_MEMORY_COST,
+        "argon2__parallelism": config.ARGON2_PARALLELISM,
+    }
+    return {k: v for k, v in settings.items() if v is not None}
+
+
+_context = None
+
+
+def get_context():
+    """Return the passlib CryptContext, importing passlib on first use (keeps it off the boot path)."""
+    global _context
+    if _context is None:
+        from passlib.context import CryptContext
+
+        _context = CryptContext(schemes=["argon2"], deprecated="auto", **_argon2_settings())
+    return _context
+
+
+class HashingPoolBusy(RuntimeError):
+    """Raised when no hashing slot frees up within the queue timeout."""
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, config.HASH_POOL_WORKERS + config.HASH_POOL_QUEUE_LIMIT))
+
+
+def _hash(password: str) -> str:
+    return get_context().hash(password)
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return get_context().verify(password, hashed)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that already runs server threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=config.HASH_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _run(fn, *args):
+    if config.HASH_POOL_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(timeout=config.HASH_POOL_QUEUE_TIMEOUT):
+        raise HashingPoolBusy("Password hashing queue is full")
+    try:
+        return _get_pool().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password: str) -> str:
+    """Hash a plaintext password with Argon2 on the hashing pool."""
+    return _run(_hash, password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Verify a plaintext password against an Argon2 hash on the hashing pool."""
+    return _run(_verify, password, hashed)
+
+
+def shutdown() -> None:
+    """Stop the worker processes (called on application shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
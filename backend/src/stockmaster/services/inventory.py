@@ -1,60 +1,81 @@
 """Inventory service: reference generation, availability checks, validation -> ledger moves."""
-from typing import Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select
 from decimal import Decimal
 
-from .. import models, schemas
+from .. import database, metrics, models, schemas
 
 
-def generate_reference(db: Session, operation_type: str) -> str:
-    # operation_type may be an Enum; use its value if so
-    op_val = getattr(operation_type, "value", operation_type)
-    like_pattern = f"{op_val}/%"
+def _last_reference_number(db: Session, op_val: str) -> int:
     last = (
         db.query(models.StockOperation)
-        .filter(models.StockOperation.reference.like(like_pattern))
+        .filter(models.StockOperation.reference.like(f"{op_val}/%"))
         .order_by(desc(models.StockOperation.id))
         .first()
     )
     if not last:
-        return f"{op_val}/0001"
+        return 0
     try:
-        suffix = last.reference.rsplit("/", 1)[-1]
-        num = int(suffix)
-        return f"{op_val}/{num+1:04d}"
+        return int(last.reference.rsplit("/", 1)[-1])
     except Exception:
-        return f"{op_val}/0001"
+        return 0
+
+
+def generate_reference(db: Session, operation_type: str) -> str:
+    # operation_type may be an Enum; use its value if so
+    op_val = getattr(operation_type, "value", operation_type)
+    return f"{op_val}/{_last_reference_number(db, op_val) + 1:04d}"
 
 
 def create_operation(db: Session, op_in: schemas.StockOperationCreate, created_by_id: Optional[int] = None) -> models.StockOperation:
-    # generate a human-readable reference using operation type value
-    ref = generate_reference(db, op_in.operation_type)
-    op = models.StockOperation(
-        reference=ref,
-        source_loc_id=op_in.source_loc_id,
-        dest_loc_id=op_in.dest_loc_id,
-        scheduled_date=op_in.scheduled_date,
-        status=models.OperationStatus.draft,
-        # set operation_type and optional partner
-        operation_type=op_in.operation_type,
-        partner_id=getattr(op_in, "partner_id", None),
-        created_by_id=created_by_id,
-    )
-    db.add(op)
+    return create_operations(db, [op_in], created_by_id=created_by_id)[0]
+
+
+def create_operations(
+    db: Session, ops_in: Sequence[schemas.StockOperationCreate], created_by_id: Optional[int] = None
+) -> List[models.StockOperation]:
+    """Create draft operations with one flush; references are numbered in input order per type."""
+    # one reference lookup per operation type instead of one per operation
+    next_number = {}
+    ops = []
+    for op_in in ops_in:
+        op_val = getattr(op_in.operation_type, "value", op_in.operation_type)
+        if op_val not in next_number:
+            next_number[op_val] = _last_reference_number(db, op_val) + 1
+        ref = f"{op_val}/{next_number[op_val]:04d}"
+        next_number[op_val] += 1
+        ops.append(models.StockOperation(
+            reference=ref,
+            source_loc_id=op_in.source_loc_id,
+            dest_loc_id=op_in.dest_loc_id,
+            scheduled_date=op_in.scheduled_date,
+            status=models.OperationStatus.draft,
+            # set operation_type and optional partner
+            operation_type=op_in.operation_type,
+            partner_id=getattr(op_in, "partner_id", None),
+            created_by_id=created_by_id,
+            # through the relationship, so one flush inserts the operations and
+            # then all lines, and `op.lines` needs no reload for the response
+            lines=[
+                models.StockOperationLine(
+                    product_id=line.product_id,
+                    demand_qty=Decimal(str(line.demand_qty)),
+                    done_qty=Decimal("0"),
+                )
+                for line in op_in.lines
+            ],
+        ))
+    db.add_all(ops)
     db.flush()
+    labels = [metrics.enum_label(op.operation_type) for op in ops]
 
-    for line in op_in.lines:
-        opl = models.StockOperationLine(
-            operation_id=op.id,
-            product_id=line.product_id,
-            demand_qty=Decimal(str(line.demand_qty)),
-            done_qty=Decimal("0"),
-        )
-        db.add(opl)
-    db.commit()
-    db.refresh(op)
-    return op
+    def _count():
+        for label in labels:
+            metrics.operations_created.inc(label)
+
+    database.on_commit(db, _count)
+    return ops
 
 
 def _current_stock_for_product_at_location(db: Session, product_id: int, location_id: int) -> Decimal:
@@ -109,7 +130,9 @@ def check_availability(db: Session, operation_id: int) -> Tuple[bool, str]:
 
     op.status = models.OperationStatus.ready if all_ok else models.OperationStatus.waiting
     db.add(op)
-    db.commit()
+    db.flush()
+    result = op.status.value
+    database.on_commit(db, lambda: metrics.stock_checks.inc(result))
     return all_ok, "; ".join(msgs)
 
 
@@ -120,6 +143,11 @@ def validate_operation(db: Session, operation_id: int, user_id: Optional[int] =
     if op.status == models.OperationStatus.done:
         return False, "Operation already done"
     created = []
+    # set here, so the moves are inserted as one batch (see models._copy_warehouse_ids)
+    warehouse_of = dict(db.execute(
+        select(models.Location.id, models.Location.warehouse_id)
+        .where(models.Location.id.in_((op.source_loc_id, op.dest_loc_id)))
+    ).all())
     for line in op.lines:
         remaining = Decimal(line.demand_qty) - Decimal(line.done_qty)
         if remaining <= 0:
@@ -128,6 +156,8 @@ def validate_operation(db: Session, operation_id: int, user_id: Optional[int] =
             product_id=line.product_id,
             source_loc_id=op.source_loc_id,
             dest_loc_id=op.dest_loc_id,
+            source_warehouse_id=warehouse_of.get(op.source_loc_id),
+            dest_warehouse_id=warehouse_of.get(op.dest_loc_id),
             quantity=remaining,
             reference_id=op.id,
         )
@@ -137,7 +167,14 @@ def validate_operation(db: Session, operation_id: int, user_id: Optional[int] =
 
     op.status = models.OperationStatus.done
     db.add(op)
-    db.commit()
+    db.flush()
+    op_type = metrics.enum_label(op.operation_type)
+
+    def _count():
+        metrics.operations_validated.inc(op_type)
+        metrics.moves_written.inc(amount=len(created))
+
+    database.on_commit(db, _count)
     return True, f"Created {len(created)} stock moves"
 
 
@@ -178,17 +215,15 @@ def update_operation(db: Session, operation_id: int, changes: dict) -> models.St
                     demand = Decimal(str(l.get("demand_qty") if l.get("demand_qty") is not None else l.get("demand") if l.get("demand") is not None else 0))
                 except Exception:
                     demand = Decimal(0)
-                opl = models.StockOperationLine(
-                    operation_id=op.id,
+                # appended to the loaded collection, so the response includes it
+                op.lines.append(models.StockOperationLine(
                     product_id=int(l.get("product_id")),
                     demand_qty=demand,
                     done_qty=Decimal(0),
-                )
-                db.add(opl)
+                ))
 
     db.add(op)
-    db.commit()
-    db.refresh(op)
+    db.flush()
     return op
 
 
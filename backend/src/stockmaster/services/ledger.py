@@ -1,5 +1,6 @@
-from typing import List
+from typing import List, Optional, Sequence
 from sqlalchemy.orm import Session
+from sqlalchemy import Select, select
 from sqlalchemy.exc import NoResultFound
 
 from .. import models, schemas
@@ -17,13 +18,21 @@ def create_ledger(db: Session, entry: schemas.StockLedgerCreate) -> models.Stock
         reason=entry.reason,
     )
     db.add(l)
-    db.commit()
-    db.refresh(l)
+    db.flush()
     return l
 
 
-def list_ledger(db: Session, skip: int = 0, limit: int = 100) -> List[models.StockLedger]:
-    return db.query(models.StockLedger).order_by(models.StockLedger.date.desc()).offset(skip).limit(limit).all()
+def select_ledger(skip: int = 0, limit: int = 100, columns: Optional[Sequence] = None) -> Select:
+    """Build the ledger list statement (shared by sync and async sessions)."""
+    stmt = select(*columns) if columns else select(models.StockLedger)
+    return stmt.order_by(models.StockLedger.date.desc()).offset(skip).limit(limit)
+
+
+def list_ledger(
+    db: Session, skip: int = 0, limit: int = 100, columns: Optional[Sequence] = None
+) -> List[models.StockLedger]:
+    result = db.execute(select_ledger(skip=skip, limit=limit, columns=columns))
+    return result.all() if columns else result.scalars().all()
 
 
 def get_ledger(db: Session, entry_id: int) -> models.StockLedger:
@@ -39,12 +48,11 @@ def update_ledger(db: Session, entry_id: int, changes: schemas.StockLedgerUpdate
         if v is not None and hasattr(l, k):
             setattr(l, k, v)
     db.add(l)
-    db.commit()
-    db.refresh(l)
+    db.flush()
     return l
 
 
 def delete_ledger(db: Session, entry_id: int) -> None:
     l = get_ledger(db, entry_id)
     db.delete(l)
-    db.commit()
+    db.flush()
@@ -1,20 +1,51 @@
-from typing import List, Optional
+from decimal import Decimal
+from typing import List, Optional, Sequence
 from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, literal, select, update
 from sqlalchemy.exc import NoResultFound
 
 from .. import models, schemas
 
 
+def subtree(path: str):
+    """Condition matching the locations under `path`, the location itself included.
+
+    Paths only hold digits and "/", and "/" sorts right before "0", so every
+    path starting with "/3/17/" lies in ["/3/17/", "/3/170"): a range scan on
+    the path index, unlike LIKE, which the SQLite planner will not use here.
+    """
+    return and_(models.Location.path >= path, models.Location.path < path[:-1] + "0")
+
+
+def _parent(db: Session, parent_id: Optional[int]) -> Optional[models.Location]:
+    if parent_id is None:
+        return None
+    parent = db.get(models.Location, parent_id)
+    if parent is None:
+        raise ValueError(f"Parent location {parent_id} not found")
+    return parent
+
+
 def create_location(db: Session, loc_in: schemas.LocationCreate) -> models.Location:
-    loc = models.Location(name=loc_in.name, type=loc_in.type)
+    parent = _parent(db, loc_in.parent_id)
+    warehouse_id = loc_in.warehouse_id
+    if parent is not None and parent.warehouse_id is not None:
+        if warehouse_id not in (None, parent.warehouse_id):
+            raise ValueError("A location belongs to the warehouse of its parent")
+        warehouse_id = parent.warehouse_id
+    loc = models.Location(name=loc_in.name, type=loc_in.type, parent_id=loc_in.parent_id, warehouse_id=warehouse_id)
     db.add(loc)
-    db.commit()
-    db.refresh(loc)
+    db.flush()
     return loc
 
 
-def list_locations(db: Session, skip: int = 0, limit: int = 100) -> List[models.Location]:
-    return db.query(models.Location).offset(skip).limit(limit).all()
+def list_locations(
+    db: Session, skip: int = 0, limit: int = 100, columns: Optional[Sequence] = None, parent_id: Optional[int] = None
+) -> List[models.Location]:
+    q = db.query(*columns) if columns else db.query(models.Location)
+    if parent_id is not None:
+        q = q.filter(models.Location.parent_id == parent_id)
+    return q.offset(skip).limit(limit).all()
 
 
 def get_location(db: Session, loc_id: int) -> models.Location:
@@ -24,18 +55,95 @@ def get_location(db: Session, loc_id: int) -> models.Location:
     return loc
 
 
+def _move_subtree(db: Session, loc: models.Location, parent: Optional[models.Location], warehouse_id: Optional[int]) -> None:
+    """Re-root `loc`'s subtree under `parent` with one UPDATE of its paths (and warehouse).
+
+    A warehouse change is copied to the subtree's moves and quants, which keep
+    their locations' warehouse_id (see `models._copy_warehouse_ids`).
+    """
+    old_path = loc.path
+    new_path = f"{parent.path if parent is not None else '/'}{loc.id}/"
+    values = {"path": literal(new_path) + func.substr(models.Location.path, len(old_path) + 1)}
+    moved = warehouse_id != loc.warehouse_id
+    if moved:
+        values["warehouse_id"] = warehouse_id
+    db.execute(
+        update(models.Location).where(subtree(old_path)).values(**values),
+        execution_options={"synchronize_session": "fetch"},
+    )
+    if not moved:
+        return
+    ids = select(models.Location.id).where(subtree(new_path))
+    move = models.StockMove
+    for loc_col, copy_col in (
+        (move.source_loc_id, move.source_warehouse_id),
+        (move.dest_loc_id, move.dest_warehouse_id),
+        (models.StockQuant.location_id, models.StockQuant.warehouse_id),
+    ):
+        db.execute(
+            update(copy_col.class_).where(loc_col.in_(ids)).values({copy_col: warehouse_id}),
+            execution_options={"synchronize_session": False},
+        )
+    # loaded moves and quants would still show the old warehouse
+    for obj in db.identity_map.values():
+        if isinstance(obj, (models.StockMove, models.StockQuant)):
+            db.expire(obj)
+
+
 def update_location(db: Session, loc_id: int, changes: schemas.LocationUpdate) -> models.Location:
     loc = get_location(db, loc_id)
-    for k, v in changes.__dict__.items():
-        if v is not None and hasattr(loc, k):
+    for k in ("name", "type"):
+        v = getattr(changes, k)
+        if v is not None:
             setattr(loc, k, v)
+
+    # parent_id / warehouse_id may be set to null, so look at what was sent
+    sent = changes.model_fields_set
+    parent_id = changes.parent_id if "parent_id" in sent else loc.parent_id
+    parent = _parent(db, parent_id)
+    if parent is not None and parent.path.startswith(loc.path):
+        raise ValueError("A location cannot be moved under itself or one of its children")
+    warehouse_id = changes.warehouse_id if "warehouse_id" in sent else loc.warehouse_id
+    if parent is not None and parent.warehouse_id is not None:
+        if "warehouse_id" in sent and warehouse_id != parent.warehouse_id:
+            raise ValueError("A location belongs to the warehouse of its parent")
+        warehouse_id = parent.warehouse_id
+    if parent_id != loc.parent_id or warehouse_id != loc.warehouse_id:
+        loc.parent_id = parent_id
+        db.flush()
+        # the children follow: their paths and warehouse change with loc's
+        _move_subtree(db, loc, parent, warehouse_id)
     db.add(loc)
-    db.commit()
-    db.refresh(loc)
+    db.flush()
     return loc
 
 
 def delete_location(db: Session, loc_id: int) -> None:
     loc = get_location(db, loc_id)
+    if db.query(models.Location.id).filter(models.Location.parent_id == loc_id).first() is not None:
+        raise ValueError("Location has child locations; move or delete them first")
     db.delete(loc)
-    db.commit()
+    db.flush()
+
+
+def stock_totals(db: Session, where, product_id: Optional[int] = None) -> List[dict]:
+    """Quant totals per product over the quants matching `where`."""
+    quant = models.StockQuant
+    stmt = (
+        select(quant.product_id, func.sum(quant.quantity), func.sum(quant.reserved_qty))
+        .where(where)
+        .group_by(quant.product_id)
+        .order_by(quant.product_id)
+    )
+    if product_id is not None:
+        stmt = stmt.where(quant.product_id == product_id)
+    return [
+        {"product_id": p, "quantity": Decimal(str(qty or 0)), "reserved_qty": Decimal(str(reserved or 0))}
+        for p, qty, reserved in db.execute(stmt)
+    ]
+
+
+def stock_under(db: Session, loc_id: int, product_id: Optional[int] = None) -> List[dict]:
+    """Quant totals per product over `loc_id` and every location under it."""
+    under = select(models.Location.id).where(subtree(get_location(db, loc_id).path))
+    return stock_totals(db, models.StockQuant.location_id.in_(under), product_id)
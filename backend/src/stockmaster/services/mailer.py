@@ -0,0 +1,183 @@
+"""Outbound mail queue with a background sender.
+
+Requests call `send_mail`, which only enqueues the message. A daemon thread
+drains the queue in batches over one reused SMTP connection, reconnecting
+when the server drops it and closing it after `MAIL_IDLE_SECONDS` without
+traffic. When SMTP is not configured, messages are printed to stdout
+instead (visible in uvicorn logs), as before.
+
+Environment (see `core.config`): SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS,
+SMTP_STARTTLS, SMTP_TIMEOUT, MAIL_FROM, MAIL_BATCH_SIZE, MAIL_IDLE_SECONDS,
+MAIL_QUEUE_MAXSIZE. For local testing, point SMTP_HOST/SMTP_PORT at an
+`aiosmtpd` server and set SMTP_STARTTLS=0.
+"""
+import logging
+import queue
+import smtplib
+import threading
+from email.message import EmailMessage
+from typing import List, Optional
+
+from ..core import config
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MailOutbox:
+    def __init__(
+        self,
+        host: Optional[str],
+        port: int,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        sender: Optional[str] = None,
+        timeout: float = 10,
+        batch_size: int = 50,
+        idle_seconds: float = 30,
+        maxsize: int = 1000,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.sender = sender or user or f"noreply@{host or 'localhost'}"
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.idle_seconds = idle_seconds
+        self._queue: "queue.Queue" = queue.Queue(maxsize=maxsize)
+        self._conn: Optional[smtplib.SMTP] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.host and self.port)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mail-outbox", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, to_email: str, subject: str, body: str) -> bool:
+        """Queue a message; returns False (and logs) if the outbox is full."""
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = to_email
+        msg["Subject"] = subject
+        msg.set_content(body)
+        self.start()
+        try:
+            self._queue.put_nowait(msg)
+            return True
+        except queue.Full:
+            logger.warning("Mail outbox full; dropping message to %s", to_email)
+            return False
+
+    def stop(self, timeout: float = 5) -> None:
+        """Flush queued messages and stop the sender thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.idle_seconds)
+            except queue.Empty:
+                self._disconnect()
+                continue
+            batch: List = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(m is _STOP for m in batch)
+            self._deliver([m for m in batch if m is not _STOP])
+            if stop:
+                self._disconnect()
+                return
+
+    def _deliver(self, batch: List[EmailMessage]) -> None:
+        for msg in batch:
+            if not self.configured:
+                self._print(msg)
+                continue
+            try:
+                self._send(msg)
+            except (smtplib.SMTPException, OSError):
+                # The pooled connection may have gone stale; reconnect once
+                self._disconnect()
+                try:
+                    self._send(msg)
+                except (smtplib.SMTPException, OSError):
+                    logger.exception("Failed to send mail to %s", msg["To"])
+                    self._disconnect()
+                    self._print(msg)
+
+    def _send(self, msg: EmailMessage) -> None:
+        if self._conn is None:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                conn.starttls()
+            if self.user and self.password:
+                conn.login(self.user, self.password)
+            self._conn = conn
+        self._conn.send_message(msg)
+
+    def _disconnect(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._conn = None
+
+    @staticmethod
+    def _print(msg: EmailMessage) -> None:
+        print(f"--- Password reset email to: {msg['To']} ---")
+        print("Subject:", msg["Subject"])
+        print(msg.get_content().rstrip("\n"))
+        print("--- end email ---")
+
+
+_outbox: Optional[MailOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> MailOutbox:
+    """Return the process-wide outbox configured from `core.config`."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = MailOutbox(
+                host=config.SMTP_HOST,
+                port=config.SMTP_PORT,
+                user=config.SMTP_USER,
+                password=config.SMTP_PASS,
+                starttls=config.SMTP_STARTTLS,
+                sender=config.MAIL_FROM,
+                timeout=config.SMTP_TIMEOUT,
+                batch_size=config.MAIL_BATCH_SIZE,
+                idle_seconds=config.MAIL_IDLE_SECONDS,
+                maxsize=config.MAIL_QUEUE_MAXSIZE,
+            )
+        return _outbox
+
+
+def send_mail(to_email: str, subject: str, body: str) -> bool:
+    """Queue a plain-text message for background delivery."""
+    return get_outbox().enqueue(to_email, subject, body)
+
+
+def shutdown() -> None:
+    """Flush and stop the outbox (called on application shutdown)."""
+    if _outbox is not None:
+        _outbox.stop()
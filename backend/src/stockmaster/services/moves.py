@@ -1,9 +1,9 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import NoResultFound
-from sqlalchemy import or_
+from sqlalchemy import Select, or_, select
 
-from .. import models, schemas
+from .. import database, metrics, models, schemas
 
 
 def create_move(db: Session, mv_in: schemas.StockMoveCreate) -> models.StockMove:
@@ -14,21 +14,23 @@ def create_move(db: Session, mv_in: schemas.StockMoveCreate) -> models.StockMove
         quantity=mv_in.quantity,
     )
     db.add(mv)
-    db.commit()
-    db.refresh(mv)
+    db.flush()
+    database.on_commit(db, metrics.moves_written.inc)
     return mv
 
 
-def list_moves(
-    db: Session,
+def select_moves(
     skip: int = 0,
     limit: int = 100,
     document_type: Optional[str] = None,
     status: Optional[str] = None,
     warehouse_id: Optional[int] = None,
     product_id: Optional[int] = None,
-) -> List[models.StockMove]:
-    """Return stock moves with optional filters.
+    columns: Optional[Sequence] = None,
+) -> Select:
+    """Build the stock-move list statement (shared by sync and async sessions).
+
+    Selects `columns` when given, otherwise `StockMove` entities.
 
     Filters supported:
     - document_type: filters by the linked StockOperation.operation_type
@@ -36,27 +38,57 @@ def list_moves(
     - warehouse_id: filters moves whose source or dest location belongs to the warehouse
     - product_id: filters by product
     """
-    q = db.query(models.StockMove)
+    stmt = select(*columns) if columns else select(models.StockMove)
 
     if product_id is not None:
-        q = q.filter(models.StockMove.product_id == product_id)
+        stmt = stmt.where(models.StockMove.product_id == product_id)
 
     if warehouse_id is not None:
         # Match moves where either the source or dest location belongs to the given warehouse
-        q = q.filter(
+        # (the move's own copies of the locations' warehouse_id; no join)
+        stmt = stmt.where(
             or_(
-                models.StockMove.source_location.has(models.Location.warehouse_id == warehouse_id),
-                models.StockMove.dest_location.has(models.Location.warehouse_id == warehouse_id),
+                models.StockMove.source_warehouse_id == warehouse_id,
+                models.StockMove.dest_warehouse_id == warehouse_id,
             )
         )
 
     if status is not None:
-        q = q.filter(models.StockMove.reference_operation.has(models.StockOperation.status == status))
+        stmt = stmt.where(models.StockMove.reference_operation.has(models.StockOperation.status == status))
 
     if document_type is not None:
-        q = q.filter(models.StockMove.reference_operation.has(models.StockOperation.operation_type == document_type))
+        stmt = stmt.where(models.StockMove.reference_operation.has(models.StockOperation.operation_type == document_type))
+
+    return stmt.order_by(models.StockMove.date.desc()).offset(skip).limit(limit)
 
-    return q.order_by(models.StockMove.date.desc()).offset(skip).limit(limit).all()
+
+def list_moves(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    document_type: Optional[str] = None,
+    status: Optional[str] = None,
+    warehouse_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    columns: Optional[Sequence] = None,
+) -> List[models.StockMove]:
+    """Return stock moves with optional filters (see `select_moves`).
+
+    When `columns` is given, row tuples of those columns are returned instead
+    of ORM entities (see `serialization.render_rows`).
+    """
+    result = db.execute(
+        select_moves(
+            skip=skip,
+            limit=limit,
+            document_type=document_type,
+            status=status,
+            warehouse_id=warehouse_id,
+            product_id=product_id,
+            columns=columns,
+        )
+    )
+    return result.all() if columns else result.scalars().all()
 
 
 def get_move(db: Session, move_id: int) -> models.StockMove:
@@ -72,12 +104,11 @@ def update_move(db: Session, move_id: int, changes: schemas.StockMoveUpdate) ->
         if v is not None and hasattr(mv, k):
             setattr(mv, k, v)
     db.add(mv)
-    db.commit()
-    db.refresh(mv)
+    db.flush()
     return mv
 
 
 def delete_move(db: Session, move_id: int) -> None:
     mv = get_move(db, move_id)
     db.delete(mv)
-    db.commit()
+    db.flush()
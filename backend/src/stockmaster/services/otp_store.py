@@ -0,0 +1,218 @@
+"""Storage for password-reset OTPs.
+
+`OTPStore` is the interface used by `services.auth`; `get_otp_store()` returns
+the implementation selected by `OTP_STORE`:
+
+- `memory`: process-local, bounded by `OTP_STORE_MAXSIZE` with TTL eviction.
+  Codes are not shared between uvicorn workers.
+- `db`: the `password_reset_otps` table, shared by all workers. Expired rows
+  are purged at most every `OTP_PURGE_INTERVAL_SECONDS`.
+
+Both allow `OTP_RATE_LIMIT` reset requests per email per
+`OTP_RATE_WINDOW_SECONDS` window.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from .. import models
+from ..core import config
+from ..core.cache import TTLCache
+
+
+class OTPRateLimited(Exception):
+    """Raised when an email requested too many reset codes in the current window."""
+
+
+class OTPStore(ABC):
+    @abstractmethod
+    def register_request(self, email: str) -> None:
+        """Count a reset request for `email`; raise `OTPRateLimited` over the limit."""
+
+    @abstractmethod
+    def save(self, email: str, otp: str, expires_at: datetime) -> None:
+        """Store `otp` as the only valid code for `email` until `expires_at`."""
+
+    @abstractmethod
+    def verify(self, email: str, otp: str) -> bool:
+        """Return True if `otp` is the current, unexpired code for `email`."""
+
+    @abstractmethod
+    def discard(self, email: str) -> None:
+        """Invalidate any code stored for `email`."""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Remove expired codes and rate windows; return how many were dropped."""
+
+
+class MemoryOTPStore(OTPStore):
+    def __init__(self, maxsize: int, rate_limit: int, rate_window: int):
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self._codes = TTLCache(maxsize=maxsize, ttl=rate_window)
+        self._requests = TTLCache(maxsize=maxsize, ttl=rate_window)
+        self._lock = threading.Lock()
+
+    def register_request(self, email: str) -> None:
+        with self._lock:
+            count = self._requests.get(email, 0)
+            if count >= self.rate_limit:
+                raise OTPRateLimited(email)
+            # The window starts with the first request; later ones keep its expiry
+            if not self._requests.replace(email, count + 1):
+                self._requests.set(email, 1)
+
+    def save(self, email: str, otp: str, expires_at: datetime) -> None:
+        ttl = max(0.0, (expires_at - datetime.utcnow()).total_seconds())
+        self._codes.set(email, otp, ttl=ttl)
+
+    def verify(self, email: str, otp: str) -> bool:
+        stored = self._codes.get(email)
+        return stored is not None and stored == otp
+
+    def discard(self, email: str) -> None:
+        self._codes.pop(email)
+
+    def purge_expired(self) -> int:
+        return self._codes.purge_expired() + self._requests.purge_expired()
+
+
+class DatabaseOTPStore(OTPStore):
+    def __init__(self, rate_limit: int, rate_window: int, purge_interval: int, session_factory=None):
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.purge_interval = purge_interval
+        self._session_factory = session_factory
+        self._last_purge = 0.0
+
+    def _session(self):
+        if self._session_factory is not None:
+            return self._session_factory()
+        from ..database import SessionLocal
+
+        return SessionLocal()
+
+    def register_request(self, email: str) -> None:
+        now = datetime.utcnow()
+        db = self._session()
+        try:
+            for attempt in range(2):
+                row = db.get(models.PasswordResetOTP, email, with_for_update=True)
+                if row is None:
+                    db.add(models.PasswordResetOTP(email=email, window_start=now, request_count=1))
+                elif row.window_start + timedelta(seconds=self.rate_window) <= now:
+                    row.window_start = now
+                    row.request_count = 1
+                elif row.request_count >= self.rate_limit:
+                    raise OTPRateLimited(email)
+                else:
+                    row.request_count += 1
+                try:
+                    db.commit()
+                    break
+                except IntegrityError:
+                    # Another worker inserted the row first; retry as an update
+                    db.rollback()
+                    if attempt:
+                        raise
+        finally:
+            db.close()
+        self._maybe_purge()
+
+    def save(self, email: str, otp: str, expires_at: datetime) -> None:
+        db = self._session()
+        try:
+            row = db.get(models.PasswordResetOTP, email)
+            if row is None:
+                row = models.PasswordResetOTP(email=email, window_start=datetime.utcnow(), request_count=0)
+                db.add(row)
+            row.otp = otp
+            row.expires_at = expires_at
+            db.commit()
+        finally:
+            db.close()
+
+    def verify(self, email: str, otp: str) -> bool:
+        db = self._session()
+        try:
+            row = db.get(models.PasswordResetOTP, email)
+            return (
+                row is not None
+                and row.otp is not None
+                and row.otp == otp
+                and row.expires_at is not None
+                and row.expires_at > datetime.utcnow()
+            )
+        finally:
+            db.close()
+
+    def discard(self, email: str) -> None:
+        db = self._session()
+        try:
+            db.query(models.PasswordResetOTP).filter(models.PasswordResetOTP.email == email).update(
+                {"otp": None, "expires_at": None}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        now = datetime.utcnow()
+        window_cutoff = now - timedelta(seconds=self.rate_window)
+        db = self._session()
+        try:
+            table = models.PasswordResetOTP
+            removed = (
+                db.query(table)
+                .filter(
+                    table.window_start < window_cutoff,
+                    or_(table.expires_at.is_(None), table.expires_at < now),
+                )
+                .delete(synchronize_session=False)
+            )
+            # Rows still inside their rate window only lose the expired code
+            db.query(table).filter(and_(table.expires_at.is_not(None), table.expires_at < now)).update(
+                {"otp": None, "expires_at": None}, synchronize_session=False
+            )
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge >= self.purge_interval:
+            self._last_purge = now
+            self.purge_expired()
+
+
+_store: Optional[OTPStore] = None
+_store_lock = threading.Lock()
+
+
+def get_otp_store() -> OTPStore:
+    """Return the process-wide OTP store selected by `OTP_STORE`."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if config.OTP_STORE == "db":
+                _store = DatabaseOTPStore(
+                    rate_limit=config.OTP_RATE_LIMIT,
+                    rate_window=config.OTP_RATE_WINDOW_SECONDS,
+                    purge_interval=config.OTP_PURGE_INTERVAL_SECONDS,
+                )
+            elif config.OTP_STORE == "memory":
+                _store = MemoryOTPStore(
+                    maxsize=config.OTP_STORE_MAXSIZE,
+                    rate_limit=config.OTP_RATE_LIMIT,
+                    rate_window=config.OTP_RATE_WINDOW_SECONDS,
+                )
+            else:
+                raise ValueError(f"Unknown OTP_STORE backend: {config.OTP_STORE!r}")
+        return _store
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional, Sequence
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import NoResultFound
 
@@ -8,13 +8,15 @@ from .. import models, schemas
 def create_partner(db: Session, p_in: schemas.PartnerCreate) -> models.Partner:
     p = models.Partner(name=p_in.name, partner_type=p_in.partner_type, contact=p_in.contact)
     db.add(p)
-    db.commit()
-    db.refresh(p)
+    db.flush()
     return p
 
 
-def list_partners(db: Session, skip: int = 0, limit: int = 100) -> List[models.Partner]:
-    return db.query(models.Partner).offset(skip).limit(limit).all()
+def list_partners(
+    db: Session, skip: int = 0, limit: int = 100, columns: Optional[Sequence] = None
+) -> List[models.Partner]:
+    q = db.query(*columns) if columns else db.query(models.Partner)
+    return q.offset(skip).limit(limit).all()
 
 
 def get_partner(db: Session, p_id: int) -> models.Partner:
@@ -30,12 +32,11 @@ def update_partner(db: Session, p_id: int, changes: schemas.PartnerUpdate) -> mo
         if v is not None and hasattr(p, k):
             setattr(p, k, v)
     db.add(p)
-    db.commit()
-    db.refresh(p)
+    db.flush()
     return p
 
 
 def delete_partner(db: Session, p_id: int) -> None:
     p = get_partner(db, p_id)
     db.delete(p)
-    db.commit()
+    db.flush()
@@ -1,10 +1,11 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 from sqlalchemy.orm import Session
+from sqlalchemy import Select, select
 from sqlalchemy.exc import NoResultFound
 
-from .. import models, schemas
+from .. import database, metrics, models, schemas
 from ..models import LocationType
 
 
@@ -23,8 +24,6 @@ def create_product(
         uom=product_in.uom,
     )
     db.add(product)
-    db.commit()
-    db.refresh(product)
 
     # If initial stock provided, create an incoming StockMove to seed inventory
     if initial_stock and float(initial_stock) > 0:
@@ -33,29 +32,26 @@ def create_product(
             dest = db.query(models.Location).filter(models.Location.id == dest_loc_id).first()
             if not dest:
                 raise NoResultFound(f"dest_loc_id {dest_loc_id} not found")
-            dest_id = dest.id
         else:
             # pick the first internal location, otherwise create a default
             dest = db.query(models.Location).filter(models.Location.type == LocationType.internal).first()
             if not dest:
                 dest = models.Location(name="Default Internal", type=LocationType.internal)
-                db.add(dest)
-                db.commit()
-                db.refresh(dest)
-            dest_id = dest.id
 
+        # linked by relationship, so the single flush below inserts the
+        # product (and any new location) before the move
         move = models.StockMove(
-            product_id=product.id,
+            product=product,
             source_loc_id=None,
-            dest_loc_id=dest_id,
+            dest_location=dest,
             quantity=initial_stock,
             date=datetime.utcnow(),
             reference_id=None,
         )
         db.add(move)
-        db.commit()
-        db.refresh(move)
+        database.on_commit(db, metrics.moves_written.inc)
 
+    db.flush()
     return product
 
 
@@ -63,8 +59,17 @@ def get_product(db: Session, product_id: int) -> Optional[models.Product]:
     return db.query(models.Product).filter(models.Product.id == product_id).first()
 
 
-def list_products(db: Session, skip: int = 0, limit: int = 100) -> List[models.Product]:
-    return db.query(models.Product).offset(skip).limit(limit).all()
+def select_products(skip: int = 0, limit: int = 100, columns: Optional[Sequence] = None) -> Select:
+    """Build the product list statement (shared by sync and async sessions)."""
+    stmt = select(*columns) if columns else select(models.Product)
+    return stmt.offset(skip).limit(limit)
+
+
+def list_products(
+    db: Session, skip: int = 0, limit: int = 100, columns: Optional[Sequence] = None
+) -> List[models.Product]:
+    result = db.execute(select_products(skip=skip, limit=limit, columns=columns))
+    return result.all() if columns else result.scalars().all()
 
 
 def update_product(db: Session, product: models.Product, changes: schemas.ProductUpdate) -> models.Product:
@@ -72,11 +77,10 @@ def update_product(db: Session, product: models.Product, changes: schemas.Produc
         if value is not None and hasattr(product, field):
             setattr(product, field, value)
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    db.flush()
     return product
 
 
 def delete_product(db: Session, product: models.Product) -> None:
     db.delete(product)
-    db.commit()
+    db.flush()
@@ -1,5 +1,6 @@
-from typing import List
+from typing import List, Optional, Sequence
 from sqlalchemy.orm import Session
+from sqlalchemy import Select, select
 from sqlalchemy.exc import NoResultFound
 
 from .. import models, schemas
@@ -8,13 +9,21 @@ from .. import models, schemas
 def create_quant(db: Session, q_in: schemas.StockQuantCreate) -> models.StockQuant:
     q = models.StockQuant(product_id=q_in.product_id, location_id=q_in.location_id, quantity=q_in.quantity)
     db.add(q)
-    db.commit()
-    db.refresh(q)
+    db.flush()
     return q
 
 
-def list_quants(db: Session, skip: int = 0, limit: int = 100) -> List[models.StockQuant]:
-    return db.query(models.StockQuant).offset(skip).limit(limit).all()
+def select_quants(skip: int = 0, limit: int = 100, columns: Optional[Sequence] = None) -> Select:
+    """Build the stock quant list statement (shared by sync and async sessions)."""
+    stmt = select(*columns) if columns else select(models.StockQuant)
+    return stmt.offset(skip).limit(limit)
+
+
+def list_quants(
+    db: Session, skip: int = 0, limit: int = 100, columns: Optional[Sequence] = None
+) -> List[models.StockQuant]:
+    result = db.execute(select_quants(skip=skip, limit=limit, columns=columns))
+    return result.all() if columns else result.scalars().all()
 
 
 def get_quant(db: Session, quant_id: int) -> models.StockQuant:
@@ -30,12 +39,11 @@ def update_quant(db: Session, quant_id: int, changes: schemas.StockQuantUpdate)
         if v is not None and hasattr(q, k):
             setattr(q, k, v)
     db.add(q)
-    db.commit()
-    db.refresh(q)
+    db.flush()
     return q
 
 
 def delete_quant(db: Session, quant_id: int) -> None:
     q = get_quant(db, quant_id)
     db.delete(q)
-    db.commit()
+    db.flush()
@@ -0,0 +1,218 @@
+"""Inter-warehouse rebalancing: move surplus stock to warehouses that are short.
+
+A run works on the whole catalogue at once, per (product, warehouse), from a
+handful of grouped statements:
+
+- on hand: `replenishment.on_hand`;
+- stock position: `on hand - reserved + incoming`, as in
+  `replenishment.stock_positions`;
+- free: on hand minus every open operation line leaving the warehouse's
+  locations, transfers inside the warehouse included, which is what can ship
+  now;
+- thresholds: the warehouse-level reorder rules.
+
+A warehouse is short of a product when its position is below the rule's
+`min_qty`; the shortfall is the difference. A warehouse's surplus is its
+position above what it keeps (`max_qty` when the rule has one, else
+`min_qty`; a warehouse without a rule for the product keeps nothing), capped
+by its free stock.
+
+Per product the largest shortfall is filled first, from the warehouse with
+the largest surplus. With no transfer costs between warehouses this covers
+as much shortfall as a min-cost flow would, with few transfers. Only then is
+stock per location read, for the products that move, to pick the source
+locations (most free stock first); a proposal shrinks to what they can
+supply, and only what is allocated counts towards `shortfall_after`.
+Proposals are consolidated into one draft internal operation per (source
+location, destination location); the destination is the warehouse's first
+internal location, as for receipts.
+Open transfers count as outgoing at the source and incoming at the
+destination, so a second run does not propose them again.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from . import inventory, replenishment
+from .dashboard import PENDING_STATUSES
+
+# product ids per statement when reading stock per location
+PRODUCT_CHUNK = 500
+
+
+def _reserved(db: Session, location_col, products, *where) -> Dict[Tuple[int, int], Decimal]:
+    """Open operation lines leaving internal locations, per (product, `location_col`)."""
+    line = models.StockOperationLine
+    op = models.StockOperation
+    loc = models.Location
+    rows = db.execute(
+        select(line.product_id, location_col, func.sum(line.demand_qty - line.done_qty))
+        .join(op, op.id == line.operation_id)
+        .join(loc, loc.id == op.source_loc_id)
+        .where(loc.type == models.LocationType.internal, op.status.in_(PENDING_STATUSES), line.product_id.in_(products), *where)
+        .group_by(line.product_id, location_col)
+    )
+    totals = defaultdict(Decimal)
+    for product_id, key, qty in rows:
+        totals[(product_id, key)] += Decimal(str(qty or 0))
+    return totals
+
+
+def _free_by_location(db: Session, sources: Set[Tuple[int, int]]) -> Dict[Tuple[int, int], Decimal]:
+    """`on hand - reserved` per (product, location) for the (product, warehouse) pairs in `sources`."""
+    move = models.StockMove
+    op = models.StockOperation
+    loc = models.Location
+    by_warehouse = defaultdict(list)
+    for product_id, warehouse_id in sorted(sources):
+        by_warehouse[warehouse_id].append(product_id)
+    free = defaultdict(Decimal)
+    for warehouse_id, product_ids in by_warehouse.items():
+        for i in range(0, len(product_ids), PRODUCT_CHUNK):
+            chunk = product_ids[i:i + PRODUCT_CHUNK]
+            for loc_col, sign in ((move.dest_loc_id, 1), (move.source_loc_id, -1)):
+                rows = db.execute(
+                    select(move.product_id, loc_col, func.sum(move.quantity))
+                    .join(loc, loc.id == loc_col)
+                    .where(loc.type == models.LocationType.internal, loc.warehouse_id == warehouse_id, move.product_id.in_(chunk))
+                    .group_by(move.product_id, loc_col)
+                )
+                for product_id, location_id, qty in rows:
+                    free[(product_id, location_id)] += sign * Decimal(str(qty or 0))
+            reserved = _reserved(db, op.source_loc_id, chunk, loc.warehouse_id == warehouse_id)
+            for key, qty in reserved.items():
+                free[key] -= qty
+    return free
+
+
+def propose(needs: Dict[int, Decimal], surplus: Dict[int, Decimal]) -> List[Tuple[int, int, Decimal]]:
+    """Greedy matching for one product: `(source warehouse, dest warehouse, qty)` transfers.
+
+    `needs` and `surplus` are keyed by warehouse.
+    """
+    transfers = []
+    left = {wh: qty for wh, qty in surplus.items() if qty > 0}
+    donors = sorted(left, key=left.get, reverse=True)
+    for dest, need in sorted(needs.items(), key=lambda item: item[1], reverse=True):
+        for source in donors:
+            if need <= 0:
+                break
+            if source == dest or left[source] <= 0:
+                continue
+            qty = min(need, left[source])
+            left[source] -= qty
+            need -= qty
+            transfers.append((source, dest, qty))
+    return transfers
+
+
+def run(db: Session, dry_run: bool = False, created_by_id: Optional[int] = None) -> dict:
+    """Propose transfers for every product with warehouse rules; unless `dry_run`, create them."""
+    warehouse_of = {}
+    stock_location = {}
+    for loc_id, warehouse_id in db.execute(
+        select(models.Location.id, models.Location.warehouse_id)
+        .where(models.Location.type == models.LocationType.internal, models.Location.warehouse_id.is_not(None))
+        .order_by(models.Location.id)
+    ):
+        warehouse_of[loc_id] = warehouse_id
+        stock_location.setdefault(warehouse_id, loc_id)
+
+    rule_t = models.ReorderRule
+    rules = db.execute(
+        select(rule_t.product_id, rule_t.warehouse_id, rule_t.min_qty, rule_t.max_qty)
+        .where(rule_t.warehouse_id.is_not(None))
+    ).all()
+
+    on_hand = replenishment.on_hand(db)
+    positions, _ = replenishment.stock_positions(db, defaultdict(Decimal, on_hand))
+    free = on_hand
+    for key, qty in _reserved(db, models.Location.warehouse_id, select(rule_t.product_id)).items():
+        free[key] -= qty
+
+    keep = defaultdict(dict)
+    needs = defaultdict(dict)
+    shortfall_before = Decimal(0)
+    for rule in rules:
+        if rule.warehouse_id not in stock_location:
+            continue
+        min_qty = Decimal(str(rule.min_qty or 0))
+        position = positions[(rule.product_id, rule.warehouse_id)]
+        keep[rule.product_id][rule.warehouse_id] = max(Decimal(str(rule.max_qty)), min_qty) if rule.max_qty is not None else min_qty
+        if position < min_qty:
+            needs[rule.product_id][rule.warehouse_id] = min_qty - position
+            shortfall_before += min_qty - position
+
+    surplus = defaultdict(dict)
+    for (product_id, warehouse_id), qty in free.items():
+        if product_id in needs and warehouse_id in stock_location and qty > 0:
+            spare = positions[(product_id, warehouse_id)] - keep[product_id].get(warehouse_id, Decimal(0))
+            surplus[product_id][warehouse_id] = min(qty, spare)
+
+    planned = []
+    for product_id, product_needs in needs.items():
+        for source, dest, qty in propose(product_needs, surplus.get(product_id, {})):
+            planned.append((product_id, source, dest, qty))
+
+    # the source warehouse's free stock is spread over its locations
+    by_location = defaultdict(list)
+    for (product_id, loc_id), qty in _free_by_location(db, {(p, source) for p, source, _, _ in planned}).items():
+        if qty > 0:
+            by_location[(product_id, warehouse_of[loc_id])].append([qty, loc_id])
+    for locations in by_location.values():
+        locations.sort(reverse=True)
+
+    transfers = {}
+    moved = Decimal(0)
+    for product_id, source, dest, qty in planned:
+        # a plan the source locations cannot supply shrinks to what they hold
+        for location in by_location[(product_id, source)]:
+            if qty <= 0:
+                break
+            part = min(qty, location[0])
+            if part <= 0:
+                continue
+            location[0] -= part
+            qty -= part
+            moved += part
+            transfer = transfers.setdefault((location[1], stock_location[dest]), {
+                "operation_id": None,
+                "reference": None,
+                "source_warehouse_id": source,
+                "dest_warehouse_id": dest,
+                "source_loc_id": location[1],
+                "dest_loc_id": stock_location[dest],
+                "lines": defaultdict(Decimal),
+            })
+            transfer["lines"][product_id] += part
+
+    transfers = list(transfers.values())
+    for transfer in transfers:
+        transfer["lines"] = [{"product_id": p, "quantity": q} for p, q in transfer["lines"].items()]
+    if not dry_run and transfers:
+        ops_in = [
+            schemas.StockOperationCreate(
+                operation_type=models.OperationType.internal,
+                source_loc_id=t["source_loc_id"],
+                dest_loc_id=t["dest_loc_id"],
+                partner_id=None,
+                scheduled_date=None,
+                lines=[schemas.StockOperationLineCreate(product_id=l["product_id"], demand_qty=l["quantity"]) for l in t["lines"]],
+            )
+            for t in transfers
+        ]
+        for transfer, op in zip(transfers, inventory.create_operations(db, ops_in, created_by_id=created_by_id)):
+            transfer["operation_id"] = op.id
+            transfer["reference"] = op.reference
+
+    return {
+        "dry_run": dry_run,
+        "products_short": len(needs),
+        "shortfall_before": shortfall_before,
+        "shortfall_after": shortfall_before - moved,
+        "transfers": transfers,
+    }
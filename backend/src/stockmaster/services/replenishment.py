@@ -0,0 +1,233 @@
+"""Reorder-rule evaluation: turn `ReorderRule` rows into draft receipts.
+
+A run evaluates every rule in one pass over a handful of grouped statements,
+never per rule:
+
+- on hand per (product, warehouse): moves into internal locations minus
+  moves out of them, the same stock `inventory.check_availability` sees;
+- reserved: open (draft/waiting/ready) operation lines leaving a warehouse;
+- incoming: open operation lines entering a warehouse, which includes the
+  draft receipts of earlier runs, so a rule does not order twice.
+
+Transfers between two locations of the same warehouse count as neither.
+A rule's forecast is `on hand - reserved + incoming` for its warehouse (all
+warehouses when `warehouse_id` is empty). A rule triggers when the forecast
+is below `min_qty` and orders up to `max_qty` (or `min_qty` when there is no
+maximum), rounded up to whole lots of `reorder_qty` when that is set.
+
+Orders go to the warehouse's first internal location (the lowest id; the
+first internal location overall for rules without a warehouse), are bought
+from the partner of the product's latest receipt, and are consolidated into
+one draft receipt per (destination, vendor), created through
+`inventory.create_operations` with a single flush.
+"""
+import math
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from .. import models, schemas
+from . import inventory
+from .dashboard import PENDING_STATUSES
+
+Key = Tuple[int, Optional[int]]
+
+
+def _decimal(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value or 0))
+
+
+def _rule_products():
+    return select(models.ReorderRule.product_id)
+
+
+def _add(totals: Dict[Key, Decimal], rows, sign: int = 1) -> None:
+    for product_id, warehouse_id, qty in rows:
+        totals[(product_id, warehouse_id)] += sign * _decimal(qty)
+
+
+def on_hand(db: Session) -> Dict[Key, Decimal]:
+    """Stock in internal locations of every rule product, per (product, warehouse)."""
+    move = models.StockMove
+    loc = models.Location
+    totals = defaultdict(Decimal)
+    for loc_col, sign in ((move.dest_loc_id, 1), (move.source_loc_id, -1)):
+        rows = db.execute(
+            select(move.product_id, loc.warehouse_id, func.sum(move.quantity))
+            .join(loc, loc.id == loc_col)
+            .where(loc.type == models.LocationType.internal, move.product_id.in_(_rule_products()))
+            .group_by(move.product_id, loc.warehouse_id)
+        )
+        _add(totals, rows, sign)
+    return totals
+
+
+def _open_lines(db: Session, inbound: bool) -> Dict[Key, Decimal]:
+    """Open demand leaving (`inbound=False`) or entering each warehouse."""
+    line = models.StockOperationLine
+    op = models.StockOperation
+    src = aliased(models.Location)
+    dst = aliased(models.Location)
+    here, there = (dst, src) if inbound else (src, dst)
+    stmt = (
+        select(line.product_id, here.warehouse_id, func.sum(line.demand_qty - line.done_qty))
+        .join(op, op.id == line.operation_id)
+        .join(here, here.id == (op.dest_loc_id if inbound else op.source_loc_id))
+        .outerjoin(there, there.id == (op.source_loc_id if inbound else op.dest_loc_id))
+        .where(
+            here.type == models.LocationType.internal,
+            op.status.in_(PENDING_STATUSES),
+            line.product_id.in_(_rule_products()),
+            # moves inside one warehouse do not change what it holds
+            or_(
+                there.id.is_(None),
+                there.type != models.LocationType.internal,
+                there.warehouse_id.is_distinct_from(here.warehouse_id),
+            ),
+        )
+        .group_by(line.product_id, here.warehouse_id)
+    )
+    totals = defaultdict(Decimal)
+    _add(totals, db.execute(stmt))
+    return totals
+
+
+def _last_vendors(db: Session) -> Dict[int, int]:
+    """Partner of each product's latest receipt."""
+    line = models.StockOperationLine
+    op = models.StockOperation
+    latest = (
+        select(line.product_id, func.max(op.id).label("operation_id"))
+        .join(op, op.id == line.operation_id)
+        .where(
+            op.operation_type == models.OperationType.receipt,
+            op.partner_id.is_not(None),
+            line.product_id.in_(_rule_products()),
+        )
+        .group_by(line.product_id)
+        .subquery()
+    )
+    rows = db.execute(select(latest.c.product_id, op.partner_id).join(op, op.id == latest.c.operation_id))
+    return dict(rows.all())
+
+
+def order_quantity(rule, forecast: Decimal) -> Decimal:
+    """Quantity `rule` orders at `forecast`, or 0 when it does not trigger."""
+    min_qty = _decimal(rule.min_qty)
+    if forecast >= min_qty:
+        return Decimal(0)
+    target = max(_decimal(rule.max_qty), min_qty) if rule.max_qty is not None else min_qty
+    qty = target - forecast
+    if rule.reorder_qty:
+        lot = _decimal(rule.reorder_qty)
+        qty = lot * math.ceil(qty / lot)
+    return qty
+
+
+def stock_positions(
+    db: Session, stock: Optional[Dict[Key, Decimal]] = None
+) -> Tuple[Dict[Key, Decimal], Dict[int, Decimal]]:
+    """`on hand - reserved + incoming` of every rule product, per warehouse and in total.
+
+    The first mapping is keyed by (product, warehouse); the second by product,
+    over all warehouses, for rules without a warehouse. Callers that already
+    have `on_hand(db)` pass it as `stock`; it is updated in place.
+    """
+    positions = on_hand(db) if stock is None else stock
+    for key, qty in _open_lines(db, inbound=False).items():
+        positions[key] -= qty
+    for key, qty in _open_lines(db, inbound=True).items():
+        positions[key] += qty
+    totals = defaultdict(Decimal)
+    for (product_id, _), qty in positions.items():
+        totals[product_id] += qty
+    return positions, totals
+
+
+def run(db: Session, dry_run: bool = False, created_by_id: Optional[int] = None) -> dict:
+    """Evaluate every reorder rule; unless `dry_run`, create the draft receipts."""
+    rule_t = models.ReorderRule
+    rules = db.execute(
+        select(rule_t.id, rule_t.product_id, rule_t.warehouse_id, rule_t.min_qty, rule_t.max_qty, rule_t.reorder_qty)
+        .order_by(rule_t.id)
+    ).all()
+
+    forecast, totals = stock_positions(db)
+
+    stock_location = {}
+    first_stock_location = None
+    vendor_location = None
+    for loc_id, loc_type, warehouse_id in db.execute(
+        select(models.Location.id, models.Location.type, models.Location.warehouse_id).order_by(models.Location.id)
+    ):
+        if loc_type == models.LocationType.internal:
+            stock_location.setdefault(warehouse_id, (loc_id, warehouse_id))
+            first_stock_location = first_stock_location or (loc_id, warehouse_id)
+        elif loc_type == models.LocationType.vendor and vendor_location is None:
+            vendor_location = loc_id
+
+    orders = {}
+    skipped = []
+    vendors = None
+    triggered = 0
+    for rule in rules:
+        if rule.warehouse_id is None:
+            current = totals[rule.product_id]
+        else:
+            current = forecast[(rule.product_id, rule.warehouse_id)]
+        qty = order_quantity(rule, current)
+        if qty <= 0:
+            continue
+        triggered += 1
+        dest = first_stock_location if rule.warehouse_id is None else stock_location.get(rule.warehouse_id)
+        if dest is None:
+            skipped.append({"rule_id": rule.id, "reason": "warehouse has no internal location"})
+            continue
+        if vendors is None:
+            vendors = _last_vendors(db)
+        dest_loc_id, dest_warehouse_id = dest
+        partner_id = vendors.get(rule.product_id)
+        order = orders.setdefault((dest_loc_id, partner_id), {
+            "operation_id": None,
+            "reference": None,
+            "warehouse_id": dest_warehouse_id,
+            "partner_id": partner_id,
+            "source_loc_id": vendor_location,
+            "dest_loc_id": dest_loc_id,
+            "lines": [],
+        })
+        order["lines"].append({"rule_id": rule.id, "product_id": rule.product_id, "forecast_qty": current, "order_qty": qty})
+        # later rules for the same product see this order as incoming
+        forecast[(rule.product_id, dest_warehouse_id)] += qty
+        totals[rule.product_id] += qty
+
+    orders = list(orders.values())
+    if not dry_run and orders:
+        ops_in = []
+        for order in orders:
+            # one line per product, even when several rules ordered it
+            demand = defaultdict(Decimal)
+            for line in order["lines"]:
+                demand[line["product_id"]] += line["order_qty"]
+            ops_in.append(schemas.StockOperationCreate(
+                operation_type=models.OperationType.receipt,
+                source_loc_id=order["source_loc_id"],
+                dest_loc_id=order["dest_loc_id"],
+                partner_id=order["partner_id"],
+                scheduled_date=None,
+                lines=[schemas.StockOperationLineCreate(product_id=p, demand_qty=q) for p, q in demand.items()],
+            ))
+        for order, op in zip(orders, inventory.create_operations(db, ops_in, created_by_id=created_by_id)):
+            order["operation_id"] = op.id
+            order["reference"] = op.reference
+
+    return {
+        "dry_run": dry_run,
+        "rules_evaluated": len(rules),
+        "rules_triggered": triggered,
+        "orders": orders,
+        "skipped": skipped,
+    }
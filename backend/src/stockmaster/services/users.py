@@ -1,12 +1,16 @@
-from typing import List
+from typing import List, Optional, Sequence
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import NoResultFound
 
-from .. import models, schemas
+from .. import database, models, schemas
+from . import auth
 
 
-def list_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+def list_users(
+    db: Session, skip: int = 0, limit: int = 100, columns: Optional[Sequence] = None
+) -> List[models.User]:
+    q = db.query(*columns) if columns else db.query(models.User)
+    return q.offset(skip).limit(limit).all()
 
 
 def get_user(db: Session, user_id: int) -> models.User:
@@ -22,12 +26,15 @@ def update_user(db: Session, user_id: int, changes: schemas.UserUpdate) -> model
         if v is not None and hasattr(u, k):
             setattr(u, k, v)
     db.add(u)
-    db.commit()
-    db.refresh(u)
+    db.flush()
+    email = u.email
+    database.on_commit(db, lambda: auth.invalidate_cached_user(email))
     return u
 
 
 def delete_user(db: Session, user_id: int) -> None:
     u = get_user(db, user_id)
     db.delete(u)
-    db.commit()
+    db.flush()
+    email = u.email
+    database.on_commit(db, lambda: auth.invalidate_cached_user(email))
@@ -1,20 +1,23 @@
-from typing import List
+from typing import List, Optional, Sequence
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import NoResultFound
 
 from .. import models, schemas
+from . import locations
 
 
 def create_warehouse(db: Session, w_in: schemas.WarehouseCreate) -> models.Warehouse:
     w = models.Warehouse(name=w_in.name, address=w_in.address)
     db.add(w)
-    db.commit()
-    db.refresh(w)
+    db.flush()
     return w
 
 
-def list_warehouses(db: Session, skip: int = 0, limit: int = 100) -> List[models.Warehouse]:
-    return db.query(models.Warehouse).offset(skip).limit(limit).all()
+def list_warehouses(
+    db: Session, skip: int = 0, limit: int = 100, columns: Optional[Sequence] = None
+) -> List[models.Warehouse]:
+    q = db.query(*columns) if columns else db.query(models.Warehouse)
+    return q.offset(skip).limit(limit).all()
 
 
 def get_warehouse(db: Session, w_id: int) -> models.Warehouse:
@@ -30,12 +33,17 @@ def update_warehouse(db: Session, w_id: int, changes: schemas.WarehouseUpdate) -
         if v is not None and hasattr(w, k):
             setattr(w, k, v)
     db.add(w)
-    db.commit()
-    db.refresh(w)
+    db.flush()
     return w
 
 
 def delete_warehouse(db: Session, w_id: int) -> None:
     w = get_warehouse(db, w_id)
     db.delete(w)
-    db.commit()
+    db.flush()
+
+
+def stock(db: Session, w_id: int, product_id: Optional[int] = None) -> List[dict]:
+    """Quant totals per product over the warehouse's locations (sub-locations share it)."""
+    get_warehouse(db, w_id)
+    return locations.stock_totals(db, models.StockQuant.warehouse_id == w_id, product_id)
@@ -0,0 +1,262 @@
+"""Slow-query log with captured plans.
+
+Every statement slower than `SLOW_QUERY_MS` is:
+
+- logged as a warning with its duration, the service function that issued it
+  (e.g. `inventory.check_availability`) and its normalized SQL;
+- written as one JSON line to the rotating file `SLOW_QUERY_LOG_FILE` (when set), with
+  the bound-parameter shapes (types, never values) and the statement's
+  `EXPLAIN` output, captured on the same connection right after it ran;
+- added to this worker's per-template totals, which `GET /internal/slow-queries`
+  ranks. `?source=log` ranks the log file(s) instead, which covers every
+  worker writing to that file and survives restarts.
+
+A template's plan is captured at most once per `SLOW_QUERY_EXPLAIN_INTERVAL`
+seconds, so a query that is slow on every request does not double its cost.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Iterable, List, Optional
+
+from sqlalchemy import event
+
+from .core import config
+from .core.cache import TTLCache
+from .instrumentation import statement_template
+
+logger = logging.getLogger(__name__)
+
+# Writes the JSON lines; kept out of the application's log handlers
+_file_logger = logging.getLogger(__name__ + ".file")
+_file_logger.propagate = False
+_file_lock = threading.Lock()
+
+_plans = TTLCache(maxsize=1000, ttl=config.SLOW_QUERY_EXPLAIN_INTERVAL)
+
+# Frames from these packages are the "caller"; services win over routers
+_CALLER_PACKAGES = (".services.", ".api.routers.")
+
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def enabled() -> bool:
+    return config.SLOW_QUERY_MS > 0
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """Describe bound parameters by type only, e.g. `{"product_id_1": "int"}`."""
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return {"rows": len(parameters), "row": parameter_shape(parameters[0])}
+    if isinstance(parameters, dict):
+        return {k: type(v).__name__ for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(v).__name__ for v in parameters]
+    return type(parameters).__name__
+
+
+def _caller_in(frame) -> Optional[str]:
+    fallback = None
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        for package in _CALLER_PACKAGES:
+            # skip comprehension/lambda frames for the enclosing function
+            if package in module and not frame.f_code.co_name.startswith("<"):
+                caller = f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+                if package == ".services.":
+                    return caller
+                fallback = fallback or f"routers.{caller}"
+        frame = frame.f_back
+    return fallback
+
+
+def find_caller() -> Optional[str]:
+    """Return `module.function` of the service (or router) that issued the current statement."""
+    caller = _caller_in(sys._getframe(1))
+    if caller is None:
+        # Async sessions run the statement in a child greenlet; the service's
+        # coroutine is on the parent greenlet's stack.
+        try:
+            import greenlet
+        except ImportError:
+            return None
+        parent = greenlet.getcurrent().parent
+        if parent is not None:
+            caller = _caller_in(parent.gr_frame)
+    return caller
+
+
+def explain(conn, statement: str, parameters) -> Optional[List[str]]:
+    """Return the plan of `statement` on `conn`'s DBAPI connection, or None if it cannot be explained."""
+    if not statement.lstrip()[:6].upper().startswith(EXPLAINABLE):
+        return None
+    sqlite = conn.dialect.name == "sqlite"
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if sqlite:
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            rows = cursor.fetchall()
+        else:
+            # a failed EXPLAIN must not abort the request's transaction
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute("EXPLAIN " + statement, parameters)
+                rows = cursor.fetchall()
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            finally:
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    except Exception:
+        logger.debug("Could not EXPLAIN slow statement", exc_info=True)
+        return None
+    finally:
+        cursor.close()
+    # SQLite: (id, parent, notused, detail); Postgres: one text column per line
+    return [str(row[-1]) for row in rows]
+
+
+class SlowQueryAggregate:
+    """Per-template totals of slow statements."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates = {}
+
+    def add(self, record: dict) -> None:
+        with self._lock:
+            self._add(record)
+
+    def _add(self, record: dict) -> None:
+        entry = self._templates.get(record["template"])
+        if entry is None:
+            entry = self._templates[record["template"]] = {
+                "template": record["template"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "callers": {},
+                "last_seen": None,
+                "plan": None,
+            }
+        entry["count"] += 1
+        entry["total_ms"] += record["duration_ms"]
+        entry["max_ms"] = max(entry["max_ms"], record["duration_ms"])
+        caller = record.get("caller") or "unknown"
+        entry["callers"][caller] = entry["callers"].get(caller, 0) + 1
+        entry["last_seen"] = record["at"]
+        if record.get("plan"):
+            entry["plan"] = record["plan"]
+
+    def top(self, limit: int = 20, order_by: str = "total_ms") -> List[dict]:
+        with self._lock:
+            entries = [
+                dict(e, callers=dict(e["callers"]), mean_ms=e["total_ms"] / e["count"])
+                for e in self._templates.values()
+            ]
+        entries.sort(key=lambda e: e[order_by], reverse=True)
+        return entries[:limit]
+
+
+_aggregate = SlowQueryAggregate()
+
+
+def _write_file(record: dict) -> None:
+    if not config.SLOW_QUERY_LOG_FILE:
+        return
+    with _file_lock:
+        if not _file_logger.handlers:
+            _add_file_handler()
+    _file_logger.info(json.dumps(record, default=str))
+
+
+def _add_file_handler() -> None:
+    handler = RotatingFileHandler(
+        config.SLOW_QUERY_LOG_FILE,
+        maxBytes=config.SLOW_QUERY_LOG_MAX_BYTES,
+        backupCount=config.SLOW_QUERY_LOG_BACKUPS,
+        encoding="utf-8",
+        delay=True,
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _file_logger.addHandler(handler)
+    _file_logger.setLevel(logging.INFO)
+
+
+def record_slow(conn, statement: str, parameters, executemany: bool, duration: float) -> dict:
+    template = statement_template(statement)
+    plan = _plans.get(template)
+    if plan is None and config.SLOW_QUERY_EXPLAIN and not executemany:
+        plan = explain(conn, statement, parameters)
+        if plan is not None:
+            _plans.set(template, plan)
+    record = {
+        "at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "duration_ms": round(duration * 1000, 2),
+        "caller": find_caller(),
+        "template": template,
+        "parameters": parameter_shape(parameters, executemany),
+        "dialect": conn.dialect.name,
+        "plan": plan,
+    }
+    logger.warning(
+        "Slow query (%.1f ms) from %s: %s", record["duration_ms"], record["caller"] or "unknown", template[:300]
+    )
+    _aggregate.add(record)
+    _write_file(record)
+    return record
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["slow_query_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("slow_query_start", None)
+    if start is None:
+        return
+    duration = time.perf_counter() - start
+    if duration * 1000 >= config.SLOW_QUERY_MS:
+        try:
+            record_slow(conn, statement, parameters, executemany, duration)
+        except Exception:
+            # never fail the request because of the slow-query log
+            logger.exception("Could not record slow query")
+
+
+def configure_engine(engine) -> None:
+    """Time the engine's statements against `SLOW_QUERY_MS` (pass `sync_engine` for async engines)."""
+    if not enabled():
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _log_records(path: str) -> Iterable[dict]:
+    # oldest backup first, so "last_seen" and "plan" end up the newest
+    paths = [f"{path}.{i}" for i in range(config.SLOW_QUERY_LOG_BACKUPS, 0, -1)] + [path]
+    for p in paths:
+        if not os.path.exists(p):
+            continue
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def worst_offenders(limit: int = 20, order_by: str = "total_ms", source: str = "memory") -> List[dict]:
+    """Rank slow templates from this worker (`memory`) or from the log file(s) (`log`)."""
+    if source == "log":
+        aggregate = SlowQueryAggregate()
+        if config.SLOW_QUERY_LOG_FILE:
+            for record in _log_records(config.SLOW_QUERY_LOG_FILE):
+                aggregate.add(record)
+        return aggregate.top(limit, order_by)
+    return _aggregate.top(limit, order_by)
@@ -0,0 +1,169 @@
+"""Tuned SQLite profile for single-box deployments.
+
+With `SQLITE_PROFILE=tuned` (the default), every SQLite connection is set up
+with connect-event pragmas: WAL journal, `synchronous=NORMAL`, a busy
+timeout, memory-mapped I/O, a larger page cache and foreign keys (see the
+`SQLITE_*` settings in `core.config`). `SQLITE_PROFILE=default` leaves
+SQLite's stock rollback-journal settings alone.
+
+SQLite allows one writer at a time. Instead of letting concurrent sessions
+race for the database lock (and fail with "database is locked" when a
+deferred transaction cannot be upgraded), the sync engine serializes
+writers in-process: a connection takes the writer lock before its first
+write statement and releases it on commit, rollback or close. Other
+workers/processes still wait through `busy_timeout`.
+"""
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+
+from .core import config
+
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+
+
+def enabled() -> bool:
+    return config.SQLITE_PROFILE == "tuned"
+
+
+def pragmas() -> List[Tuple[str, object]]:
+    """Return the (name, value) pragmas applied to each new connection."""
+    return [
+        ("journal_mode", config.SQLITE_JOURNAL_MODE),
+        ("synchronous", config.SQLITE_SYNCHRONOUS),
+        ("busy_timeout", config.SQLITE_BUSY_TIMEOUT_MS),
+        ("mmap_size", config.SQLITE_MMAP_SIZE),
+        ("cache_size", config.SQLITE_CACHE_SIZE),
+        ("foreign_keys", "ON" if config.SQLITE_FOREIGN_KEYS else "OFF"),
+    ]
+
+
+class WriterLock:
+    """Process-wide single-writer lock with wait metrics."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def acquire(self) -> bool:
+        start = time.perf_counter()
+        ok = self._lock.acquire(timeout=self.timeout)
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            if ok:
+                self.acquired += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            else:
+                self.timeouts += 1
+        return ok
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return {
+                "writes": self.acquired,
+                "lock_timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_total,
+                "wait_seconds_max": self.wait_max,
+                "wait_seconds_avg": self.wait_total / self.acquired if self.acquired else 0.0,
+            }
+
+
+writer_lock = WriterLock(timeout=config.SQLITE_BUSY_TIMEOUT_MS / 1000)
+
+
+class SerializedWriterConnection(sqlite3.Connection):
+    """sqlite3 connection that holds `writer_lock` from its first write until the transaction ends."""
+
+    _holds_writer = False
+
+    def acquire_writer(self) -> bool:
+        if not self._holds_writer:
+            if not writer_lock.acquire():
+                return False
+            self._holds_writer = True
+        return True
+
+    def _release_writer(self) -> None:
+        if self._holds_writer:
+            self._holds_writer = False
+            writer_lock.release()
+
+    def commit(self):
+        try:
+            super().commit()
+        finally:
+            self._release_writer()
+
+    def rollback(self):
+        try:
+            super().rollback()
+        finally:
+            self._release_writer()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._release_writer()
+
+
+def serializes_writes(url, asyncio: bool = False) -> bool:
+    """Return True if engines for `url` should route writes through `writer_lock`."""
+    url = make_url(url)
+    return (
+        enabled()
+        and config.SQLITE_SERIALIZE_WRITES
+        and not asyncio
+        and url.get_backend_name() == "sqlite"
+        and url.database not in (None, "", ":memory:")
+    )
+
+
+def connect_args(url, asyncio: bool = False) -> dict:
+    """Extra `create_engine` connect_args for SQLite URLs."""
+    return {"factory": SerializedWriterConnection} if serializes_writes(url, asyncio) else {}
+
+
+def configure_engine(engine) -> None:
+    """Install the pragma and writer-serialization events on a SQLite engine."""
+    if engine.dialect.name != "sqlite" or not enabled():
+        return
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _serialize_writes(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip()[:8].upper().startswith(WRITE_PREFIXES):
+            return
+        dbapi_connection = conn.connection.dbapi_connection
+        if isinstance(dbapi_connection, SerializedWriterConnection) and not dbapi_connection.acquire_writer():
+            raise exc.OperationalError(
+                statement, parameters, sqlite3.OperationalError("database is locked (writer queue timeout)")
+            )
+
+
+def writer_stats() -> Optional[dict]:
+    """Writer-lock metrics, or None when writes are not serialized."""
+    if not (enabled() and config.SQLITE_SERIALIZE_WRITES):
+        return None
+    return writer_lock.snapshot()
@@ -0,0 +1,47 @@
+"""pytest helpers: per-endpoint SQL query budgets.
+
+Load as a plugin from a `conftest.py` with
+`pytest_plugins = ["src.stockmaster.testing"]` (as `tests/conftest.py`
+does), then wrap the calls under test in the `query_budget` fixture:
+
+    def test_list_operations_budget(client, headers, query_budget):
+        with query_budget(2, "GET /operations/"):
+            client.get("/operations/?limit=100", headers=headers)
+
+The budget counts every statement any engine runs inside the block, from any
+thread, so requests made through `TestClient` are included. On failure the
+assertion lists the statements by how often they ran, which makes an N+1
+obvious.
+"""
+from contextlib import contextmanager
+from typing import Iterator
+
+import pytest
+
+from .instrumentation import QueryStats, track_queries
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def assert_max_queries(budget: int, label: str = "block") -> Iterator[QueryStats]:
+    """Fail if the block runs more than `budget` SQL statements."""
+    with track_queries() as stats:
+        yield stats
+    if stats.count > budget:
+        lines = "\n".join(f"  {n}x {template[:200]}" for template, n in stats.by_template())
+        raise QueryBudgetExceeded(f"{label} ran {stats.count} queries (budget {budget}):\n{lines}")
+
+
+def check_endpoint(client, method: str, url: str, budget: int, **kwargs):
+    """Call `url` through `client` within `budget` queries and return the response."""
+    with assert_max_queries(budget, f"{method.upper()} {url}"):
+        return client.request(method, url, **kwargs)
+
+
+@pytest.fixture
+def query_budget():
+    """`with query_budget(n[, label]):` fails the test if the block runs more than n queries."""
+    return assert_max_queries
@@ -0,0 +1,45 @@
+"""Shared fixtures: the app on a throwaway SQLite database and a logged-in user.
+
+Run from `backend/` with `python -m pytest`.
+"""
+import os
+import tempfile
+
+import pytest
+
+# before the app is imported: settings are read at import time
+_tmp = tempfile.mkdtemp(prefix="stockmaster-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/test.db")
+os.environ.setdefault("SCHEDULER", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from src.stockmaster.main import app  # noqa: E402
+
+pytest_plugins = ["src.stockmaster.testing"]
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def headers(client):
+    user = {"email": "tests@example.com", "password": "Passw0rd!", "full_name": "Tests"}
+    assert client.post("/users/", json=user).status_code == 200
+    r = client.post("/token", data={"username": user["email"], "password": user["password"]})
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def api(client, headers):
+    """`api(verb, url, json, params)` as the test user: asserts a 2xx and returns the JSON body."""
+    def call(verb, url, json=None, params=None):
+        r = client.request(verb, url, json=json, params=params, headers=headers)
+        assert r.status_code < 300, f"{verb} {url}: {r.status_code} {r.text}"
+        return r.json()
+
+    return call
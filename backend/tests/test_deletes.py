@@ -0,0 +1,15 @@
+def test_deleting_referenced_rows_is_a_conflict(api, client, headers):
+    warehouse = api("post", "/warehouses/", {"name": "Del WH", "address": None})
+    stock = api("post", "/locations/", {"name": "Del Stock", "type": "internal", "warehouse_id": warehouse["id"]})
+    product = api("post", "/products/", {"name": "Del", "sku": "DEL-1", "category": "c", "unit_price": "1"})
+    api("post", "/quants/", {"product_id": product["id"], "location_id": stock["id"], "quantity": "1"})
+
+    for url in (f"/products/{product['id']}", f"/locations/{stock['id']}", f"/warehouses/{warehouse['id']}"):
+        r = client.delete(url, headers=headers)
+        assert r.status_code == 409, (url, r.text)
+        assert "still in use" in r.json()["detail"]
+    # the failed deletes were rolled back
+    assert api("get", f"/products/{product['id']}")["sku"] == "DEL-1"
+
+    free = api("post", "/warehouses/", {"name": "Del WH 2", "address": None})
+    assert client.delete(f"/warehouses/{free['id']}", headers=headers).status_code == 200
@@ -0,0 +1,68 @@
+import math
+from datetime import datetime, timedelta
+from statistics import NormalDist, stdev
+
+import pytest
+from sqlalchemy import update
+
+from src.stockmaster import models
+from src.stockmaster.database import session_scope
+
+
+def _backdate(move_id, days):
+    with session_scope() as db:
+        db.execute(update(models.StockMove).where(models.StockMove.id == move_id).values(date=datetime.utcnow() - timedelta(days=days)))
+
+
+@pytest.fixture(scope="module")
+def rules(api):
+    """Rules for a product without moves, one last shipped 200 days ago and one shipped today."""
+    warehouse = api("post", "/warehouses/", {"name": "Forecast WH", "address": None})
+    stock = api("post", "/locations/", {"name": "FC Stock", "type": "internal", "warehouse_id": warehouse["id"]})
+    vendor = api("post", "/locations/", {"name": "FC Vendor", "type": "vendor"})
+    customer = api("post", "/locations/", {"name": "FC Customer", "type": "customer"})
+    rules = {}
+    for name, shipped_days_ago in (("idle", None), ("old", 200), ("recent", 0)):
+        product = api("post", "/products/", {"name": name, "sku": f"FC-{name}", "category": "c", "unit_price": "1"})
+        api("post", "/moves/", {"product_id": product["id"], "source_loc_id": vendor["id"], "dest_loc_id": stock["id"], "quantity": "100"})
+        if shipped_days_ago is not None:
+            move = api("post", "/moves/", {"product_id": product["id"], "source_loc_id": stock["id"], "dest_loc_id": customer["id"], "quantity": "10"})
+            _backdate(move["id"], shipped_days_ago)
+        rules[name] = api("post", "/reorder-rules/", {
+            "product_id": product["id"], "warehouse_id": warehouse["id"], "min_qty": "5", "max_qty": None, "reorder_qty": "3",
+        })
+    return rules
+
+
+def _forecast(api, rules, **params):
+    params = {"history_days": 365, "lead_time_days": 4, "cycle_days": 14, "service_level": 0.9, **params}
+    result = api("post", "/reorder-rules/forecast", params=params)
+    assert result["rules"] >= 3
+    return {name: api("get", f"/reorder-rules/{rule['id']}") for name, rule in rules.items()}
+
+
+def test_no_recent_demand_suggests_nothing(api, rules):
+    # SES leaves ~0.7**200 of the old shipment: below the stored scale, so no demand
+    got = _forecast(api, rules, method="ses", alpha=0.3)
+    for name in ("idle", "old"):
+        assert float(got[name]["daily_demand"]) == 0, name
+        assert float(got[name]["suggested_min_qty"]) == 0, name
+        assert float(got[name]["suggested_reorder_qty"]) == 0, name
+        assert got[name]["days_of_cover"] is None, name
+
+
+def test_sma_rate_drives_the_suggestions(api, rules):
+    got = _forecast(api, rules, method="sma", window=10)["recent"]
+    # 10 shipped today over a 10-day window
+    rate, sd = 1.0, stdev([0] * 9 + [10])
+    assert float(got["daily_demand"]) == rate
+    assert float(got["suggested_min_qty"]) == math.ceil(rate * 4 + NormalDist().inv_cdf(0.9) * sd * 2)
+    assert float(got["suggested_reorder_qty"]) == 14
+    # 90 on hand at one a day
+    assert float(got["days_of_cover"]) == 90
+
+
+def test_apply_writes_zero_for_idle_products(api, rules):
+    got = _forecast(api, rules, method="ses", alpha=0.3, apply=True)
+    assert float(got["old"]["min_qty"]) == 0
+    assert got["old"]["reorder_qty"] is None
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from src.stockmaster import models
+from src.stockmaster.database import session_scope
+from src.stockmaster.services.locations import subtree
+
+
+def _under(path):
+    with session_scope() as db:
+        return set(db.execute(select(models.Location.id).where(subtree(path))).scalars())
+
+
+def test_subtree_range_stops_before_longer_ids(api):
+    with session_scope() as db:
+        a = db.execute(select(func.max(models.Location.id))).scalar() + 1
+        # "/<a>0/" shares the "/<a>" prefix but sorts past the range's upper bound
+        db.add_all([
+            models.Location(id=a, name="ST a", type=models.LocationType.internal),
+            models.Location(id=int(f"{a}0"), name="ST a0", type=models.LocationType.internal),
+        ])
+    child = api("post", "/locations/", {"name": "ST child", "type": "internal", "parent_id": a})
+    grandchild = api("post", "/locations/", {"name": "ST grandchild", "type": "internal", "parent_id": child["id"]})
+    assert grandchild["path"] == f"/{a}/{child['id']}/{grandchild['id']}/"
+    assert _under(f"/{a}/") == {a, child["id"], grandchild["id"]}
+    assert _under(child["path"]) == {child["id"], grandchild["id"]}
+
+
+def test_moving_a_location_moves_its_subtree(api, client, headers):
+    old_wh, new_wh = (api("post", "/warehouses/", {"name": f"MV {n}", "address": None}) for n in ("old", "new"))
+    zone = api("post", "/locations/", {"name": "MV zone", "type": "internal", "warehouse_id": old_wh["id"]})
+    target = api("post", "/locations/", {"name": "MV target", "type": "internal", "warehouse_id": new_wh["id"]})
+    shelf = api("post", "/locations/", {"name": "MV shelf", "type": "internal", "parent_id": zone["id"]})
+    bin_ = api("post", "/locations/", {"name": "MV bin", "type": "internal", "parent_id": shelf["id"]})
+    assert (shelf["warehouse_id"], bin_["warehouse_id"]) == (old_wh["id"], old_wh["id"])
+    vendor = api("post", "/locations/", {"name": "MV vendor", "type": "vendor"})
+    product = api("post", "/products/", {"name": "MV", "sku": "MV-1", "category": "c", "unit_price": "1"})
+    move = api("post", "/moves/", {"product_id": product["id"], "source_loc_id": vendor["id"], "dest_loc_id": bin_["id"], "quantity": "4"})
+    quant = api("post", "/quants/", {"product_id": product["id"], "location_id": bin_["id"], "quantity": "4"})
+
+    # neither under itself nor under one of its children
+    for parent in (shelf, bin_):
+        r = client.put(f"/locations/{shelf['id']}", json={"parent_id": parent["id"]}, headers=headers)
+        assert r.status_code == 400, r.text
+        assert "under itself" in r.json()["detail"]
+
+    moved = api("put", f"/locations/{shelf['id']}", {"parent_id": target["id"]})
+    assert moved["path"] == f"{target['path']}{shelf['id']}/"
+    assert moved["warehouse_id"] == new_wh["id"]
+    bin_ = api("get", f"/locations/{bin_['id']}")
+    assert bin_["path"] == f"{moved['path']}{bin_['id']}/"
+    assert bin_["warehouse_id"] == new_wh["id"]
+    # moves and quants keep a copy of their location's warehouse
+    with session_scope() as db:
+        assert db.get(models.StockMove, move["id"]).dest_warehouse_id == new_wh["id"]
+        assert db.get(models.StockQuant, quant["id"]).warehouse_id == new_wh["id"]
+
+    stock = [(s["product_id"], Decimal(s["quantity"])) for s in api("get", f"/locations/{target['id']}/stock")]
+    assert stock == [(product["id"], Decimal(4))]
+    assert api("get", f"/locations/{zone['id']}/stock") == []
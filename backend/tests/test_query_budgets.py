@@ -0,0 +1,34 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def operations(client, headers):
+    """Ids of 25 draft receipts with two lines each."""
+    def post(url, body):
+        r = client.post(url, json=body, headers=headers)
+        assert r.status_code in (200, 201), r.text
+        return r.json()
+
+    vendor = post("/locations/", {"name": "Vendor", "type": "vendor"})
+    stock = post("/locations/", {"name": "Stock", "type": "internal"})
+    products = [post("/products/", {"name": f"P{i}", "sku": f"QB-{i}", "category": "c", "unit_price": "1"}) for i in range(2)]
+    ids = []
+    for _ in range(25):
+        r = client.post("/operations/", headers=headers, json={
+            "operation_type": "receipt", "source_loc_id": vendor["id"], "dest_loc_id": stock["id"],
+            "partner_id": None, "scheduled_date": None,
+            "lines": [{"product_id": p["id"], "demand_qty": "3"} for p in products],
+        })
+        assert r.status_code == 200, r.text
+        ids.append(r.json()["id"])
+    return ids
+
+
+def test_list_operations_is_not_n_plus_one(client, headers, operations, query_budget):
+    # one statement for the page, one for all of its lines
+    with query_budget(2, "GET /operations/"):
+        r = client.get("/operations/?limit=100", headers=headers)
+    assert r.status_code == 200
+    # other test modules share the database and add operations of their own
+    lines = {op["id"]: len(op["lines"]) for op in r.json()}
+    assert all(lines.get(op_id) == 2 for op_id in operations)
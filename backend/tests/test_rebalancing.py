@@ -0,0 +1,81 @@
+from decimal import Decimal
+from itertools import count
+
+import pytest
+
+from src.stockmaster.services import rebalancing
+
+
+def test_propose_fills_the_largest_need_from_the_largest_surplus():
+    needs = {"a": Decimal(5), "b": Decimal(3)}
+    surplus = {"c": Decimal(4), "d": Decimal(6), "a": Decimal(2), "e": Decimal(0)}
+    assert rebalancing.propose(needs, surplus) == [
+        ("d", "a", Decimal(5)),
+        ("d", "b", Decimal(1)),
+        ("c", "b", Decimal(2)),
+    ]
+
+
+def test_propose_never_ships_to_itself():
+    assert rebalancing.propose({"a": Decimal(5)}, {"a": Decimal(9)}) == []
+
+
+_runs = count()
+
+
+@pytest.fixture
+def setup(api):
+    """Product with 20 in warehouse `full` (7 + 13 over two shelves, keeps 8) and none in `empty` (wants 10)."""
+    n = next(_runs)
+    full = api("post", "/warehouses/", {"name": f"RB full {n}", "address": None})
+    empty = api("post", "/warehouses/", {"name": f"RB empty {n}", "address": None})
+    vendor = api("post", "/locations/", {"name": "RB Vendor", "type": "vendor"})
+    shelves = [api("post", "/locations/", {"name": f"RB shelf {i}", "type": "internal", "warehouse_id": full["id"]}) for i in range(2)]
+    dock = api("post", "/locations/", {"name": "RB dock", "type": "internal", "warehouse_id": empty["id"]})
+    product = api("post", "/products/", {"name": "RB", "sku": f"RB-{n}", "category": "c", "unit_price": "1"})
+    for shelf, qty in zip(shelves, ("7", "13")):
+        api("post", "/moves/", {"product_id": product["id"], "source_loc_id": vendor["id"], "dest_loc_id": shelf["id"], "quantity": qty})
+    for warehouse, min_qty, max_qty in ((full, "5", "8"), (empty, "10", None)):
+        api("post", "/reorder-rules/", {
+            "product_id": product["id"], "warehouse_id": warehouse["id"], "min_qty": min_qty, "max_qty": max_qty, "reorder_qty": None,
+        })
+    return {"product": product["id"], "shelves": [s["id"] for s in shelves], "dock": dock["id"]}
+
+
+def _lines(result, product_id):
+    return [
+        (t["source_loc_id"], t["dest_loc_id"], Decimal(line["quantity"]))
+        for t in result["transfers"] for line in t["lines"] if line["product_id"] == product_id
+    ]
+
+
+def _moved(result):
+    return sum((Decimal(line["quantity"]) for t in result["transfers"] for line in t["lines"]), Decimal(0))
+
+
+def test_run_takes_from_the_fullest_shelf_and_is_idempotent(api, setup):
+    result = api("post", "/operations/rebalance")
+    assert _lines(result, setup["product"]) == [(setup["shelves"][1], setup["dock"], Decimal(10))]
+    assert Decimal(result["shortfall_before"]) - Decimal(result["shortfall_after"]) == _moved(result)
+    assert all(t["operation_id"] for t in result["transfers"])
+    # the open transfer now counts as incoming
+    assert _lines(api("post", "/operations/rebalance", params={"dry_run": True}), setup["product"]) == []
+
+
+def test_run_counts_only_what_the_locations_supply(api, setup, monkeypatch):
+    free_by_location = rebalancing._free_by_location
+
+    def short(db, sources):
+        # the shelves hold less than the warehouse totals promised
+        free = free_by_location(db, sources)
+        for shelf in setup["shelves"]:
+            free[(setup["product"], shelf)] = min(free[(setup["product"], shelf)], Decimal(2))
+        return free
+
+    monkeypatch.setattr(rebalancing, "_free_by_location", short)
+    result = api("post", "/operations/rebalance", params={"dry_run": True})
+    assert sorted(_lines(result, setup["product"])) == [
+        (setup["shelves"][0], setup["dock"], Decimal(2)),
+        (setup["shelves"][1], setup["dock"], Decimal(2)),
+    ]
+    assert Decimal(result["shortfall_before"]) - Decimal(result["shortfall_after"]) == _moved(result)
@@ -0,0 +1,56 @@
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def rules(api):
+    """Rules of one warehouse: a product 2 short of its lot-rounded maximum, one well stocked."""
+    warehouse = api("post", "/warehouses/", {"name": "RP WH", "address": None})
+    stock = api("post", "/locations/", {"name": "RP Stock", "type": "internal", "warehouse_id": warehouse["id"]})
+    vendor_loc = api("post", "/locations/", {"name": "RP Vendor", "type": "vendor"})
+    vendor = api("post", "/partners/", {"name": "RP Supplier", "partner_type": "vendor", "contact": None})
+    short, stocked = (api("post", "/products/", {"name": n, "sku": f"RP-{n}", "category": "c", "unit_price": "1"}) for n in ("short", "stocked"))
+    # the latest receipt picks the vendor of the reorder
+    receipt = api("post", "/operations/", {
+        "operation_type": "receipt", "source_loc_id": vendor_loc["id"], "dest_loc_id": stock["id"],
+        "partner_id": vendor["id"], "scheduled_date": None,
+        "lines": [{"product_id": short["id"], "demand_qty": "2"}, {"product_id": stocked["id"], "demand_qty": "50"}],
+    })
+    api("post", f"/operations/{receipt['id']}/validate")
+    rule = {"warehouse_id": warehouse["id"], "min_qty": "10"}
+    return {
+        "short": api("post", "/reorder-rules/", {**rule, "product_id": short["id"], "max_qty": "25", "reorder_qty": "5"}),
+        "stocked": api("post", "/reorder-rules/", {**rule, "product_id": stocked["id"], "max_qty": None, "reorder_qty": None}),
+        "stock": stock["id"],
+        "vendor": vendor["id"],
+    }
+
+
+def _orders_for(result, rule_ids):
+    return [
+        (order, line)
+        for order in result["orders"] for line in order["lines"] if line["rule_id"] in rule_ids
+    ]
+
+
+def test_dry_run_orders_up_to_max_in_whole_lots(api, rules):
+    result = api("post", "/reorder-rules/run", params={"dry_run": True})
+    [(order, line)] = _orders_for(result, {rules["short"]["id"], rules["stocked"]["id"]})
+    assert line["rule_id"] == rules["short"]["id"]
+    # 25 - 2 on hand = 23, rounded up to lots of 5
+    assert Decimal(line["forecast_qty"]) == 2
+    assert Decimal(line["order_qty"]) == 25
+    assert (order["dest_loc_id"], order["partner_id"]) == (rules["stock"], rules["vendor"])
+    assert order["operation_id"] is None
+
+
+def test_run_creates_the_receipt_once(api, rules):
+    result = api("post", "/reorder-rules/run")
+    [(order, _)] = _orders_for(result, {rules["short"]["id"]})
+    receipt = api("get", f"/operations/{order['operation_id']}")
+    assert receipt["operation_type"] == "receipt"
+    assert receipt["status"] == "draft"
+    assert [(l["product_id"], Decimal(l["demand_qty"])) for l in receipt["lines"]] == [(rules["short"]["product_id"], Decimal(25))]
+    # the draft receipt now counts as incoming: nothing more to order
+    assert _orders_for(api("post", "/reorder-rules/run"), {rules["short"]["id"]}) == []